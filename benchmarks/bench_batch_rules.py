@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: batch rule evaluation vs. the per-contract coroutine fan-out
+
+Generates contract_data snapshots shaped like ContractMonitor's (up to 15 transactions, function
+calls, admin events and 5 price points per contract, with a share of contracts showing each
+attack pattern) and times:
+  - fan-out: the seven MonitoringRules.check_* coroutines per contract, gathered across contracts
+  - batch:   batch_rules.ContractShard.from_snapshots (dicts to columns) + check_all_rules_batch
+  - eval:    check_all_rules_batch alone, on a shard built beforehand
+Both paths must flag the same (contract, rule) pairs.
+
+Usage: python benchmarks/bench_batch_rules.py [contracts] [rounds]
+"""
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fetch", "agent"))
+
+from batch_rules import ContractShard  # noqa: E402
+from monitoring_rules import MonitoringRules  # noqa: E402
+
+
+def make_snapshot(index: int, now: float, rng: random.Random) -> dict:
+    transactions = [{"timestamp": now - i * 300 - 1, "amount": rng.uniform(1, 100), "type": "transfer",
+                     "from": "user_wallet", "to": "contract"} for i in range(rng.randint(0, 15))]
+    if index % 7 == 0:
+        transactions.append({"timestamp": now - 300, "amount": 1500000, "type": "borrow",
+                             "from": "flash_loan_pool", "to": "attacker_contract"})
+        transactions.extend({"timestamp": now - 240 + i * 15, "amount": 50000, "type": "transfer",
+                             "from": "attacker_contract", "to": f"exploit_target_{i}"} for i in range(4))
+    function_calls = []
+    if index % 10 == 0:
+        function_calls.extend({"timestamp": now - 60 + i * 5, "function_name": "withdraw", "caller": "attacker_contract",
+                               "type": "function_call", "recursion_depth": i + 1} for i in range(4))
+    if index % 5 == 0:
+        function_calls.append({"timestamp": now - 1800, "function_name": "admin_upgrade", "caller": "admin_user",
+                               "type": "function_call"})
+    admin_events = []
+    if index % 8 == 0:
+        admin_events.append({"timestamp": now - 900, "event_type": "ownership_transferred",
+                             "function_name": "admin_ownership", "caller": "admin_user"})
+    price_data = [{"timestamp": now - k * 600, "price": 100 * (1.4 if index % 6 == 0 and k == 1 else 1 + k * 0.02),
+                   "volume": 1000} for k in range(5)]
+    balance = rng.uniform(1e5, 1e6)
+    return {"balance": balance, "recent_transactions": transactions, "function_calls": function_calls,
+            "admin_events": admin_events, "price_data": price_data}
+
+
+async def check_contract(contract_id: str, data: dict, previous_balance: float) -> list:
+    checks = await asyncio.gather(
+        MonitoringRules.check_balance_drop(contract_id, data["balance"], previous_balance),
+        MonitoringRules.check_transaction_volume(contract_id, data["recent_transactions"]),
+        MonitoringRules.check_function_calls(contract_id, data["function_calls"]),
+        MonitoringRules.check_reentrancy_attack(contract_id, data["function_calls"]),
+        MonitoringRules.check_flash_loan_attack(contract_id, data["recent_transactions"]),
+        MonitoringRules.check_ownership_change(contract_id, data["admin_events"]),
+        MonitoringRules.check_price_manipulation(contract_id, data["price_data"]),
+    )
+    return [alert for alert in checks if alert]
+
+
+async def fan_out(snapshots: dict, previous_balances: dict) -> set:
+    results = await asyncio.gather(*(check_contract(contract_id, data, previous_balances[contract_id])
+                                     for contract_id, data in snapshots.items()))
+    return {(contract_id, alert["rule_id"]) for contract_id, alerts in zip(snapshots, results) for alert in alerts}
+
+
+def best_of(func, rounds: int):
+    best = float("inf")
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    logging.getLogger("CanaryAgent").setLevel(logging.ERROR)  # keep alert log lines out of the timings
+    rng = random.Random(7)
+    now = time.time()
+    snapshots = {f"contract-{i}": make_snapshot(i, now, rng) for i in range(count)}
+    previous_balances = {contract_id: data["balance"] * (2.5 if i % 9 == 0 else 1.0)
+                         for i, (contract_id, data) in enumerate(snapshots.items())}
+
+    fan_out_time, expected = best_of(lambda: asyncio.run(fan_out(snapshots, previous_balances)), rounds)
+    batch_time, table = best_of(lambda: MonitoringRules.check_all_rules_batch(
+        ContractShard.from_snapshots(snapshots, previous_balances)), rounds)
+    shard = ContractShard.from_snapshots(snapshots, previous_balances)
+    eval_time, _ = best_of(lambda: MonitoringRules.check_all_rules_batch(shard), rounds)
+
+    flagged = {(contract_id, rule_id) for contract_id, rule_id, _, _ in table.to_records()}
+    assert flagged == expected, f"batch and fan-out disagree on {len(flagged ^ expected)} violations"
+    print(f"📊 Batch rule benchmark: {count:,} contracts, {len(table):,} violations "
+          f"{table.counts_by_rule()}, best of {rounds}")
+    print(f"  fan-out {fan_out_time * 1000:9.1f} ms")
+    print(f"  batch   {batch_time * 1000:9.1f} ms ({fan_out_time / batch_time:.0f}x, including dicts to columns)")
+    print(f"  eval    {eval_time * 1000:9.1f} ms ({fan_out_time / eval_time:.0f}x, columns already built)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: CanisterClient's Candid text parsing vs. the previous regex-per-field parsers
+
+Generates dfx-style `getContracts` / `getAlerts` output with 10k records and times
+CanisterClient.parse_contracts_from_candid / parse_alerts_from_candid ("client", both through
+candid_parser.parse_candid) against the regex extraction from before candid_parser, and against
+the same reply as
+`dfx canister call --output json` would print it.
+
+Usage: python benchmarks/bench_candid_parser.py [records] [rounds]
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fetch", "agent"))
+
+from canister_client import CanisterClient  # noqa: E402
+from candid_parser import parse_candid  # noqa: E402
+
+RECORD_PATTERN = r'record \{([^{}]*(?:\{[^{}]*\}[^{}]*)*)\}'
+
+
+def make_contracts_output(count: int) -> str:
+    records = []
+    for i in range(count):
+        records.append(
+            "    record {\n"
+            f"      id = {i} : nat;\n"
+            f"      nickname = \"Contract {i}\";\n"
+            f"      address = \"rrkah-fqaaa-aaaaa-aaaaq-cai-{i}\";\n"
+            "      status = variant { healthy };\n"
+            f"      alertCount = {i % 7} : nat;\n"
+            "      isPaused = false;\n"
+            "      isActive = true;\n"
+            "      lastCheck = 1_700_000_000_000_000_000 : int;\n"
+            "      addedAt = 1_699_000_000_000_000_000 : int;\n"
+            "    };\n"
+        )
+    return "(\n  vec {\n" + "".join(records) + "  },\n)"
+
+
+def make_alerts_output(count: int) -> str:
+    records = []
+    for i in range(count):
+        records.append(
+            "    record {\n"
+            f"      id = {i} : nat;\n"
+            f"      contractId = {i % 50} : nat;\n"
+            f"      contractAddress = \"rrkah-fqaaa-aaaaa-aaaaq-cai-{i % 50}\";\n"
+            f"      contractNickname = \"Contract {i % 50}\";\n"
+            "      ruleId = \"rule_1\";\n"
+            "      ruleName = \"Large Transfer Detection\";\n"
+            "      title = \"Large transfer\";\n"
+            "      description = \"Balance dropped by 12.5%\";\n"
+            "      severity = \"warning\";\n"
+            "      timestamp = 1_700_000_000_000_000_000 : int;\n"
+            "      acknowledged = false;\n"
+            "    };\n"
+        )
+    return "(\n  vec {\n" + "".join(records) + "  },\n)"
+
+
+def legacy_parse_contracts(candid_output: str) -> list:
+    """Regex-per-field contract parser as it existed before candid_parser"""
+    contracts = []
+    if "vec {" in candid_output and "record {" in candid_output:
+        for record_content in re.findall(RECORD_PATTERN, candid_output):
+            contract = {}
+            id_match = re.search(r'id\s*=\s*(\d+)\s*:', record_content)
+            if id_match:
+                contract['id'] = int(id_match.group(1))
+            for field in ('nickname', 'address'):
+                match = re.search(field + r'\s*=\s*"([^"]*)"', record_content)
+                if match:
+                    contract[field] = match.group(1)
+            status_match = re.search(r'status\s*=\s*variant\s*\{\s*(\w+)\s*\}', record_content)
+            if status_match:
+                contract['status'] = status_match.group(1)
+            for field in ('alertCount', 'lastCheck', 'addedAt'):
+                match = re.search(field + r'\s*=\s*(\d+)\s*:', record_content)
+                if match:
+                    contract[field] = int(match.group(1))
+            for field in ('isPaused', 'isActive'):
+                match = re.search(field + r'\s*=\s*(true|false)', record_content)
+                if match:
+                    contract[field] = match.group(1) == 'true'
+            if contract:
+                contracts.append(contract)
+    return contracts
+
+
+def legacy_parse_alerts(candid_output: str) -> list:
+    """Regex-per-field alert parser as it existed before candid_parser"""
+    alerts = []
+    if "vec {" in candid_output and "record {" in candid_output:
+        for record_content in re.findall(RECORD_PATTERN, candid_output):
+            alert = {}
+            for field in ('id', 'contractId', 'timestamp'):
+                match = re.search(r'\b' + field + r'\s*=\s*([0-9_]+)\s*:', record_content)
+                if match:
+                    alert[field] = int(match.group(1).replace('_', ''))
+            for field in ('contractAddress', 'contractNickname', 'ruleId', 'ruleName', 'title', 'description', 'severity'):
+                match = re.search(field + r'\s*=\s*"([^"]*)"', record_content)
+                if match:
+                    alert[field] = match.group(1)
+            ack_match = re.search(r'acknowledged\s*=\s*(true|false)', record_content)
+            if ack_match:
+                alert['acknowledged'] = ack_match.group(1) == 'true'
+            if alert:
+                alerts.append(alert)
+    return alerts
+
+
+def to_dfx_json(candid_output: str) -> str:
+    """Re-encode a reply the way `--output json` prints it (nat/int as decimal strings)"""
+    def convert(value):
+        if isinstance(value, dict):
+            return {key: convert(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [convert(item) for item in value]
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value)
+        return value
+    return json.dumps(convert(parse_candid(candid_output)[0]), indent=2)
+
+
+def best_of(func, arg, rounds: int):
+    best = float("inf")
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    client = CanisterClient("backend", "http://127.0.0.1:4943")
+
+    cases = [
+        ("getContracts", make_contracts_output(count), legacy_parse_contracts, client.parse_contracts_from_candid),
+        ("getAlerts", make_alerts_output(count), legacy_parse_alerts, client.parse_alerts_from_candid),
+    ]
+
+    print(f"📊 Candid parser benchmark: {count:,} records, best of {rounds}")
+    for name, output, legacy, current in cases:
+        legacy_time, legacy_result = best_of(legacy, output, rounds)
+        current_time, current_result = best_of(current, output, rounds)
+        json_time, json_result = best_of(current, to_dfx_json(output), rounds)
+        assert len(legacy_result) == len(current_result) == count, "parsers disagree on record count"
+        assert json_result == current_result, "JSON and Candid text decode differently"
+        print(f"  {name:<13} {len(output) / 1e6:6.2f} MB   regex {legacy_time * 1000:8.1f} ms   "
+              f"client {current_time * 1000:8.1f} ms ({legacy_time / current_time:.1f}x)   "
+              f"json {json_time * 1000:8.1f} ms ({legacy_time / json_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: NumPy columnar rule evaluation vs. the dict-based rules
+
+Generates transaction and price histories inside the rules' time window and times
+MonitoringRules.check_flash_loan_attack and check_price_manipulation with the columnar path
+(columnar_rules, used for lists of COLUMNAR_MIN_EVENTS or more) and with it switched off.
+Columnar times include converting the dicts to columns; "scan" is the array work alone, on columns
+built beforehand. The alerts from both paths must match.
+
+Usage: python benchmarks/bench_columnar_rules.py [events] [rounds]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fetch", "agent"))
+
+import columnar_rules  # noqa: E402
+from monitoring_rules import (FLASH_LOAN_AMOUNT_THRESHOLD, FLASH_LOAN_FOLLOWUP_WINDOW,  # noqa: E402
+                              FLASH_LOAN_MIN_FOLLOWUPS, PRICE_CHANGE_THRESHOLD, TRANSACTION_TIME_WINDOW,
+                              MonitoringRules)
+
+
+def make_transactions(count: int, now: float, rng: random.Random) -> list:
+    transactions = []
+    for _ in range(count):
+        if rng.random() < 0.001:
+            transactions.append({"type": "Borrow", "amount": FLASH_LOAN_AMOUNT_THRESHOLD * 2,
+                                 "timestamp": now - rng.uniform(0, 3500)})
+        else:
+            transactions.append({"type": rng.choice(("transfer", "swap", "deposit")), "amount": rng.uniform(1, 1000),
+                                 "timestamp": now - rng.uniform(0, 3500), "from": "user_wallet", "to": "contract"})
+    return transactions
+
+
+def make_prices(count: int, now: float, rng: random.Random) -> list:
+    prices = [{"timestamp": now - 3500 + i * 3500 / count, "price": 100 + rng.uniform(-1, 1), "volume": 1000}
+              for i in range(count)]
+    prices[int(count * 0.9)]["price"] = 150  # one spike late in the window
+    rng.shuffle(prices)
+    return prices
+
+
+def scan_flash_loan(columns, now):
+    mask = columnar_rules.window_mask(columns, now, TRANSACTION_TIME_WINDOW)
+    return columnar_rules.find_flash_loan(columns, mask, FLASH_LOAN_AMOUNT_THRESHOLD,
+                                          FLASH_LOAN_FOLLOWUP_WINDOW, FLASH_LOAN_MIN_FOLLOWUPS)
+
+
+def scan_price_change(columns, now):
+    mask = columnar_rules.window_mask(columns, now, TRANSACTION_TIME_WINDOW)
+    return columnar_rules.find_price_change(columns, mask, PRICE_CHANGE_THRESHOLD)
+
+
+def best_of(check, events, rounds: int):
+    best = float("inf")
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = asyncio.run(check("bench", events))
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    rng = random.Random(7)
+    now = time.time()
+    if not columnar_rules.HAS_NUMPY:
+        sys.exit("NumPy is not installed; only the dict-based rules are available")
+
+    cases = [
+        ("flash loan", MonitoringRules.check_flash_loan_attack, scan_flash_loan, make_transactions),
+        ("price change", MonitoringRules.check_price_manipulation, scan_price_change, make_prices),
+    ]
+
+    print(f"📊 Columnar rule benchmark, best of {rounds}")
+    for size in [size for size in (1_000, 10_000) if size < count] + [count]:
+        for name, check, scan, generate in cases:
+            events = generate(size, now, rng)
+            columnar_time, columnar_result = best_of(check, events, rounds)
+            columnar_rules.HAS_NUMPY = False
+            try:
+                dict_time, dict_result = best_of(check, events, rounds)
+            finally:
+                columnar_rules.HAS_NUMPY = True
+            assert columnar_result == dict_result, f"{name}: columnar and dict rules disagree"
+            columns = columnar_rules.EventColumns(events)
+            columns.type_mask(lambda type_name: True)  # materialise every column the scans read
+            _ = columns.amounts, columns.prices
+            scan_time = float("inf")
+            for _ in range(rounds):
+                start = time.perf_counter()
+                scan(columns, now)
+                scan_time = min(scan_time, time.perf_counter() - start)
+            print(f"  {name:<13} {size:>9,} events   dicts {dict_time * 1000:8.1f} ms   "
+                  f"columnar {columnar_time * 1000:8.1f} ms ({dict_time / columnar_time:.1f}x)   "
+                  f"scan {scan_time * 1000:7.2f} ms ({dict_time / scan_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: two-pointer flash-loan detector vs. the previous rescan-per-loan detector
+
+Generates a contract's ledger history (one transaction every 100 s, every other one a large
+borrow, so no loan ever has enough follow-ups and both detectors must scan everything), then
+times MonitoringRules.find_flash_loan against the loop it replaced, which rebuilt the list of
+later transactions for every large loan. The legacy loop is quadratic, so it only runs up to
+`legacy_limit` transactions. A burst after the last loan checks both detectors still agree
+when an attack is present.
+
+Usage: python benchmarks/bench_flash_loan.py [transactions] [legacy_limit] [rounds]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fetch", "agent"))
+
+from monitoring_rules import FLASH_LOAN_AMOUNT_THRESHOLD, MonitoringRules  # noqa: E402
+
+
+def make_history(count: int, attack: bool = False) -> list:
+    start = 1_700_000_000
+    transactions = []
+    for i in range(count):
+        if i % 2:
+            transactions.append({"type": "borrow", "amount": FLASH_LOAN_AMOUNT_THRESHOLD * 2, "timestamp": start + i * 100})
+        else:
+            transactions.append({"type": "transfer", "amount": 10_000, "timestamp": start + i * 100})
+    if attack:
+        last = transactions[-1]["timestamp"]
+        transactions.extend({"type": "swap", "amount": 5_000, "timestamp": last + 100 + j} for j in range(5))
+    return transactions
+
+
+def legacy_find_flash_loan(transactions: list):
+    """The detector body before the two-pointer rewrite"""
+    for i, tx in enumerate(transactions):
+        amount = tx.get('amount', 0)
+        tx_type = tx.get('type', '').lower()
+        if amount > FLASH_LOAN_AMOUNT_THRESHOLD and ('borrow' in tx_type or 'loan' in tx_type):
+            subsequent_txs = [
+                t for t in transactions[i+1:]
+                if t.get('timestamp', 0) - tx.get('timestamp', 0) < 300
+            ]
+            if len(subsequent_txs) >= 3:
+                return tx, len(subsequent_txs)
+    return None
+
+
+def best_of(func, arg, rounds: int):
+    best = float("inf")
+    result = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    legacy_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    print(f"📊 Flash-loan detector benchmark: up to {count:,} transactions, best of {rounds}")
+    sizes = [size for size in (1_000, 10_000) if size < count] + [count]
+    for size in sizes:
+        history = make_history(size)
+        current_time, current_result = best_of(MonitoringRules.find_flash_loan, history, rounds)
+        assert current_result is None, "quiet history flagged as an attack"
+        line = f"  {size:>9,} txs   two-pointer {current_time * 1000:8.1f} ms"
+        if size <= legacy_limit:
+            legacy_time, legacy_result = best_of(legacy_find_flash_loan, history, 1)
+            assert legacy_result is None, "detectors disagree on quiet history"
+            line += f"   rescan {legacy_time * 1000:10.1f} ms ({legacy_time / current_time:.0f}x)"
+        print(line)
+
+    attack = make_history(min(count, legacy_limit), attack=True)
+    assert MonitoringRules.find_flash_loan(attack) == legacy_find_flash_loan(attack), "detectors disagree on attack"
+    shuffled = list(make_history(count, attack=True))
+    random.Random(7).shuffle(shuffled)
+    shuffled_time, shuffled_result = best_of(MonitoringRules.find_flash_loan, shuffled, rounds)
+    assert shuffled_result is not None and shuffled_result[1] == 5, "attack missed in unsorted input"
+    print(f"  {len(shuffled):>9,} txs   two-pointer on unsorted input with an attack {shuffled_time * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,8 @@ from uagents_core.contrib.protocols.chat import (
 
 # Import separated classes
 from canister_client import CanisterClient
+from retry_policy import RetryPolicy
+from candid_parser import parse_dfx_output, result_variant
 from discord_notifier import DiscordNotifier
 from monitoring_rules import MonitoringRules
 from contract_monitor import ContractMonitor
@@ -49,12 +51,30 @@ __all__ = [
 # ICP Canister Configuration
 CANISTER_ID = os.getenv("CANISTER_ID", "uxrrr-q7777-77774-qaaaq-cai")  # Use backend canister
 BASE_URL = "http://127.0.0.1:4943"
+CANISTER_TRANSPORT = os.getenv("CANISTER_TRANSPORT", "dfx")  # "dfx" (subprocess) or "http" (native replica API)
+DFX_OUTPUT_JSON = os.getenv("DFX_OUTPUT_JSON", "true").lower() == "true"  # request `--output json` from dfx
+CONTRACT_REGISTRY_TTL = float(os.getenv("CONTRACT_REGISTRY_TTL", "30"))  # seconds before address lookups reload contracts
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", "20"))  # alerts per createAlerts call (1 disables batching)
+ALERT_BATCH_DELAY = float(os.getenv("ALERT_BATCH_DELAY", "0.5"))  # seconds a partial alert batch waits before it is sent
+QUERY_LANE_CONCURRENCY = int(os.getenv("QUERY_LANE_CONCURRENCY", "16"))  # concurrent query calls (reads)
+UPDATE_LANE_CONCURRENCY = int(os.getenv("UPDATE_LANE_CONCURRENCY", "4"))  # concurrent update calls (consensus writes)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))  # consecutive timeouts/unreachable/unavailable errors that open a canister's circuit
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))  # seconds an open circuit fails fast before a probe call
 
 # Discord Configuration
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL", "https://discord.com/api/webhooks/YOUR_WEBHOOK_URL")
 
 # Monitoring Configuration
 MONITORING_INTERVAL = int(os.getenv("MONITORING_INTERVAL", "300"))  # 5 minutes in seconds
+MAX_CONCURRENT_CHECKS = int(os.getenv("MAX_CONCURRENT_CHECKS", "10"))  # contracts checked in parallel per cycle
+CONTRACT_CHECK_TIMEOUT = float(os.getenv("CONTRACT_CHECK_TIMEOUT", "60"))  # seconds before one contract check is abandoned
+ADAPTIVE_POLLING = os.getenv("ADAPTIVE_POLLING", "true").lower() == "true"  # speed up on suspicion, back off when idle
+SUSPICION_INTERVAL = float(os.getenv("SUSPICION_INTERVAL", "10"))  # polling interval right after an alert or attack indicator
+MAX_POLLING_INTERVAL = float(os.getenv("MAX_POLLING_INTERVAL", "3600"))  # ceiling for idle back-off
+ALERT_WORKERS = int(os.getenv("ALERT_WORKERS", "20"))  # workers delivering alert side effects; also caps how full an alert batch gets
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "1000"))  # queued alerts before detection waits for a free slot
+ALERT_MAX_ATTEMPTS = int(os.getenv("ALERT_MAX_ATTEMPTS", "3"))  # attempts per alert side effect before giving up
+ALERT_SUPPRESSION_WINDOW = float(os.getenv("ALERT_SUPPRESSION_WINDOW", "900"))  # seconds repeats of an alert are folded (0 disables)
 
 # Agent Configuration
 AGENT_NAME = os.getenv("AGENT_NAME", "CanaryGuardian")
@@ -128,12 +148,26 @@ agent._canary_metadata = AGENT_METADATA
 asi_client = ASIOneClient(ASI_MODEL_ENDPOINT, AGENTVERSE_API_KEY)
 
 # Initialize all components
-canister_client = CanisterClient(CANISTER_ID, BASE_URL)
+canister_client = CanisterClient(CANISTER_ID, BASE_URL, transport=CANISTER_TRANSPORT, dfx_json_output=DFX_OUTPUT_JSON,
+                                 registry_ttl=CONTRACT_REGISTRY_TTL, alert_batch_size=ALERT_BATCH_SIZE,
+                                 alert_batch_delay=ALERT_BATCH_DELAY,
+                                 retry_policy=RetryPolicy(failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                                                          reset_timeout=CIRCUIT_RESET_TIMEOUT),
+                                 query_concurrency=QUERY_LANE_CONCURRENCY, update_concurrency=UPDATE_LANE_CONCURRENCY)
 discord_notifier = DiscordNotifier(DISCORD_WEBHOOK_URL)
 monitoring_rules = MonitoringRules()
 contract_monitor = ContractMonitor(
     canister_client, discord_notifier, monitoring_rules, 
-    MONITORING_INTERVAL
+    MONITORING_INTERVAL,
+    max_concurrent_checks=MAX_CONCURRENT_CHECKS,
+    contract_check_timeout=CONTRACT_CHECK_TIMEOUT,
+    adaptive_polling=ADAPTIVE_POLLING,
+    suspicion_interval=SUSPICION_INTERVAL,
+    max_interval=MAX_POLLING_INTERVAL,
+    alert_workers=ALERT_WORKERS,
+    alert_queue_size=ALERT_QUEUE_SIZE,
+    alert_max_attempts=ALERT_MAX_ATTEMPTS,
+    alert_suppression_window=ALERT_SUPPRESSION_WINDOW
 )
 
 # ============================================================================
@@ -159,6 +193,7 @@ class MonitorRequest(Model):
     contract_id: str
     nickname: str = None
     discord_webhook: str = None
+    interval: int = None  # polling interval in seconds (defaults to MONITORING_INTERVAL)
 
 class HealthResponse(Model):
     status: str
@@ -714,8 +749,7 @@ async def handle_stop_monitoring(contract_id: str) -> str:
         if contract and contract.get('id'):
             # Remove contract from backend canister
             contract_numeric_id = contract.get('id')
-            args = f'{contract_numeric_id} : nat'
-            result = await canister_client.call_canister("removeContract", args)
+            result = await canister_client.remove_contract(contract_numeric_id)
             
             if result and result.get("status") == "success":
                 return f"⏹️ Stopped monitoring contract: {contract_id}"
@@ -789,7 +823,21 @@ async def get_agent_status(ctx: Context) -> StatusResponse:
             stats={
                 "totalContracts": len(contracts),
                 "healthyContracts": healthy_count,
-                "alertsToday": 0
+                "alertsToday": 0,
+                "icClock": canister_client.get_clock_diagnostics(),
+                "contractRegistry": canister_client.registry.diagnostics(),
+                "readCoalescing": canister_client.get_coalescing_stats(),
+                "lastCycle": contract_monitor.last_cycle_stats,
+                "scheduler": contract_monitor.scheduler.diagnostics(),
+                "pollingIntervals": contract_monitor.get_polling_intervals(),
+                "ruleEvaluation": contract_monitor.get_rule_eval_stats(),
+                "snapshotFetches": contract_monitor.get_fetch_stats(),
+                "alertPipeline": contract_monitor.get_alert_pipeline_stats(),
+                "alertBatching": canister_client.get_alert_batch_stats(),
+                "alertMirror": canister_client.get_alert_mirror_stats(),
+                "canisterRetries": canister_client.get_retry_stats(),
+                "callLanes": canister_client.get_lane_stats(),
+                "unreachableContracts": contract_monitor.get_unreachable_contracts()
             },
             timestamp=datetime.utcnow().isoformat()
         )
@@ -1053,6 +1101,8 @@ async def start_monitoring_contract(ctx: Context, req: MonitorRequest) -> Monito
         
         if success:
             contract_monitor.set_contract_webhook(req.contract_id, discord_webhook)
+            if req.interval:
+                contract_monitor.set_contract_interval(req.contract_id, req.interval)
             ctx.logger.info(f"Started monitoring contract via REST: {req.contract_id}")
             
             return MonitorResponse(
@@ -1077,6 +1127,30 @@ async def start_monitoring_contract(ctx: Context, req: MonitorRequest) -> Monito
             timestamp=datetime.utcnow().isoformat()
         )
         
+@agent.on_rest_post("/monitor/interval", MonitorRequest, MonitorResponse)
+async def set_monitoring_interval(ctx: Context, req: MonitorRequest) -> MonitorResponse:
+    """Change a contract's polling interval at runtime via REST API (omit interval to reset)"""
+    try:
+        contract_monitor.set_contract_interval(req.contract_id, req.interval)
+        interval = contract_monitor.get_contract_interval(req.contract_id)
+        ctx.logger.info(f"Polling interval for {req.contract_id} set to {interval}s via REST")
+        
+        return MonitorResponse(
+            success=True,
+            message=f"Polling {req.contract_id} every {interval:g}s",
+            contract_id=req.contract_id,
+            timestamp=datetime.utcnow().isoformat()
+        )
+        
+    except Exception as e:
+        ctx.logger.error(f"Error setting monitoring interval via REST: {e}")
+        return MonitorResponse(
+            success=False,
+            message=f"Failed to set monitoring interval: {str(e)}",
+            contract_id=req.contract_id,
+            timestamp=datetime.utcnow().isoformat()
+        )
+
 @agent.on_rest_post("/monitor/remove", MonitorRequest, MonitorResponse)
 async def remove_monitoring_contract(ctx: Context, req: MonitorRequest) -> MonitorResponse:
     """Remove monitoring a specific contract via REST API"""
@@ -1087,14 +1161,14 @@ async def remove_monitoring_contract(ctx: Context, req: MonitorRequest) -> Monit
         if contract and contract.get('id'):
             # Remove contract from backend canister using the numeric ID
             contract_numeric_id = contract.get('id')
-            args = f'{contract_numeric_id} : nat'
-            result = await canister_client.call_canister("removeContract", args)
+            result = await canister_client.remove_contract(contract_numeric_id)
             
             # Check for successful response - the canister returns variant { ok = "message" }
             if result and result.get("status") == "success":
                 response_data = result.get("data", "")
                 # Check if the response contains success indicator
-                if "variant { ok" in response_data or "Contract removed successfully" in response_data:
+                tag, _ = result_variant(parse_dfx_output(response_data))
+                if tag == "ok":
                     ctx.logger.info(f"Stopped monitoring contract via REST: {req.contract_id}")
                     
                     return MonitorResponse(
@@ -1186,13 +1260,12 @@ async def pause_monitoring_contract(ctx: Context, req: MonitorRequest) -> Monito
         if contract and contract.get('id'):
             # Pause contract in backend canister using the numeric ID
             contract_numeric_id = contract.get('id')
-            args = f'({contract_numeric_id} : nat)'
-            print(f"Pausing contract with args: {args}")
-            result = await canister_client.call_canister("deactivateContract", args)
+            result = await canister_client.mutate_contract("deactivateContract", contract_numeric_id)
             # Check for successful response
             if result and result.get("status") == "success":
                 response_data = result.get("data", "")
-                if "variant {" in response_data and "ok" in response_data:
+                tag, _ = result_variant(parse_dfx_output(response_data))
+                if tag == "ok":
                     ctx.logger.info(f"Paused monitoring contract via REST: {req.contract_id}")
                     return MonitorResponse(
                         success=True,
@@ -1246,13 +1319,13 @@ async def resume_monitoring_contract(ctx: Context, req: MonitorRequest) -> Monit
         if contract and contract.get('id'):
             # Resume contract in backend canister using the numeric ID
             contract_numeric_id = contract.get('id')
-            args = f'({contract_numeric_id} : nat)'
-            result = await canister_client.call_canister("resumeContract", args)
+            result = await canister_client.mutate_contract("resumeContract", contract_numeric_id)
             
             # Check for successful response
             if result and result.get("status") == "success":
                 response_data = result.get("data", "")
-                if "variant {" in response_data and "ok" in response_data and ("isPaused = false" in response_data or "isActive = true" in response_data):
+                tag, resumed = result_variant(parse_dfx_output(response_data))
+                if tag == "ok" and isinstance(resumed, dict) and (resumed.get("isPaused") is False or resumed.get("isActive") is True):
                     ctx.logger.info(f"Resumed monitoring contract via REST: {req.contract_id}")
                     
                     return MonitorResponse(
@@ -1305,6 +1378,7 @@ async def startup_handler(ctx: Context):
     logger.info(f"🐦 Canary Contract Guardian Agent starting...")
     logger.info(f"Agent address: {agent.address}")
     logger.info(f"Monitoring canister: {CANISTER_ID}")
+    logger.info(f"Canister transport: {CANISTER_TRANSPORT}")
     logger.info(f"Chat protocol enabled for ASI compatibility")
     
     # Test ASI:One connection
@@ -1316,6 +1390,9 @@ async def startup_handler(ctx: Context):
     logger.info(f"📋 Agent Capabilities: {', '.join(AGENT_METADATA['capabilities'])}")
     logger.info(f"🏷️ Agent Tags: {', '.join(AGENT_METADATA['tags'])}")
     
+    # Keep the IC clock offset fresh in the background for ingress expiry calculation
+    canister_client.start_clock_sync()
+    
     # Start monitoring in background
     asyncio.create_task(contract_monitor.start_monitoring())
     
@@ -1329,6 +1406,12 @@ async def shutdown_handler(ctx: Context):
     # Stop monitoring
     contract_monitor.stop_monitoring()
     
+    # Deliver alerts that are still queued or in flight
+    try:
+        await contract_monitor.drain_alerts()
+    except Exception as e:
+        logger.error(f"Error draining alert pipeline: {e}")
+    
     # Close ASI:One session
     try:
         await asi_client.close_session()
@@ -1336,6 +1419,12 @@ async def shutdown_handler(ctx: Context):
     except Exception as e:
         logger.error(f"Error closing ASI:One session: {e}")
     
+    # Close canister transport
+    try:
+        await canister_client.close()
+    except Exception as e:
+        logger.error(f"Error closing canister client: {e}")
+    
     logger.info("✅ Shutdown complete")
 
 # ============================================================================
@@ -0,0 +1,99 @@
+"""
+Alert deduplication for Canary Contract Guardian
+
+A contract that stays in a bad state raises the same alert on every check. Alerts are keyed
+on (contract, rule, severity, the rule's identifying data fields); the first occurrence is
+emitted and repeats inside the suppression window are only counted. The first repeat after
+the window closes is emitted as a "still active (N occurrences)" update and opens a new
+window, so a persistent condition produces at most one canister alert and Discord post per
+window.
+"""
+
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("CanaryAgent")
+
+# Fields of alert["data"] that identify *which* condition a rule found (not how large it is);
+# rules not listed are keyed on contract, rule and severity only
+DEDUP_KEY_FIELDS: Dict[int, Tuple[str, ...]] = {
+    3: ("function_name", "caller"),
+    4: ("function_name",),
+    6: ("event_type", "function_name", "caller"),
+    7: ("direction",),
+}
+
+
+class AlertDeduplicator:
+    """Suppresses repeats of an alert inside a window and folds them into periodic updates"""
+
+    def __init__(self, window: float = 900):
+        self.window = window
+        self.active: Dict[Tuple, Dict] = {}   # dedup key -> {"window_start", "last_seen", "occurrences", "total"}
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._admitted = 0
+
+    @staticmethod
+    def dedup_key(contract_address: str, alert: Dict) -> Tuple:
+        data = alert.get('data') or {}
+        fields = DEDUP_KEY_FIELDS.get(alert.get('rule_id'), ())
+        return (contract_address, alert.get('rule_id'), str(alert.get('severity', '')).lower(),
+                tuple(str(data.get(field)) for field in fields))
+
+    def _count(self, alert: Dict, outcome: str):
+        rule_stats = self.stats.setdefault(alert.get('rule_name', str(alert.get('rule_id'))),
+                                           {"emitted": 0, "suppressed": 0, "still_active_updates": 0})
+        rule_stats[outcome] += 1
+
+    def admit(self, contract_address: str, alert: Dict, now: Optional[float] = None) -> Optional[Dict]:
+        """Return the alert to emit (the original or a "still active" update), or None if suppressed"""
+        if self.window <= 0:
+            self._count(alert, "emitted")
+            return alert
+        now = time.time() if now is None else now
+        self._admitted += 1
+        if self._admitted % 1000 == 0:
+            self.prune(now)
+
+        key = self.dedup_key(contract_address, alert)
+        entry = self.active.get(key)
+        if entry is None or now - entry["last_seen"] > self.window:
+            # New condition, or one that cleared for a whole window before recurring
+            self.active[key] = {"window_start": now, "last_seen": now, "occurrences": 0, "total": 1}
+            self._count(alert, "emitted")
+            return alert
+
+        entry["last_seen"] = now
+        entry["total"] += 1
+        if now - entry["window_start"] < self.window:
+            entry["occurrences"] += 1
+            self._count(alert, "suppressed")
+            logger.info(f"🔕 Suppressed repeat of {alert.get('rule_name')} for {contract_address} "
+                        f"({entry['occurrences']} in current window)")
+            return None
+
+        occurrences = entry["occurrences"] + 1
+        entry["window_start"] = now
+        entry["occurrences"] = 0
+        self._count(alert, "still_active_updates")
+        return {
+            **alert,
+            "title": f"{alert['title']} - still active ({occurrences} occurrences)",
+            "description": f"{alert['description']} (still active: {occurrences} occurrences in the last "
+                           f"{int(self.window)}s, {entry['total']} since first seen)",
+            "data": {**(alert.get('data') or {}), "occurrences": occurrences, "total_occurrences": entry["total"]},
+        }
+
+    def prune(self, now: Optional[float] = None):
+        """Forget conditions not seen for a whole window"""
+        now = time.time() if now is None else now
+        for key in [key for key, entry in self.active.items() if now - entry["last_seen"] > self.window]:
+            del self.active[key]
+
+    def diagnostics(self) -> Dict:
+        return {
+            "window_seconds": self.window,
+            "active_conditions": len(self.active),
+            "rules": {rule: dict(counts) for rule, counts in self.stats.items()},
+        }
@@ -0,0 +1,137 @@
+"""
+Alert side-effect pipeline for Canary Contract Guardian
+
+Detection publishes each alert's side effects (canister alert record, Discord webhook,
+contract status / pause) as one job on a bounded in-process queue. A pool of worker tasks
+consumes the queue, runs a job's steps concurrently and retries failed steps with
+exponential back-off, so rule evaluation never waits on notification I/O. When the queue
+is full, publishers wait for a free slot (backpressure) and the wait is recorded.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger("CanaryAgent")
+
+# A step returns True on success; False or an exception counts as a failed attempt
+AlertStep = Callable[[], Awaitable[bool]]
+
+
+class AlertJob:
+    """Side effects of one triggered alert"""
+
+    def __init__(self, name: str, steps: Dict[str, AlertStep]):
+        self.name = name
+        self.steps = steps
+        self.published_at = time.monotonic()
+
+
+class AlertPipeline:
+    """Bounded alert queue drained by a pool of retrying workers"""
+
+    def __init__(self, workers: int = 4, max_queue: int = 1000, max_attempts: int = 3, retry_delay: float = 1.0):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._closed = False
+        self.stats = {
+            "published": 0,
+            "delivered": 0,
+            "failed": 0,              # jobs with at least one step that exhausted its attempts
+            "step_retries": 0,
+            "step_failures": 0,
+            "inline_deliveries": 0,   # published after shutdown began, delivered by the publisher
+            "backpressure_waits": 0,  # publishes that found the queue full
+            "backpressure_seconds": 0.0,
+            "max_queue_depth": 0,
+            "max_queue_latency_seconds": 0.0,
+        }
+
+    def start(self):
+        """Start the worker tasks on the running loop (no-op if running)"""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._closed = False
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def publish(self, name: str, steps: Dict[str, AlertStep]):
+        """Queue an alert's side effects, waiting for a free slot when the queue is full"""
+        job = AlertJob(name, steps)
+        self.stats["published"] += 1
+        if self._closed:
+            # Draining for shutdown: deliver directly so the alert is not dropped
+            self.stats["inline_deliveries"] += 1
+            await self._deliver(job)
+            return
+        self.start()
+        if self._queue.full():
+            self.stats["backpressure_waits"] += 1
+            started = time.monotonic()
+            await self._queue.put(job)
+            self.stats["backpressure_seconds"] = round(self.stats["backpressure_seconds"] + time.monotonic() - started, 3)
+        else:
+            self._queue.put_nowait(job)
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self._queue.qsize())
+
+    async def drain(self, timeout: float = 30):
+        """Stop accepting queued work, wait for queued and in-flight alerts, then stop the workers"""
+        self._closed = True
+        if self._queue is not None and self._tasks:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"❌ Alert pipeline drain timed out with {self._queue.qsize()} alerts still queued")
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                latency = time.monotonic() - job.published_at
+                self.stats["max_queue_latency_seconds"] = max(self.stats["max_queue_latency_seconds"], round(latency, 3))
+                await self._deliver(job)
+            except Exception as e:
+                logger.error(f"❌ Alert job {job.name} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, job: AlertJob):
+        results = await asyncio.gather(*(self._run_step(job, step_name, step) for step_name, step in job.steps.items()))
+        if all(results):
+            self.stats["delivered"] += 1
+        else:
+            self.stats["failed"] += 1
+
+    async def _run_step(self, job: AlertJob, step_name: str, step: AlertStep) -> bool:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                if await step():
+                    return True
+                error = "returned failure"
+            except Exception as e:
+                error = str(e)
+            if attempt < self.max_attempts:
+                self.stats["step_retries"] += 1
+                logger.warning(f"⚠️ Alert step {step_name} for {job.name} {error} (attempt {attempt}/{self.max_attempts}), retrying")
+                await asyncio.sleep(self.retry_delay * 2 ** (attempt - 1))
+        self.stats["step_failures"] += 1
+        logger.error(f"❌ Alert step {step_name} for {job.name} gave up after {self.max_attempts} attempts: {error}")
+        return False
+
+    def diagnostics(self) -> Dict:
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "draining": self._closed,
+        }
@@ -0,0 +1,226 @@
+"""
+Batch rule evaluation for Canary Contract Guardian
+
+MonitoringRules.check_all_rules and the check_* coroutines look at one contract at a time, so
+a cycle over thousands of contracts pays coroutine, logging and dict overhead per contract and
+per rule. A ContractShard holds the snapshots of many contracts as columns (one value per
+contract, plus event columns tagged with the owning contract's index) and evaluate_shard runs
+each of the seven rules once, as array operations across every contract, returning a compact
+ViolationTable. Requires NumPy.
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from columnar_rules import HAS_NUMPY, EventColumns, np, window_mask
+from monitoring_rules import (
+    BALANCE_DROP_THRESHOLD, FLASH_LOAN_AMOUNT_THRESHOLD, FLASH_LOAN_FOLLOWUP_WINDOW, FLASH_LOAN_MIN_FOLLOWUPS,
+    OWNERSHIP_KEYWORDS, PRICE_CHANGE_THRESHOLD, REENTRANCY_CALL_LIMIT, SUSPICIOUS_FUNCTIONS,
+    TRANSACTION_TIME_WINDOW, TRANSACTION_VOLUME_LIMIT,
+)
+from windowed_counter import BURST_WINDOW
+
+# Event kinds in a shard: contract_data key of the event list, and the field holding its type
+EVENT_KINDS = {
+    "transactions": ("recent_transactions", "type"),
+    "function_calls": ("function_calls", "type"),
+    "admin_events": ("admin_events", "event_type"),
+    "prices": ("price_data", "type"),
+}
+
+
+class ContractShard:
+    """Snapshots of a shard of contracts, stored as columns"""
+
+    def __init__(self, contract_ids: Sequence[str], balances, previous_balances=None):
+        if not HAS_NUMPY:
+            raise RuntimeError("NumPy is required for batch rule evaluation")
+        self.contract_ids = list(contract_ids)
+        self.balances = np.asarray(balances, dtype=np.float64)
+        self.previous_balances = self.balances.copy() if previous_balances is None else \
+            np.asarray(previous_balances, dtype=np.float64)
+        # kind -> (event columns, index of the owning contract for every row)
+        self.events: Dict[str, Tuple[EventColumns, "np.ndarray"]] = {
+            kind: (EventColumns((), type_field), np.zeros(0, dtype=np.int64))
+            for kind, (_, type_field) in EVENT_KINDS.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.contract_ids)
+
+    def set_events(self, kind: str, columns: EventColumns, owners):
+        self.events[kind] = (columns, np.asarray(owners, dtype=np.int64))
+
+    @classmethod
+    def from_snapshots(cls, snapshots: Dict[str, Dict],
+                       previous_balances: Optional[Dict[str, float]] = None) -> "ContractShard":
+        """Adapter from per-contract contract_data dicts (previous balance defaults to the current one)"""
+        contract_ids = list(snapshots)
+        balances = [snapshots[contract_id].get('balance', 0) for contract_id in contract_ids]
+        previous = None
+        if previous_balances:
+            previous = [previous_balances.get(contract_id, balance) for contract_id, balance in zip(contract_ids, balances)]
+        shard = cls(contract_ids, balances, previous)
+        for kind, (key, type_field) in EVENT_KINDS.items():
+            events: List[Dict] = []
+            counts = np.zeros(len(contract_ids), dtype=np.int64)
+            for index, contract_id in enumerate(contract_ids):
+                contract_events = snapshots[contract_id].get(key) or []
+                events.extend(contract_events)
+                counts[index] = len(contract_events)
+            shard.set_events(kind, EventColumns(events, type_field), np.repeat(np.arange(len(contract_ids)), counts))
+        return shard
+
+
+class ViolationTable:
+    """
+    Rule violations of a shard, one row per (contract, rule): contract index, rule id, the
+    measured value (drop ratio, event count, timestamp, follow-ups, price change) and the row of
+    the triggering event in that rule's event columns (-1 for rules 1 and 2)
+    """
+
+    def __init__(self, contract_ids: List[str], contracts, rule_ids, values, rows):
+        order = np.lexsort((rule_ids, contracts))
+        self.contract_ids = contract_ids
+        self.contracts = contracts[order]
+        self.rule_ids = rule_ids[order]
+        self.values = values[order]
+        self.rows = rows[order]
+
+    def __len__(self) -> int:
+        return len(self.contracts)
+
+    def to_records(self) -> List[Tuple[str, int, float, int]]:
+        """(contract id, rule id, value, event row) per violation"""
+        return [(self.contract_ids[contract], int(rule_id), float(value), int(row))
+                for contract, rule_id, value, row in zip(self.contracts, self.rule_ids, self.values, self.rows)]
+
+    def counts_by_rule(self) -> Dict[int, int]:
+        rule_ids, counts = np.unique(self.rule_ids, return_counts=True)
+        return {int(rule_id): int(count) for rule_id, count in zip(rule_ids, counts)}
+
+
+def _first_per_contract(owners, hits):
+    """For candidate rows `hits` (in preference order), the first one of each contract: (contracts, positions in hits)"""
+    contracts, first = np.unique(owners[hits], return_index=True)
+    return contracts, first
+
+
+def _balance_drop(shard: ContractShard, now: float):
+    previous, current = shard.previous_balances, shard.balances
+    drop = np.zeros(len(shard))
+    np.divide(previous - current, previous, out=drop, where=previous != 0)
+    contracts = np.flatnonzero((previous != 0) & (drop > BALANCE_DROP_THRESHOLD))
+    return contracts, drop[contracts], np.full(len(contracts), -1)
+
+
+def _transaction_volume(shard: ContractShard, now: float):
+    columns, owners = shard.events["transactions"]
+    counts = np.bincount(owners[window_mask(columns, now, TRANSACTION_TIME_WINDOW)], minlength=len(shard))
+    contracts = np.flatnonzero(counts > TRANSACTION_VOLUME_LIMIT)
+    return contracts, counts[contracts].astype(np.float64), np.full(len(contracts), -1)
+
+
+def _suspicious_function_calls(shard: ContractShard, now: float):
+    columns, owners = shard.events["function_calls"]
+    mask = window_mask(columns, now, TRANSACTION_TIME_WINDOW) & \
+        columns.type_mask(lambda name: name == 'function_call') & \
+        columns.function_mask(lambda name: any(fragment in name.lower() for fragment in SUSPICIOUS_FUNCTIONS))
+    hits = np.flatnonzero(mask)
+    # Earliest call per contract, as check_function_calls reports it
+    hits = hits[np.argsort(columns.timestamps[hits], kind="stable")]
+    contracts, first = _first_per_contract(owners, hits)
+    return contracts, columns.timestamps[hits[first]], hits[first]
+
+
+def _reentrancy(shard: ContractShard, now: float):
+    columns, owners = shard.events["function_calls"]
+    rows = np.flatnonzero(window_mask(columns, now, TRANSACTION_TIME_WINDOW) & columns.function_mask(bool))
+    if not len(rows):
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64)
+    function_codes = columns.function_codes[rows]
+    rows = rows[np.lexsort((columns.timestamps[rows], function_codes, owners[rows]))]
+    timestamps, function_codes, row_owners = columns.timestamps[rows], columns.function_codes[rows], owners[rows]
+    # Groups of calls to one function of one contract, in time order
+    boundaries = np.flatnonzero((row_owners[1:] != row_owners[:-1]) | (function_codes[1:] != function_codes[:-1])) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(rows)]))
+    counts = ends - starts
+    groups = np.flatnonzero((counts >= REENTRANCY_CALL_LIMIT) & (timestamps[ends - 1] - timestamps[starts] < BURST_WINDOW))
+    contracts, first = _first_per_contract(row_owners, starts[groups])
+    return contracts, counts[groups[first]].astype(np.float64), rows[starts[groups[first]]]
+
+
+def _flash_loan(shard: ContractShard, now: float):
+    columns, owners = shard.events["transactions"]
+    rows = np.flatnonzero(window_mask(columns, now, TRANSACTION_TIME_WINDOW))
+    if not len(rows):
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0, dtype=np.int64)
+    rows = rows[np.lexsort((columns.timestamps[rows], owners[rows]))]
+    timestamps, row_owners = columns.timestamps[rows], owners[rows]
+    # One sorted key across the shard: each contract gets a slot wider than its time range plus
+    # the follow-up window, so a loan's window end never runs into the next contract
+    offsets = timestamps - timestamps.min()
+    slot = offsets.max() + FLASH_LOAN_FOLLOWUP_WINDOW + 1
+    keys = row_owners * slot + offsets
+    loans = (columns.amounts[rows] > FLASH_LOAN_AMOUNT_THRESHOLD) & \
+        columns.type_mask(lambda name: 'borrow' in name or 'loan' in name)[rows]
+    loan_positions = np.flatnonzero(loans)
+    followups = np.searchsorted(keys, keys[loan_positions] + FLASH_LOAN_FOLLOWUP_WINDOW, side='left') - loan_positions - 1
+    ok = followups >= FLASH_LOAN_MIN_FOLLOWUPS
+    hits, followups = loan_positions[ok], followups[ok]
+    contracts, first = _first_per_contract(row_owners, hits)
+    return contracts, followups[first].astype(np.float64), rows[hits[first]]
+
+
+def _ownership_change(shard: ContractShard, now: float):
+    columns, owners = shard.events["admin_events"]
+
+    def matches(name) -> bool:
+        return any(keyword in str(name).lower() for keyword in OWNERSHIP_KEYWORDS)
+
+    mask = window_mask(columns, now, TRANSACTION_TIME_WINDOW) & (columns.type_mask(matches) | columns.function_mask(matches))
+    hits = np.flatnonzero(mask)
+    # Earliest call per contract, as check_function_calls reports it
+    hits = hits[np.argsort(columns.timestamps[hits], kind="stable")]
+    contracts, first = _first_per_contract(owners, hits)
+    return contracts, columns.timestamps[hits[first]], hits[first]
+
+
+def _price_manipulation(shard: ContractShard, now: float):
+    columns, owners = shard.events["prices"]
+    rows = np.flatnonzero(window_mask(columns, now, TRANSACTION_TIME_WINDOW))
+    rows = rows[np.lexsort((columns.timestamps[rows], owners[rows]))]
+    prices, row_owners = columns.prices[rows], owners[rows]
+    previous, current = prices[:-1], prices[1:]
+    change = np.zeros(len(current))
+    np.divide(np.abs(current - previous), previous, out=change, where=previous > 0)
+    # Pair i compares rows i and i + 1; pairs spanning two contracts do not count
+    hits = np.flatnonzero((row_owners[1:] == row_owners[:-1]) & (change > PRICE_CHANGE_THRESHOLD))
+    contracts, first = _first_per_contract(row_owners[1:], hits)
+    return contracts, change[hits[first]], rows[hits[first] + 1]
+
+
+BATCH_RULES = (
+    (1, _balance_drop),
+    (2, _transaction_volume),
+    (3, _suspicious_function_calls),
+    (4, _reentrancy),
+    (5, _flash_loan),
+    (6, _ownership_change),
+    (7, _price_manipulation),
+)
+
+
+def evaluate_shard(shard: ContractShard, now: Optional[float] = None) -> ViolationTable:
+    """Run every rule across all contracts of the shard"""
+    now = time.time() if now is None else now
+    contracts, rule_ids, values, rows = [], [], [], []
+    for rule_id, rule in BATCH_RULES:
+        rule_contracts, rule_values, rule_rows = rule(shard, now)
+        contracts.append(np.asarray(rule_contracts, dtype=np.int64))
+        rule_ids.append(np.full(len(rule_contracts), rule_id, dtype=np.int8))
+        values.append(np.asarray(rule_values, dtype=np.float64))
+        rows.append(np.asarray(rule_rows, dtype=np.int64))
+    return ViolationTable(shard.contract_ids, np.concatenate(contracts), np.concatenate(rule_ids),
+                          np.concatenate(values), np.concatenate(rows))
@@ -0,0 +1,79 @@
+"""
+Canister call lanes for Canary Contract Guardian
+
+Query calls answer in milliseconds from a single replica; update calls wait for consensus
+and take seconds. Each kind gets its own lane with its own concurrency limit, so a backlog
+of alert writes queues in the update lane while the reads detection depends on keep
+flowing through the query lane. Every lane reports its queue depth, wait time and latency.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+LANE_QUERY = "query"
+LANE_UPDATE = "update"
+
+
+class CallLane:
+    """Bounded-concurrency executor for one class of canister calls"""
+
+    def __init__(self, name: str, concurrency: int, latency_samples: int = 200):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        self.stats = {"calls": 0, "max_queue_depth": 0, "max_wait_seconds": 0.0, "max_latency_seconds": 0.0}
+        self._waits: deque = deque(maxlen=latency_samples)
+        self._latencies: deque = deque(maxlen=latency_samples)
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Run call() once a slot in this lane is free"""
+        queued_at = time.monotonic()
+        if self._semaphore.locked():
+            # All slots busy: this call queues
+            self.waiting += 1
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], self.waiting)
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        started_at = time.monotonic()
+        wait = started_at - queued_at
+        self._waits.append(wait)
+        self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], round(wait, 3))
+        self.in_flight += 1
+        try:
+            return await call()
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            latency = time.monotonic() - started_at
+            self._latencies.append(latency)
+            self.stats["calls"] += 1
+            self.stats["max_latency_seconds"] = max(self.stats["max_latency_seconds"], round(latency, 3))
+
+    @staticmethod
+    def _percentile(samples: deque, fraction: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+    def diagnostics(self) -> Dict:
+        return {
+            **self.stats,
+            "concurrency": self.concurrency,
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "p50_wait_seconds": self._percentile(self._waits, 0.5),
+            "p95_wait_seconds": self._percentile(self._waits, 0.95),
+            "p50_latency_seconds": self._percentile(self._latencies, 0.5),
+            "p95_latency_seconds": self._percentile(self._latencies, 0.95),
+        }
@@ -0,0 +1,545 @@
+"""
+Candid binary codec for the native IC HTTP transport in Canary Contract Guardian
+
+Encodes call arguments given in the same Candid text form that ``dfx canister call``
+accepts, decodes binary replies and renders them back to dfx-style Candid text so the
+existing response parsers keep working unchanged.
+"""
+
+import re
+import struct
+import base64
+import zlib
+from typing import Dict, List, Tuple, Any
+
+from candid_parser import unescape_text, quote_text
+
+MAGIC = b"DIDL"
+
+# Primitive type opcodes (signed LEB128 in the type table)
+PRIMITIVE_OPCODES = {
+    "null": -1, "bool": -2, "nat": -3, "int": -4,
+    "nat8": -5, "nat16": -6, "nat32": -7, "nat64": -8,
+    "int8": -9, "int16": -10, "int32": -11, "int64": -12,
+    "float32": -13, "float64": -14, "text": -15,
+    "reserved": -16, "empty": -17, "principal": -24,
+}
+OPCODE_PRIMITIVES = {code: name for name, code in PRIMITIVE_OPCODES.items()}
+OPT, VEC, RECORD, VARIANT = -18, -19, -20, -21
+
+FIXED_WIDTH = {
+    "nat8": "<B", "nat16": "<H", "nat32": "<I", "nat64": "<Q",
+    "int8": "<b", "int16": "<h", "int32": "<i", "int64": "<q",
+    "float32": "<f", "float64": "<d",
+}
+
+# Field names used by the backend and dummy canister interfaces. Candid only
+# transmits label hashes, so these are needed to render replies with names.
+KNOWN_FIELD_NAMES = (
+    # ApiResponse / Result
+    "ok", "err",
+    # Contract
+    "id", "address", "nickname", "status", "addedAt", "lastCheck", "alertCount",
+    "isActive", "isPaused", "quarantinedAddresses",
+    # ContractStatus
+    "healthy", "warning", "critical", "offline",
+    # Alert / AlertData
+    "contractId", "contractAddress", "contractNickname", "ruleId", "ruleName",
+    "title", "description", "severity", "timestamp", "acknowledged", "data",
+    "balanceChange", "previousBalance", "currentBalance", "percentageChange",
+    "transactionSpike", "transactionCount", "timeWindow", "normalVolume",
+    "functionCall", "functionName", "caller", "gasUsed", "custom", "details",
+    # MonitoringRule / RuleType
+    "name", "ruleType", "enabled", "threshold",
+    # AlertPage / ContractPage
+    "alerts", "nextCursor", "hasMore", "totalAlerts", "revision", "contracts", "totalContracts",
+    "balanceCheck", "transactionVolume",
+    # Dummy contract getContractInfo
+    "balance", "transactions", "lastActivity", "isUpgrading", "reentrancyCallCount",
+    "flashLoanActive", "ownershipChangeCount", "priceManipulationActive",
+)
+
+
+class CandidError(Exception):
+    """Raised when Candid data cannot be encoded or decoded"""
+
+
+def idl_hash(name: str) -> int:
+    """Compute the Candid field label hash for a field name"""
+    h = 0
+    for byte in name.encode("utf-8"):
+        h = (h * 223 + byte) & 0xFFFFFFFF
+    return h
+
+
+FIELD_LABELS: Dict[int, str] = {idl_hash(name): name for name in KNOWN_FIELD_NAMES}
+
+
+def register_field_names(*names: str):
+    """Make additional field names available when rendering decoded replies"""
+    for name in names:
+        FIELD_LABELS[idl_hash(name)] = name
+
+
+# ============================================================================
+# LEB128
+# ============================================================================
+
+def encode_uleb128(value: int) -> bytes:
+    if value < 0:
+        raise CandidError(f"Cannot encode negative value {value} as nat")
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def encode_sleb128(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if (value == 0 and not byte & 0x40) or (value == -1 and byte & 0x40):
+            out.append(byte)
+            return bytes(out)
+        out.append(byte | 0x80)
+
+
+class _Reader:
+    """Cursor over a Candid message"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def read(self, size: int) -> bytes:
+        if self.pos + size > len(self.data):
+            raise CandidError("Unexpected end of Candid message")
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def byte(self) -> int:
+        return self.read(1)[0]
+
+    def uleb(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self.byte()
+            result |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                return result
+
+    def sleb(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self.byte()
+            result |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                if byte & 0x40:
+                    result -= 1 << shift
+                return result
+
+
+# ============================================================================
+# PRINCIPALS
+# ============================================================================
+
+def principal_to_bytes(text: str) -> bytes:
+    """Decode a textual principal (e.g. 'uxrrr-q7777-77774-qaaaq-cai') to raw bytes"""
+    compact = text.replace("-", "").upper()
+    padded = compact + "=" * (-len(compact) % 8)
+    try:
+        raw = base64.b32decode(padded)
+    except Exception as e:
+        raise CandidError(f"Invalid principal '{text}': {e}")
+    if len(raw) < 4:
+        raise CandidError(f"Invalid principal '{text}'")
+    body = raw[4:]
+    if zlib.crc32(body).to_bytes(4, "big") != raw[:4]:
+        raise CandidError(f"Invalid principal checksum for '{text}'")
+    return body
+
+
+def principal_to_text(raw: bytes) -> str:
+    """Encode raw principal bytes in the dashed textual form"""
+    checksum = zlib.crc32(raw).to_bytes(4, "big")
+    encoded = base64.b32encode(checksum + raw).decode("ascii").lower().rstrip("=")
+    return "-".join(encoded[i:i + 5] for i in range(0, len(encoded), 5))
+
+
+# ============================================================================
+# CANDID TEXT ARGUMENTS (the subset accepted by `dfx canister call`)
+# ============================================================================
+
+_TOKEN_RE = re.compile(r'''
+    \s*(?:
+      (?P<text>"(?:[^"\\]|\\.)*")
+    | (?P<number>[+-]?(?:0x[0-9a-fA-F_]+|[0-9][0-9_]*(?:\.[0-9_]*)?(?:[eE][+-]?[0-9]+)?))
+    | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+    | (?P<punct>[(){};=:,])
+    )''', re.VERBOSE)
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise CandidError(f"Unexpected character in Candid arguments at {pos}: {text[pos:pos + 10]!r}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        pos = match.end()
+    return tokens
+
+
+class _ArgParser:
+    """Parses Candid text arguments into (type, value) pairs ready for encoding"""
+
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self, offset: int = 0) -> Tuple[str, str]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else ("eof", "")
+
+    def next(self) -> Tuple[str, str]:
+        token = self.peek()
+        self.pos += 1
+        return token
+
+    def expect(self, value: str):
+        token = self.next()
+        if token[1] != value:
+            raise CandidError(f"Expected '{value}' but found '{token[1]}'")
+
+    def parse_args(self) -> List[Tuple[Any, Any]]:
+        args = []
+        if self.peek()[1] == "(":
+            self.next()
+            while self.peek()[1] != ")":
+                args.append(self.parse_annotated())
+                if self.peek()[1] == ",":
+                    self.next()
+            self.expect(")")
+        elif self.peek()[0] != "eof":
+            # dfx also accepts a single bare value, e.g. `5 : nat`
+            args.append(self.parse_annotated())
+        if self.peek()[0] != "eof":
+            raise CandidError(f"Unexpected trailing input '{self.peek()[1]}'")
+        return args
+
+    def parse_annotated(self) -> Tuple[Any, Any]:
+        value_type, value = self.parse_value()
+        if self.peek()[1] == ":":
+            self.next()
+            annotation = self.next()[1]
+            value_type, value = _coerce(annotation, value_type, value)
+        return value_type, value
+
+    def parse_value(self) -> Tuple[Any, Any]:
+        kind, token = self.next()
+        if kind == "text":
+            return "text", unescape_text(token[1:-1])
+        if kind == "number":
+            return _number(token)
+        if token in ("true", "false"):
+            return "bool", token == "true"
+        if token == "null":
+            return "null", None
+        if token == "opt":
+            inner_type, inner_value = self.parse_annotated()
+            return ("opt", inner_type), inner_value
+        if token == "principal":
+            kind, literal = self.next()
+            return "principal", principal_to_bytes(unescape_text(literal[1:-1]))
+        if token == "vec":
+            return self.parse_vec()
+        if token == "record":
+            return self.parse_fields(RECORD)
+        if token == "variant":
+            return self.parse_fields(VARIANT)
+        raise CandidError(f"Unsupported Candid value '{token}'")
+
+    def parse_vec(self) -> Tuple[Any, Any]:
+        self.expect("{")
+        items = []
+        while self.peek()[1] != "}":
+            items.append(self.parse_annotated())
+            if self.peek()[1] == ";":
+                self.next()
+        self.expect("}")
+        element_type = items[0][0] if items else "empty"
+        return ("vec", element_type), [value for _, value in items]
+
+    def parse_fields(self, opcode: int) -> Tuple[Any, Any]:
+        self.expect("{")
+        fields = {}
+        position = 0
+        while self.peek()[1] != "}":
+            kind, token = self.peek()
+            if self.peek(1)[1] == "=":
+                self.next()
+                self.next()
+                label = int(token.replace("_", "")) if kind == "number" else idl_hash(token)
+                fields[label] = self.parse_annotated()
+            elif opcode == VARIANT and kind == "ident":
+                # `variant { healthy }` is shorthand for a null payload
+                self.next()
+                fields[idl_hash(token)] = ("null", None)
+            else:
+                fields[position] = self.parse_annotated()
+                position += 1
+            if self.peek()[1] == ";":
+                self.next()
+        self.expect("}")
+        labels = sorted(fields)
+        field_types = tuple((label, fields[label][0]) for label in labels)
+        if opcode == VARIANT:
+            if len(labels) != 1:
+                raise CandidError("A variant value must have exactly one field")
+            return ("variant", field_types), (0, fields[labels[0]][1])
+        return ("record", field_types), [fields[label][1] for label in labels]
+
+
+def _number(token: str) -> Tuple[str, Any]:
+    cleaned = token.replace("_", "")
+    if cleaned.lower().lstrip("+-").startswith("0x"):
+        value = int(cleaned, 16)
+    elif any(c in cleaned for c in ".eE"):
+        return "float64", float(cleaned)
+    else:
+        value = int(cleaned)
+    # The backend interface uses nat everywhere, so bare non-negative literals are nats
+    return ("nat" if value >= 0 else "int"), value
+
+
+def _coerce(annotation: str, value_type: Any, value: Any) -> Tuple[str, Any]:
+    if annotation not in PRIMITIVE_OPCODES:
+        raise CandidError(f"Unsupported type annotation '{annotation}'")
+    if annotation.startswith("float"):
+        return annotation, float(value)
+    if annotation in ("nat", "int") or annotation in FIXED_WIDTH:
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise CandidError(f"Value {value!r} cannot be annotated as {annotation}")
+        if annotation.startswith("nat") and value < 0:
+            raise CandidError(f"Negative value {value} cannot be annotated as {annotation}")
+    return annotation, value
+
+
+def parse_text_args(text: str) -> List[Tuple[Any, Any]]:
+    """Parse Candid text arguments such as '(1 : nat, variant { warning })'"""
+    return _ArgParser(text or "()").parse_args()
+
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+
+class _TypeTable:
+    def __init__(self):
+        self.entries: List[bytes] = []
+        self.index: Dict[Any, int] = {}
+
+    def ref(self, value_type: Any) -> bytes:
+        """Return the type reference for a type, registering compound types"""
+        if isinstance(value_type, str):
+            return encode_sleb128(PRIMITIVE_OPCODES[value_type])
+        if value_type in self.index:
+            return encode_sleb128(self.index[value_type])
+        slot = len(self.entries)
+        self.index[value_type] = slot
+        self.entries.append(b"")
+        kind = value_type[0]
+        if kind in ("opt", "vec"):
+            entry = encode_sleb128(OPT if kind == "opt" else VEC) + self.ref(value_type[1])
+        else:
+            entry = encode_sleb128(RECORD if kind == "record" else VARIANT)
+            entry += encode_uleb128(len(value_type[1]))
+            for label, field_type in value_type[1]:
+                entry += encode_uleb128(label) + self.ref(field_type)
+        self.entries[slot] = entry
+        return encode_sleb128(slot)
+
+
+def _encode_value(value_type: Any, value: Any) -> bytes:
+    if isinstance(value_type, str):
+        if value_type in ("null", "reserved"):
+            return b""
+        if value_type == "bool":
+            return b"\x01" if value else b"\x00"
+        if value_type == "nat":
+            return encode_uleb128(value)
+        if value_type == "int":
+            return encode_sleb128(value)
+        if value_type in FIXED_WIDTH:
+            return struct.pack(FIXED_WIDTH[value_type], value)
+        if value_type == "text":
+            raw = value.encode("utf-8")
+            return encode_uleb128(len(raw)) + raw
+        if value_type == "principal":
+            return b"\x01" + encode_uleb128(len(value)) + value
+        raise CandidError(f"Cannot encode value of type {value_type}")
+    kind = value_type[0]
+    if kind == "opt":
+        return b"\x00" if value is None else b"\x01" + _encode_value(value_type[1], value)
+    if kind == "vec":
+        return encode_uleb128(len(value)) + b"".join(_encode_value(value_type[1], item) for item in value)
+    if kind == "record":
+        return b"".join(_encode_value(field_type, item) for (_, field_type), item in zip(value_type[1], value))
+    index, payload = value
+    return encode_uleb128(index) + _encode_value(value_type[1][index][1], payload)
+
+
+def encode_args(args: List[Tuple[Any, Any]]) -> bytes:
+    """Encode (type, value) pairs as a Candid message"""
+    table = _TypeTable()
+    arg_refs = [table.ref(value_type) for value_type, _ in args]
+    body = b"".join(_encode_value(value_type, value) for value_type, value in args)
+    return (MAGIC + encode_uleb128(len(table.entries)) + b"".join(table.entries)
+            + encode_uleb128(len(args)) + b"".join(arg_refs) + body)
+
+
+def encode_text_args(text: str) -> bytes:
+    """Encode Candid text arguments directly to a binary Candid message"""
+    return encode_args(parse_text_args(text))
+
+
+# ============================================================================
+# DECODING
+# ============================================================================
+
+def decode_args(data: bytes) -> List[Tuple[Any, Any]]:
+    """Decode a Candid message into (type, value) pairs"""
+    reader = _Reader(data)
+    if reader.read(4) != MAGIC:
+        raise CandidError("Missing DIDL magic bytes")
+
+    raw_table = []
+    for _ in range(reader.uleb()):
+        opcode = reader.sleb()
+        if opcode in (OPT, VEC):
+            raw_table.append((opcode, reader.sleb()))
+        elif opcode in (RECORD, VARIANT):
+            fields = tuple((reader.uleb(), reader.sleb()) for _ in range(reader.uleb()))
+            raw_table.append((opcode, fields))
+        else:
+            raise CandidError(f"Unsupported type opcode {opcode} in type table")
+
+    resolved: Dict[int, Any] = {}
+
+    def resolve(ref: int, depth: int = 0) -> Any:
+        if ref < 0:
+            if ref not in OPCODE_PRIMITIVES:
+                raise CandidError(f"Unsupported primitive type {ref}")
+            return OPCODE_PRIMITIVES[ref]
+        if ref in resolved:
+            return resolved[ref]
+        if depth > 64:
+            raise CandidError("Recursive Candid types are not supported")
+        opcode, spec = raw_table[ref]
+        if opcode == OPT:
+            result = ("opt", resolve(spec, depth + 1))
+        elif opcode == VEC:
+            result = ("vec", resolve(spec, depth + 1))
+        else:
+            kind = "record" if opcode == RECORD else "variant"
+            result = (kind, tuple((label, resolve(t, depth + 1)) for label, t in spec))
+        resolved[ref] = result
+        return result
+
+    arg_types = [resolve(reader.sleb()) for _ in range(reader.uleb())]
+    return [(arg_type, _decode_value(reader, arg_type)) for arg_type in arg_types]
+
+
+def _decode_value(reader: _Reader, value_type: Any) -> Any:
+    if isinstance(value_type, str):
+        if value_type in ("null", "reserved"):
+            return None
+        if value_type == "bool":
+            return reader.byte() == 1
+        if value_type == "nat":
+            return reader.uleb()
+        if value_type == "int":
+            return reader.sleb()
+        if value_type in FIXED_WIDTH:
+            fmt = FIXED_WIDTH[value_type]
+            return struct.unpack(fmt, reader.read(struct.calcsize(fmt)))[0]
+        if value_type == "text":
+            return reader.read(reader.uleb()).decode("utf-8")
+        if value_type == "principal":
+            if reader.byte() != 1:
+                raise CandidError("Opaque principal references are not supported")
+            return reader.read(reader.uleb())
+        raise CandidError(f"Cannot decode value of type {value_type}")
+    kind = value_type[0]
+    if kind == "opt":
+        return _decode_value(reader, value_type[1]) if reader.byte() == 1 else None
+    if kind == "vec":
+        if value_type[1] == "nat8":
+            return reader.read(reader.uleb())
+        return [_decode_value(reader, value_type[1]) for _ in range(reader.uleb())]
+    if kind == "record":
+        return [_decode_value(reader, field_type) for _, field_type in value_type[1]]
+    index = reader.uleb()
+    return index, _decode_value(reader, value_type[1][index][1])
+
+
+# ============================================================================
+# RENDERING (dfx-compatible Candid text)
+# ============================================================================
+
+def _label(label: int) -> str:
+    return FIELD_LABELS.get(label, f"_{label}_")
+
+
+def render_value(value_type: Any, value: Any) -> str:
+    """Render a decoded value the way dfx prints it"""
+    if isinstance(value_type, str):
+        if value_type == "null":
+            return "null"
+        if value_type == "reserved":
+            return "null : reserved"
+        if value_type == "bool":
+            return "true" if value else "false"
+        if value_type == "text":
+            return quote_text(value)
+        if value_type == "principal":
+            return f'principal "{principal_to_text(value)}"'
+        return f"{value} : {value_type}"
+    kind = value_type[0]
+    if kind == "opt":
+        return "null" if value is None else f"opt {render_value(value_type[1], value)}"
+    if kind == "vec":
+        if value_type[1] == "nat8":
+            return 'blob "' + "".join(f"\\{b:02x}" for b in value) + '"'
+        items = "".join(f" {render_value(value_type[1], item)};" for item in value)
+        return f"vec {{{items} }}" if items else "vec {}"
+    if kind == "record":
+        fields = value_type[1]
+        is_tuple = all(label == i for i, (label, _) in enumerate(fields))
+        parts = []
+        for (label, field_type), item in zip(fields, value):
+            rendered = render_value(field_type, item)
+            parts.append(f" {rendered};" if is_tuple else f" {_label(label)} = {rendered};")
+        return f"record {{{''.join(parts)} }}" if parts else "record {}"
+    index, payload = value
+    label, payload_type = value_type[1][index]
+    if payload_type == "null":
+        return f"variant {{ {_label(label)} }}"
+    return f"variant {{ {_label(label)} = {render_value(payload_type, payload)} }}"
+
+
+def render_args(args: List[Tuple[Any, Any]]) -> str:
+    """Render decoded reply arguments as a dfx-style tuple"""
+    return "(" + ", ".join(render_value(value_type, value) for value_type, value in args) + ")"
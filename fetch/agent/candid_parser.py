@@ -0,0 +1,248 @@
+"""
+Single-pass Candid text parser for Canary Contract Guardian
+
+Turns the textual Candid that `dfx canister call` prints into plain Python values in
+one scan of the output:
+
+- record          -> dict (field name -> value; positional fields keyed 0, 1, ...)
+- variant         -> single-key dict ({"healthy": None}, {"ok": {...}})
+- vec / tuple     -> list
+- opt v / null    -> v / None
+- nat / int       -> int ("1_000 : nat" -> 1000)
+- float           -> float
+- text            -> str (escapes decoded)
+- bool            -> bool
+- principal "..." -> str
+- blob "..."      -> bytes
+
+`dfx canister call --output json` replies are accepted too (see parse_dfx_output); there
+nat/int arrive as decimal strings and opt as a 0/1-element list, so use as_int for numbers.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class CandidParseError(ValueError):
+    """Raised when Candid text cannot be parsed"""
+
+
+# One token per match, returned by findall as (label, number, text, tag, opener, word, punct, other).
+# Separators and whitespace are skipped in the prefix, a field label is folded into the value it
+# names and type annotations are folded into numbers. `record {` / `variant {` / `vec {` are one
+# token and so is a variant without payload (`variant { healthy }`): Python pays per match, so
+# fewer tokens per record is what keeps this pass ahead of a regex per field.
+_TOKEN_RE = re.compile(r'''
+    [\s;,]*
+    (?:(\w+)\s*=\s*)?
+    (?:
+      ([+-]?(?:0x[0-9a-fA-F_]+|[0-9][0-9_]*(?:\.[0-9_]*)?(?:[eE][+-]?[0-9]+)?))(?:\s*:\s*\w+)?
+    | ("[^"\\]*(?:\\.[^"\\]*)*")
+    | variant\s*\{\s*([A-Za-z_]\w*)\s*\}
+    | (record|variant|vec)\s*\{
+    | ([A-Za-z_]\w*)
+    | ([}()]|:\s*\w+)
+    | (\S)
+    )''', re.VERBOSE | re.ASCII)
+
+_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", "\\": "\\", '"': '"', "'": "'"}
+_HEX_PAIR = re.compile(r"[0-9a-fA-F]{2}")
+
+
+def _unescape_bytes(literal: str) -> bytes:
+    out = bytearray()
+    i = 0
+    length = len(literal)
+    while i < length:
+        char = literal[i]
+        if char != "\\":
+            out += char.encode("utf-8")
+            i += 1
+            continue
+        nxt = literal[i + 1:i + 2]
+        if nxt in _ESCAPES:
+            out += _ESCAPES[nxt].encode("utf-8")
+            i += 2
+        elif nxt == "u" and literal[i + 2:i + 3] == "{":
+            end = literal.index("}", i)
+            out += chr(int(literal[i + 3:end].replace("_", ""), 16)).encode("utf-8")
+            i = end + 1
+        elif _HEX_PAIR.match(literal, i + 1):
+            out.append(int(literal[i + 1:i + 3], 16))
+            i += 3
+        else:
+            raise CandidParseError(f"Invalid escape in text literal: {literal[i:i + 4]!r}")
+    return bytes(out)
+
+
+def unescape_text(literal: str) -> str:
+    """Decode the body of a quoted Candid text literal"""
+    if "\\" not in literal:
+        return literal
+    try:
+        return _unescape_bytes(literal).decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise CandidParseError(f"Text literal is not valid UTF-8: {e}")
+
+
+def quote_text(value: str) -> str:
+    """Render a Python string as a quoted Candid text literal"""
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n").replace("\t", "\\t").replace("\r", "\\r")
+    return f'"{escaped}"'
+
+
+def _number(digits: str) -> Any:
+    if "_" in digits:
+        digits = digits.replace("_", "")
+    try:
+        return int(digits)
+    except ValueError:
+        pass
+    if digits.lstrip("+-")[:2].lower() == "0x":
+        return int(digits, 16)
+    return float(digits)
+
+
+def parse_candid(text: str) -> List[Any]:
+    """Parse dfx Candid output into a list of argument values in a single pass"""
+    root: List[Any] = []
+    stack: List[Any] = [root]
+    positions: List[int] = [0]    # next positional label for tuple-style records
+    container: Any = root
+    held_label = ""               # label seen before an `opt`/`principal`/`blob` prefix
+    wrap: Optional[str] = None    # 'principal' or 'blob' applied to the next text literal
+    dict_type = dict
+    opening = None                # record/variant/vec value whose '{' was just read
+
+    for label, digits, quoted, tag, opener, word, punct, other in _TOKEN_RE.findall(text):
+        if held_label:
+            label = label or held_label
+            held_label = ""
+        if digits:
+            try:
+                value = int(digits)
+            except ValueError:
+                value = _number(digits)
+        elif quoted:
+            value = quoted[1:-1]
+            if wrap == "blob":
+                value = _unescape_bytes(value)
+            elif "\\" in value:
+                value = unescape_text(value)
+            wrap = None
+        elif tag:
+            value = {tag: None}
+        elif opener:
+            value = opening = [] if opener == "vec" else {}
+        elif word:
+            if word == "true":
+                value = True
+            elif word == "false":
+                value = False
+            elif word == "null":
+                value = None
+            elif word == "opt":
+                held_label = label
+                continue
+            elif word == "principal" or word == "blob":
+                held_label = label
+                wrap = word
+                continue
+            elif type(container) is dict_type and not label:
+                # `variant { ok }` among other fields — a field with no payload
+                container[word] = None
+                continue
+            else:
+                raise CandidParseError(f"Unexpected word '{word}'")
+        elif punct:
+            if punct == "}":
+                if len(stack) == 1:
+                    raise CandidParseError("Unbalanced '}'")
+                stack.pop()
+                positions.pop()
+                container = stack[-1]
+            elif punct in "()" and len(stack) != 1:
+                raise CandidParseError(f"Unexpected '{punct}' inside a value")
+            continue
+        elif other == ";" or other == ",":
+            continue    # trailing separator at the end of the input
+        else:
+            raise CandidParseError(f"Unexpected character {other!r}")
+
+        if type(container) is dict_type:
+            if not label:
+                label = positions[-1]
+                positions[-1] += 1
+            elif label[0].isdigit():
+                label = int(label)
+            container[label] = value
+        else:
+            container.append(value)
+        if opening is not None:
+            stack.append(opening)
+            positions.append(0)
+            container = opening
+            opening = None
+
+    if len(stack) != 1:
+        raise CandidParseError("Unexpected end of input: unclosed '{'")
+    return root
+
+
+def variant_tag(value: Any) -> Optional[str]:
+    """Return the tag of a parsed variant ({'healthy': None} -> 'healthy')"""
+    if isinstance(value, dict) and len(value) == 1:
+        return next(iter(value))
+    return None
+
+
+def iter_records(values: List[Any]) -> Iterator[Dict]:
+    """Yield the records in a parsed reply: a vec of records, a single record or variant { ok = record }"""
+    if not values:
+        return
+    value = values[0]
+    if isinstance(value, dict) and len(value) == 1 and "ok" in value:
+        value = value["ok"]
+    if isinstance(value, list):
+        for item in value:
+            if isinstance(item, dict):
+                yield item
+    elif isinstance(value, dict):
+        yield value
+
+
+def parse_dfx_output(output: str) -> List[Any]:
+    """Parse dfx output in either Candid text or `--output json` form into argument values"""
+    output = output.strip()
+    if not output or output.startswith("("):
+        return parse_candid(output)
+    try:
+        # A single return value is printed as bare JSON
+        return [json.loads(output)]
+    except ValueError as e:
+        raise CandidParseError(f"Invalid dfx JSON output: {e}")
+
+
+def as_int(value: Any, default: Optional[int] = None) -> Optional[int]:
+    """Coerce a decoded nat/int (int, or decimal string from JSON output) to int"""
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            return int(value.replace("_", ""))
+        except ValueError:
+            return default
+    return default
+
+
+def result_variant(values: List[Any]) -> Tuple[Optional[str], Any]:
+    """Split a Result-style reply (variant { ok = ... } / variant { err = ... }) into (tag, payload)"""
+    if not values:
+        return None, None
+    tag = variant_tag(values[0])
+    return tag, (values[0][tag] if tag is not None else None)
@@ -1,66 +1,284 @@
-import subprocess
 import json
-from typing import Dict, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 import time
 import asyncio
+import statistics
+from collections import deque
+
+from candid_parser import parse_dfx_output, iter_records, variant_tag, as_int, result_variant, quote_text
+from retry_policy import RetryPolicy, CanisterCallError, CircuitOpenError, classify_error, ERROR_EXPIRY
+from call_lanes import CallLane, LANE_QUERY, LANE_UPDATE
 
 logger = logging.getLogger("CanaryAgent")
 
-class CanisterClient:
-    def __init__(self, canister_id: str, base_url: str):
-        self.canister_id = canister_id
+# Methods declared as `query` in the backend and dummy canisters
+QUERY_METHODS = frozenset({
+    "getContracts", "getContractsPage", "getContract", "getAlerts", "getAlertsSince", "getContractAlerts", "getRecentAlerts",
+    "getMonitoringRules", "isPaused", "isQuarantined", "isMonitored",
+    "getContractInfo", "healthCheck",
+})
+
+TRANSPORT_DFX = "dfx"
+TRANSPORT_HTTP = "http"
+
+# Format of the "data" string returned by call_canister
+OUTPUT_CANDID = "candid"
+OUTPUT_JSON = "json"
+
+CONTRACT_INT_FIELDS = ('id', 'alertCount', 'lastCheck', 'addedAt')
+ALERT_INT_FIELDS = ('id', 'contractId', 'ruleId', 'timestamp')
+
+class IcClockSync:
+    """Background service that tracks the offset between the IC replica clock and local time"""
+    
+    def __init__(self, base_url: str, refresh_interval: float = 60, max_samples: int = 5):
         self.base_url = base_url
-        self._time_offset = 0  
+        self.refresh_interval = refresh_interval
+        self.samples: deque = deque(maxlen=max_samples)  # (offset_seconds, monotonic_time)
+        self.session = None
+        self._task: Optional[asyncio.Task] = None
+        self.failures = 0
+    
+    @property
+    def offset(self) -> float:
+        """Median of recent offset samples in seconds (0 until the first sample)"""
+        if not self.samples:
+            return 0.0
+        return statistics.median(offset for offset, _ in self.samples)
+    
+    @property
+    def sample_age(self) -> Optional[float]:
+        """Seconds since the last successful sample, or None if never synced"""
+        if not self.samples:
+            return None
+        return time.monotonic() - self.samples[-1][1]
+    
+    def diagnostics(self) -> Dict:
+        sample_age = self.sample_age
+        return {
+            "offset_seconds": round(self.offset, 3),
+            "sample_age_seconds": round(sample_age, 1) if sample_age is not None else None,
+            "samples": len(self.samples),
+            "failures": self.failures,
+            "running": self._task is not None and not self._task.done(),
+        }
+    
+    def start(self):
+        """Start the refresh loop on the running event loop (no-op if already running)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
     
-    async def _sync_with_ic_time(self) -> datetime:
-        """Get current time synchronized with IC replica"""
+    async def stop(self):
+        """Stop the refresh loop and close the HTTP session"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.session:
+            await self.session.close()
+            self.session = None
+    
+    async def _run(self):
+        while True:
+            await self.sample()
+            await asyncio.sleep(self.refresh_interval)
+    
+    async def sample(self) -> Optional[float]:
+        """Take one offset sample from the replica's Date header"""
         try:
             import aiohttp
             from email.utils import parsedate_to_datetime
-
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.base_url}/api/v2/status", timeout=5) as response:
-                    if response.status == 200:
-                        date_header = response.headers.get('Date')
-                        if date_header:
-                            ic_time = parsedate_to_datetime(date_header)
-                            # Convert both times to UTC for comparison
-                            current_time_utc = datetime.utcnow().replace(tzinfo=ic_time.tzinfo)
-                            self._time_offset = (ic_time - current_time_utc).total_seconds()
-                            logger.info(f"Synchronized IC time offset: {self._time_offset} seconds")
+            
+            if self.session is None:
+                self.session = aiohttp.ClientSession()
+            
+            sent_at = time.time()
+            async with self.session.get(f"{self.base_url}/api/v2/status", timeout=aiohttp.ClientTimeout(total=5)) as response:
+                received_at = time.time()
+                date_header = response.headers.get('Date')
+                if response.status != 200 or not date_header:
+                    raise ValueError(f"HTTP {response.status}, Date header {'present' if date_header else 'missing'}")
+                ic_time = parsedate_to_datetime(date_header).timestamp()
+                # Compare against the midpoint of the round trip
+                offset = ic_time - (sent_at + received_at) / 2
+                self.samples.append((offset, time.monotonic()))
+                logger.debug(f"IC time offset sample: {offset:+.3f}s (median {self.offset:+.3f}s)")
+                return offset
         except Exception as e:
+            self.failures += 1
             logger.warning(f"Failed to sync IC time: {e}")
-            self._time_offset = 0
+            return None
+
+class ContractListError(Exception):
+    """Raised when the contract list could not be read completely"""
+
+class ContractRegistry:
+    """In-memory copy of the backend contract list, indexed by numeric id and by address"""
+    
+    def __init__(self, ttl: float = 30):
+        self.ttl = ttl
+        self.by_id: Dict[int, Dict] = {}
+        self.by_address: Dict[str, Dict] = {}
+        self.loaded_at: Optional[float] = None  # monotonic time of the last full load
+        self.hits = 0
+        self.misses = 0
+    
+    @property
+    def is_fresh(self) -> bool:
+        return self.loaded_at is not None and time.monotonic() - self.loaded_at < self.ttl
+    
+    def replace(self, contracts: List[Dict]):
+        """Replace the registry with a freshly fetched contract list"""
+        self.by_id = {}
+        self.by_address = {}
+        for contract in contracts:
+            self._index(contract)
+        self.loaded_at = time.monotonic()
+    
+    def retain(self, contract_ids: Set[int]):
+        """After a complete paged read (upserted page by page): drop contracts it did not return"""
+        self.by_id = {contract_id: contract for contract_id, contract in self.by_id.items() if contract_id in contract_ids}
+        self.by_address = {address: contract for address, contract in self.by_address.items()
+                           if contract.get('id') in contract_ids}
+        self.loaded_at = time.monotonic()
+    
+    def _index(self, contract: Dict):
+        if contract.get('id') is not None:
+            self.by_id[contract['id']] = contract
+        if contract.get('address'):
+            self.by_address[contract['address']] = contract
+    
+    def upsert(self, contract: Dict):
+        """Insert or replace one contract, keeping both indexes consistent"""
+        previous = self.by_id.get(contract.get('id'))
+        if previous and previous.get('address') != contract.get('address'):
+            self.by_address.pop(previous.get('address'), None)
+        self._index(contract)
+    
+    def update(self, contract_id: int, **fields):
+        """Patch fields of a cached contract in place (no-op if it isn't cached)"""
+        contract = self.by_id.get(contract_id)
+        if contract is not None:
+            contract.update(fields)
+    
+    def remove(self, contract_id: int):
+        contract = self.by_id.pop(contract_id, None)
+        if contract is not None:
+            self.by_address.pop(contract.get('address'), None)
+    
+    def invalidate(self):
+        """Force the next lookup to reload from the canister"""
+        self.loaded_at = None
+    
+    def get_by_address(self, address: str) -> Optional[Dict]:
+        contract = self.by_address.get(address) if self.is_fresh else None
+        if contract is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return contract
+    
+    def get_by_id(self, contract_id: int) -> Optional[Dict]:
+        contract = self.by_id.get(contract_id) if self.is_fresh else None
+        if contract is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return contract
+    
+    def diagnostics(self) -> Dict:
+        return {
+            "contracts": len(self.by_id),
+            "fresh": self.is_fresh,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+class CanisterClient:
+    def __init__(self, canister_id: str, base_url: str, transport: str = TRANSPORT_DFX, dfx_json_output: bool = True,
+                 registry_ttl: float = 30, alert_batch_size: int = 20, alert_batch_delay: float = 0.5,
+                 alert_page_size: int = 200, contract_page_size: int = 200, retry_policy: Optional[RetryPolicy] = None,
+                 query_concurrency: int = 16, update_concurrency: int = 4):
+        self.canister_id = canister_id
+        self.base_url = base_url
+        self.clock = IcClockSync(base_url)
+        if transport not in (TRANSPORT_DFX, TRANSPORT_HTTP):
+            logger.warning(f"Unknown canister transport '{transport}', falling back to {TRANSPORT_DFX}")
+            transport = TRANSPORT_DFX
+        self.transport = transport
+        self._http_agent = None
+        # Ask dfx for `--output json`; switched off automatically if the installed dfx lacks the flag
+        self.dfx_json_output = dfx_json_output
+        self.registry = ContractRegistry(ttl=registry_ttl)
+        # Back-off, per-error-class retry budgets and a circuit breaker per target canister
+        self.retry_policy = retry_policy or RetryPolicy()
+        # Queries and consensus updates run in separate lanes so queued writes never hold up reads
+        self.lanes = {
+            LANE_QUERY: CallLane(LANE_QUERY, query_concurrency),
+            LANE_UPDATE: CallLane(LANE_UPDATE, update_concurrency),
+        }
+        # Single-flight: concurrent identical reads share one in-flight canister call
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.coalesce_hits = 0    # callers that joined an in-flight call
+        self.coalesce_misses = 0  # callers that started a canister call
+        # Alert batching: create_alert calls are buffered and sent as one createAlerts update
+        # once alert_batch_size alerts are waiting or alert_batch_delay seconds have passed
+        self.alert_batch_size = alert_batch_size
+        self.alert_batch_delay = alert_batch_delay
+        self._alert_buffer: List[tuple] = []  # (Candid AlertInput record, future for the item's result)
+        self._alert_flush_task: Optional[asyncio.Task] = None
+        self._alert_batch_tasks: Set[asyncio.Task] = set()  # full batches being sent, awaited by flush_alerts
+        self.alert_batch_stats = {"alerts": 0, "batches": 0, "failed_items": 0, "single_calls": 0}
+        # Local mirror of the canister's alerts, kept current with getAlertsSince deltas; a
+        # changed revision (alerts acknowledged or removed) triggers a resync from cursor 0
+        self.alert_page_size = alert_page_size
+        self.contract_page_size = contract_page_size
+        self.alert_mirror: Dict[int, Dict] = {}
+        self.alert_cursor = 0
+        self.alert_revision: Optional[int] = None
+        self.alert_mirror_stats = {"delta_syncs": 0, "full_syncs": 0, "pages": 0, "alerts_fetched": 0, "fallbacks": 0}
+    
+    def start_clock_sync(self):
+        """Start the background IC clock-offset refresh if it isn't running yet"""
+        self.clock.start()
+    
+    def get_clock_diagnostics(self) -> Dict:
+        """Current IC clock offset and sample age for diagnostics"""
+        return self.clock.diagnostics()
     
     def calculate_expiry_time(self, minutes_from_now: int = 5) -> int:
         """Calculate expiry time in nanoseconds, accounting for IC time requirements"""
         try:
-            # Use system time and add a large buffer to avoid timing issues
-            current_time = datetime.utcnow()
+            # Use system time corrected by the cached IC clock offset (no I/O here)
+            current_time = time.time() + self.clock.offset
             
             # Add large buffer time to account for potential clock drift and IC timing
             buffer_seconds = 180  # 3 minutes buffer to be safe
-            expiry_time = current_time + timedelta(minutes=minutes_from_now, seconds=buffer_seconds)
+            expiry_time = current_time + minutes_from_now * 60 + buffer_seconds
             
             # Convert to nanoseconds (IC format)
-            expiry_ns = int(expiry_time.timestamp() * 1_000_000_000)
+            expiry_ns = int(expiry_time * 1_000_000_000)
             
-            logger.debug(f"Calculated expiry time: {expiry_time.isoformat()} ({expiry_ns} ns)")
+            logger.debug(f"Calculated expiry time: {datetime.utcfromtimestamp(expiry_time).isoformat()} ({expiry_ns} ns, offset {self.clock.offset:+.1f}s)")
             return expiry_ns
             
         except Exception as e:
             logger.error(f"Error calculating expiry time: {e}")
             # Fallback to a simple calculation with very large buffer
-            fallback_time = datetime.utcnow() + timedelta(minutes=minutes_from_now, seconds=300)
-            return int(fallback_time.timestamp() * 1_000_000_000)
+            return int((time.time() + minutes_from_now * 60 + 300) * 1_000_000_000)
     
     async def resume_contract(self, contract_id: int) -> bool:
         """Resume (unpause) a contract in the backend canister"""
         try:
             args = f"({contract_id} : nat)"
             result = await self.call_canister("resumeContract", args)
+            self._sync_registry(result)
             return result is not None and result.get("status") == "success"
         except Exception as e:
             logger.error(f"Error resuming contract: {e}")
@@ -70,270 +288,258 @@ class CanisterClient:
         try:
             args = f"({contract_id} : nat)"
             result = await self.call_canister("pauseContract", args)
+            self._sync_registry(result)
             return result is not None and result.get("status") == "success"
         except Exception as e:
             logger.error(f"Error pausing contract: {e}")
             return False
-    def __init__(self, canister_id: str, base_url: str):
-        self.canister_id = canister_id
-        self.base_url = base_url
+    def get_http_agent(self):
+        """Get or create the native IC HTTP agent"""
+        if self._http_agent is None:
+            from ic_http_agent import IcHttpAgent
+            self._http_agent = IcHttpAgent(
+                self.base_url,
+                canister_aliases={"backend": self.canister_id},
+                expiry_provider=lambda: self.calculate_expiry_time(minutes_from_now=1),
+            )
+        return self._http_agent
+    
+    async def close(self):
+        """Release transport resources"""
+        await self.flush_alerts()
+        await self.clock.stop()
+        if self._http_agent:
+            await self._http_agent.close_session()
+    
+    async def run_http_call(self, canister_name: str, method: str, args: str = "") -> Optional[str]:
+        """Call a canister through the replica HTTP interface under the retry policy"""
+        try:
+            lane = self.lane_for(method)
+            return await self.retry_policy.run(canister_name, f"{method} on {canister_name}",
+                                               lambda: lane.run(lambda: self._http_attempt(canister_name, method, args)))
+        except CircuitOpenError as e:
+            logger.debug(f"Skipping {method}: {e}")
+            return None
+        except CanisterCallError as e:
+            logger.error(f"HTTP canister call {method} on {canister_name} failed ({e.kind}): {e}")
+            return None
+    
+    async def _http_attempt(self, canister_name: str, method: str, args: str = "") -> str:
+        """One replica HTTP call; raises CanisterCallError (or asyncio.TimeoutError) on failure"""
+        agent = self.get_http_agent()
+        try:
+            if method in QUERY_METHODS:
+                return await agent.query(canister_name, method, args)
+            return await agent.update(canister_name, method, args)
+        except asyncio.TimeoutError:
+            raise
+        except Exception as e:
+            raise CanisterCallError(classify_error(str(e)), str(e) or type(e).__name__)
+    
+    async def _exec_dfx(self, cmd: List[str], cwd: str, timeout: float):
+        """Run a dfx process without blocking the event loop, killing it on timeout or cancellation"""
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except BaseException:
+            # Timeout or task cancellation: don't leave an orphaned dfx process behind
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+        return process.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+    
+    def _dfx_call_command(self, canister_name: str, method: str, args: str = "") -> List[str]:
+        """Build the `dfx canister call` command line"""
+        cmd = ["dfx", "canister", "call", canister_name, method]
+        if args:
+            cmd.append(args)
+        if self.dfx_json_output:
+            cmd.extend(["--output", "json"])
+        return cmd
     
-    def run_dfx_command(self, canister_name: str, method: str, args: str = "") -> Optional[str]:
-        """Run a dfx canister call command with retry logic for timing issues"""
-        max_retries = 3
-        retry_delay = 2  # seconds
+    @staticmethod
+    def _json_output_unsupported(error_msg: str) -> bool:
+        """Detect an older dfx rejecting `--output json`"""
+        lowered = error_msg.lower()
+        return "--output" in lowered and any(marker in lowered for marker in (
+            "unexpected argument", "wasn't expected", "invalid value", "isn't a valid value", "possible values",
+        ))
+    
+    async def run_dfx_command(self, canister_name: str, method: str, args: str = "") -> Optional[str]:
+        """Run a dfx canister call under the retry policy and the canister's circuit breaker"""
+        try:
+            lane = self.lane_for(method)
+            return await self.retry_policy.run(canister_name, f"{method} on {canister_name}",
+                                               lambda: lane.run(lambda: self._dfx_attempt(canister_name, method, args)))
+        except CircuitOpenError as e:
+            logger.debug(f"Skipping {method}: {e}")
+            return None
+        except CanisterCallError as e:
+            logger.error(f"DFX command {method} on {canister_name} failed ({e.kind}): {e}")
+            return None
+    
+    async def _dfx_attempt(self, canister_name: str, method: str, args: str = "") -> str:
+        """One dfx canister call; raises CanisterCallError (or asyncio.TimeoutError) on failure"""
+        cmd = self._dfx_call_command(canister_name, method, args)
         
-        for attempt in range(max_retries):
-            try:
-                cmd = ["dfx", "canister", "call", canister_name, method]
-                if args:
-                    cmd.append(args)
-                
-                # Get the absolute path to the ic directory
-                import os
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                ic_dir = os.path.join(os.path.dirname(current_dir), "..", "ic")
-                ic_dir = os.path.abspath(ic_dir)
-                
-                logger.debug(f"Running dfx command (attempt {attempt + 1}): {' '.join(cmd[:4])}...")
-                
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    cwd=ic_dir,
-                    timeout=45  # Increased timeout
-                )
-                
-                if result.returncode == 0:
-                    logger.debug(f"DFX command succeeded on attempt {attempt + 1}")
-                    return result.stdout.strip()
-                else:
-                    error_msg = result.stderr.strip()
-                    logger.warning(f"DFX command attempt {attempt + 1} failed: {error_msg}")
-                    
-                    # Check if it's an expiry error and handle with delay
-                    if "ingress_expiry" in error_msg or "expiry" in error_msg.lower():
-                        if "Minimum allowed expiry:" in error_msg:
-                            try:
-                                # Extract timing information from error message for logging
-                                import re
-                                min_expiry_match = re.search(r'Minimum allowed expiry: ([^,]+)', error_msg)
-                                provided_expiry_match = re.search(r'Provided expiry:\s+([^$]+)', error_msg)
-                                
-                                if min_expiry_match and provided_expiry_match:
-                                    min_expiry_str = min_expiry_match.group(1).strip()
-                                    provided_expiry_str = provided_expiry_match.group(1).strip()
-                                    
-                                    logger.info(f"IC replica minimum expiry: {min_expiry_str}")
-                                    logger.info(f"Provided expiry: {provided_expiry_str}")
-                                else:
-                                    logger.info("Expiry timing mismatch detected")
-                            except Exception as parse_error:
-                                logger.debug(f"Could not parse expiry error: {parse_error}")
-                        
-                        if attempt < max_retries - 1:
-                            # For expiry errors, wait longer to let the time window advance
-                            expiry_retry_delay = retry_delay + 10  # Additional delay for expiry issues
-                            logger.info(f"Retrying due to expiry error in {expiry_retry_delay} seconds...")
-                            time.sleep(expiry_retry_delay)
-                            retry_delay *= 2  # Exponential backoff
-                            continue
-                    
-                    # For non-expiry errors, use shorter delay
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay)
-                        retry_delay *= 2
-                        continue
-                    
-                    # Final attempt failed
-                    logger.error(f"DFX command failed after {max_retries} attempts: {error_msg}")
-                    return None
-                    
-            except subprocess.TimeoutExpired:
-                logger.warning(f"DFX command timed out on attempt {attempt + 1}: {method}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                logger.error(f"DFX command timed out after {max_retries} attempts")
-                return None
-            except Exception as e:
-                logger.error(f"Error running dfx command {method} on attempt {attempt + 1}: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                return None
+        # Get the absolute path to the ic directory
+        import os
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        ic_dir = os.path.join(os.path.dirname(current_dir), "..", "ic")
+        ic_dir = os.path.abspath(ic_dir)
+        
+        logger.debug(f"Running dfx command: {' '.join(cmd[:4])}...")
+        
+        returncode, stdout, stderr = await self._exec_dfx(cmd, ic_dir, timeout=45)
         
-        return None
+        if returncode != 0 and self.dfx_json_output and self._json_output_unsupported(stderr):
+            # Compatibility mode: this dfx predates `--output json`, use Candid text from now on
+            logger.warning("⚠️ dfx does not support '--output json', falling back to Candid text output")
+            self.dfx_json_output = False
+            cmd = self._dfx_call_command(canister_name, method, args)
+            returncode, stdout, stderr = await self._exec_dfx(cmd, ic_dir, timeout=45)
+        
+        if returncode == 0:
+            return stdout.strip()
+        
+        error_msg = stderr.strip()
+        kind = classify_error(error_msg)
+        logger.warning(f"DFX command {method} failed ({kind}): {error_msg}")
+        if kind == ERROR_EXPIRY and "Minimum allowed expiry:" in error_msg:
+            # Extract timing information from error message for logging
+            import re
+            min_expiry_match = re.search(r'Minimum allowed expiry: ([^,]+)', error_msg)
+            provided_expiry_match = re.search(r'Provided expiry:\s+([^$]+)', error_msg)
+            if min_expiry_match and provided_expiry_match:
+                logger.info(f"IC replica minimum expiry: {min_expiry_match.group(1).strip()}")
+                logger.info(f"Provided expiry: {provided_expiry_match.group(1).strip()}")
+        raise CanisterCallError(kind, error_msg)
+    
+    def lane_for(self, method: str) -> CallLane:
+        """Query lane for query methods, update lane for everything that goes through consensus"""
+        return self.lanes[LANE_QUERY if method in QUERY_METHODS else LANE_UPDATE]
+    
+    def get_lane_stats(self) -> Dict:
+        return {name: lane.diagnostics() for name, lane in self.lanes.items()}
+    
+    def is_canister_unreachable(self, canister_name: str) -> bool:
+        """Whether the canister's circuit breaker is open (calls to it currently fail fast)"""
+        return self.retry_policy.is_open(canister_name)
+    
+    def get_retry_stats(self) -> Dict:
+        return self.retry_policy.diagnostics()
     
     async def call_canister(self, method: str, args: str = "", canister_name: str = "backend") -> Optional[Dict]:
-        """Call a canister method using dfx with automatic retry for timing issues"""
+        """Call a canister method via the configured transport (dfx or native HTTP)"""
         try:
-            # Add a small delay to help with timing issues
-            await self._sync_with_ic_time()
-
-            await asyncio.sleep(0.1)  # Short delay before call
+            # Keep the clock offset fresh in the background; never blocks this call
+            self.start_clock_sync()
             
             # Use the provided canister name, default to 'backend'
-            result = self.run_dfx_command(canister_name, method, args)
+            if self.transport == TRANSPORT_HTTP:
+                result = await self.run_http_call(canister_name, method, args)
+            else:
+                result = await self.run_dfx_command(canister_name, method, args)
             if result:
-                # Parse the Candid output (this is a simplified parser)
                 logger.debug(f"Canister response: {result}")
-                return {"status": "success", "data": result}
+                # dfx prints Candid text as a parenthesised tuple; anything else is `--output json`
+                output_format = OUTPUT_CANDID if result.lstrip().startswith("(") else OUTPUT_JSON
+                return {"status": "success", "data": result, "format": output_format}
             return None
         except Exception as e:
             logger.error(f"Error calling canister method {method}: {e}")
             return None
     
+    @staticmethod
+    def _contract_from_record(record: Dict) -> Dict:
+        """Map a parsed Contract record to the contract dict used throughout the agent"""
+        contract = {}
+        for field in CONTRACT_INT_FIELDS:
+            if field in record:
+                contract[field] = as_int(record[field])
+        for field in ('nickname', 'address', 'isPaused', 'isActive'):
+            if field in record:
+                contract[field] = record[field]
+        if 'status' in record:
+            contract['status'] = variant_tag(record['status'])
+        return contract
+    
+    @staticmethod
+    def _alert_from_record(record: Dict) -> Dict:
+        """Map a parsed Alert record to the alert dict used by the REST API"""
+        alert = {}
+        for field in ALERT_INT_FIELDS:
+            if field in record:
+                alert[field] = as_int(record[field])
+        for field in ('contractAddress', 'contractNickname', 'ruleName', 'title', 'description', 'severity', 'acknowledged'):
+            if field in record:
+                alert[field] = record[field]
+        if alert.get('timestamp') is not None:
+            # Convert timestamp to human-readable format if present
+            try:
+                # Convert nanoseconds to seconds and create datetime
+                alert['timestamp_readable'] = datetime.fromtimestamp(alert['timestamp'] / 1_000_000_000).isoformat()
+            except (ValueError, OSError, OverflowError) as e:
+                logger.debug(f"Could not convert timestamp {alert['timestamp']}: {e}")
+                alert['timestamp_readable'] = "Invalid timestamp"
+        return alert
+    
     def parse_contracts_from_candid(self, candid_output: str) -> List[Dict]:
-        """Parse contracts from Candid output"""
+        """Parse contracts from dfx output (Candid text or JSON)"""
         try:
-            contracts = []
-            
-            # Simple parser for the vec { record { ... } } format
-            if "vec {" in candid_output and "record {" in candid_output:
-                # Extract each record block - improved regex for nested structures
-                import re
-                
-                # Find all record blocks with better handling of nested structures
-                record_pattern = r'record \{([^{}]*(?:\{[^{}]*\}[^{}]*)*)\}'
-                records = re.findall(record_pattern, candid_output)
-                
-                for record_content in records:
-                    contract = {}
-                    
-                    # Extract fields with better patterns
-                    id_match = re.search(r'id\s*=\s*(\d+)\s*:', record_content)
-                    if id_match:
-                        contract['id'] = int(id_match.group(1))
-                    
-                    nickname_match = re.search(r'nickname\s*=\s*"([^"]*)"', record_content)
-                    if nickname_match:
-                        contract['nickname'] = nickname_match.group(1)
-                    
-                    address_match = re.search(r'address\s*=\s*"([^"]*)"', record_content)
-                    if address_match:
-                        contract['address'] = address_match.group(1)
-                    
-                    status_match = re.search(r'status\s*=\s*variant\s*\{\s*(\w+)\s*\}', record_content)
-                    if status_match:
-                        contract['status'] = status_match.group(1)
-                    
-                    # Extract additional fields
-                    alert_count_match = re.search(r'alertCount\s*=\s*(\d+)\s*:', record_content)
-                    if alert_count_match:
-                        contract['alertCount'] = int(alert_count_match.group(1))
-                    
-                    is_paused_match = re.search(r'isPaused\s*=\s*(true|false)', record_content)
-                    if is_paused_match:
-                        contract['isPaused'] = is_paused_match.group(1) == 'true'
-                    
-                    is_active_match = re.search(r'isActive\s*=\s*(true|false)', record_content)
-                    if is_active_match:
-                        contract['isActive'] = is_active_match.group(1) == 'true'
-                    
-                    last_check_match = re.search(r'lastCheck\s*=\s*(\d+)\s*:', record_content)
-                    if last_check_match:
-                        contract['lastCheck'] = int(last_check_match.group(1))
-                    
-                    added_at_match = re.search(r'addedAt\s*=\s*(\d+)\s*:', record_content)
-                    if added_at_match:
-                        contract['addedAt'] = int(added_at_match.group(1))
-                    
-                    if contract:  # Only add if we found some data
-                        contracts.append(contract)
-            
-            return contracts
-            
+            records = iter_records(parse_dfx_output(candid_output))
+            return [contract for contract in map(self._contract_from_record, records) if contract]
         except Exception as e:
             logger.error(f"Error parsing Candid output: {e}")
             return []
     
     def parse_alerts_from_candid(self, candid_output: str) -> List[Dict]:
-        """Parse alerts from Candid output"""
+        """Parse alerts from dfx output (Candid text or JSON)"""
         try:
-            alerts = []
-            
-            # Simple parser for the vec { record { ... } } format
-            if "vec {" in candid_output and "record {" in candid_output:
-                # Extract each record block - improved regex for nested structures
-                import re
-                
-                # Find all record blocks with better handling of nested structures
-                record_pattern = r'record \{([^{}]*(?:\{[^{}]*\}[^{}]*)*)\}'
-                records = re.findall(record_pattern, candid_output)
-                
-                for record_content in records:
-                    alert = {}
-                    
-                    # Extract alert fields based on the Alert type structure
-                    id_match = re.search(r'id\s*=\s*(\d+)\s*:\s*nat', record_content)
-                    if id_match:
-                        alert['id'] = int(id_match.group(1))
-                    
-                    contract_id_match = re.search(r'contractId\s*=\s*(\d+)\s*:\s*nat', record_content)
-                    if contract_id_match:
-                        alert['contractId'] = int(contract_id_match.group(1))
-                    
-                    contract_address_match = re.search(r'contractAddress\s*=\s*"([^"]*)"', record_content)
-                    if contract_address_match:
-                        alert['contractAddress'] = contract_address_match.group(1)
-                    
-                    contract_nickname_match = re.search(r'contractNickname\s*=\s*"([^"]*)"', record_content)
-                    if contract_nickname_match:
-                        alert['contractNickname'] = contract_nickname_match.group(1)
-                    
-                    rule_id_match = re.search(r'ruleId\s*=\s*(\d+)\s*:\s*nat', record_content)
-                    if rule_id_match:
-                        alert['ruleId'] = int(rule_id_match.group(1))
-                    
-                    rule_name_match = re.search(r'ruleName\s*=\s*"([^"]*)"', record_content)
-                    if rule_name_match:
-                        alert['ruleName'] = rule_name_match.group(1)
-                    
-                    title_match = re.search(r'title\s*=\s*"([^"]*)"', record_content)
-                    if title_match:
-                        alert['title'] = title_match.group(1)
-                    
-                    description_match = re.search(r'description\s*=\s*"([^"]*)"', record_content)
-                    if description_match:
-                        alert['description'] = description_match.group(1)
-                    
-                    severity_match = re.search(r'severity\s*=\s*"([^"]*)"', record_content)
-                    if severity_match:
-                        alert['severity'] = severity_match.group(1)
-                    
-                    timestamp_match = re.search(r'timestamp\s*=\s*([\d_]+)\s*:\s*int', record_content)
-                    if timestamp_match:
-                        # Remove underscores from timestamp and convert to int
-                        timestamp_str = timestamp_match.group(1).replace('_', '')
-                        alert['timestamp'] = int(timestamp_str)
-                        # Convert timestamp to human-readable format if present
-                        try:
-                            from datetime import datetime
-                            # Convert nanoseconds to seconds and create datetime
-                            alert['timestamp_readable'] = datetime.fromtimestamp(alert['timestamp'] / 1_000_000_000).isoformat()
-                        except (ValueError, OSError) as e:
-                            logger.debug(f"Could not convert timestamp {alert['timestamp']}: {e}")
-                            alert['timestamp_readable'] = "Invalid timestamp"
-                    
-                    acknowledged_match = re.search(r'acknowledged\s*=\s*(true|false)', record_content)
-                    if acknowledged_match:
-                        alert['acknowledged'] = acknowledged_match.group(1) == 'true'
-                    
-                    if alert:  # Only add if we found some data
-                        alerts.append(alert)
-            
-            return alerts
-            
+            records = iter_records(parse_dfx_output(candid_output))
+            return [alert for alert in map(self._alert_from_record, records) if alert]
         except Exception as e:
             logger.error(f"Error parsing alerts from Candid output: {e}")
             return []
     
+    async def _single_flight(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fetch() once for all concurrent callers asking for the same key"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesce_hits += 1
+        else:
+            self.coalesce_misses += 1
+            task = asyncio.get_running_loop().create_task(fetch())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._inflight.pop(key, None) if self._inflight.get(key) is done else None)
+        # Shield so one caller being cancelled doesn't cancel the call for everyone else
+        return await asyncio.shield(task)
+    
+    def get_coalescing_stats(self) -> Dict:
+        total = self.coalesce_hits + self.coalesce_misses
+        return {
+            "hits": self.coalesce_hits,
+            "misses": self.coalesce_misses,
+            "saved_call_ratio": round(self.coalesce_hits / total, 3) if total else 0.0,
+            "in_flight": len(self._inflight),
+        }
+    
     async def get_contracts(self) -> List[Dict]:
-        """Get all monitored contracts"""
+        """Get all monitored contracts ([] if the canister could not be read)"""
+        return await self.fetch_contract_list() or []
+    
+    async def fetch_contract_list(self) -> Optional[List[Dict]]:
+        """All monitored contracts, or None if getContracts failed (concurrent callers share one canister call)"""
+        contracts = await self._single_flight("getContracts", self._fetch_contracts)
+        return None if contracts is None else list(contracts)
+    
+    async def _fetch_contracts(self) -> Optional[List[Dict]]:
         try:
             result = await self.call_canister("getContracts")
             if result and result.get("status") == "success":
@@ -342,13 +548,15 @@ class CanisterClient:
                 # Parse the Candid output to extract contract data
                 contracts_data = result.get("data", "")
                 contracts = self.parse_contracts_from_candid(contracts_data)
+                self.registry.replace(contracts)
                 
                 logger.info(f"Parsed {len(contracts)} contracts from canister")
                 return contracts
-            return []
+            logger.warning("Failed to get contracts from backend canister")
+            return None
         except Exception as e:
             logger.error(f"Error getting contracts: {e}")
-            return []
+            return None
     
     async def add_contract_to_canister(self, address: str, nickname: str) -> bool:
         """Add a contract to the canister for monitoring"""
@@ -359,6 +567,7 @@ class CanisterClient:
             args = f'("{escaped_address}", "{escaped_nickname}")'
             
             result = await self.call_canister("addContract", args)
+            self._sync_registry(result)
             
             if result and result.get("status") == "success":
                 logger.debug(f"Successfully added contract {nickname} to canister")
@@ -372,15 +581,80 @@ class CanisterClient:
             return False
     
     async def create_alert(self, contract_id: int, rule_id: int, title: str, description: str, severity: str) -> bool:
-        """Create an alert in the canister"""
+        """Create an alert in the canister (buffered into a createAlerts batch when batching is enabled)"""
+        if self.alert_batch_size > 1:
+            return await self._buffer_alert(contract_id, rule_id, title, description, severity)
         try:
-            args = f'({contract_id} : nat, {rule_id} : nat, "{title}", "{description}", "{severity}")'
+            self.alert_batch_stats["single_calls"] += 1
+            args = f'({contract_id} : nat, {rule_id} : nat, {quote_text(title)}, {quote_text(description)}, {quote_text(severity)})'
             result = await self.call_canister("createAlert", args)
             return result is not None and result.get("status") == "success"
         except Exception as e:
             logger.error(f"Error creating alert: {e}")
             return False
     
+    async def _buffer_alert(self, contract_id: int, rule_id: int, title: str, description: str, severity: str) -> bool:
+        """Queue an alert for the next createAlerts batch and wait for its own result"""
+        record = (f'record {{ contractId = {contract_id} : nat; ruleId = {rule_id} : nat; title = {quote_text(title)}; '
+                  f'description = {quote_text(description)}; severity = {quote_text(severity)}; data = null }}')
+        future = asyncio.get_running_loop().create_future()
+        self._alert_buffer.append((record, future))
+        if len(self._alert_buffer) >= self.alert_batch_size:
+            batch, self._alert_buffer = self._alert_buffer, []
+            task = asyncio.ensure_future(self._send_alert_batch(batch))
+            self._alert_batch_tasks.add(task)
+            task.add_done_callback(self._alert_batch_tasks.discard)
+        elif self._alert_flush_task is None or self._alert_flush_task.done():
+            self._alert_flush_task = asyncio.ensure_future(self._flush_alerts_later())
+        return await asyncio.shield(future)
+    
+    async def _flush_alerts_later(self):
+        await asyncio.sleep(self.alert_batch_delay)
+        await self.flush_alerts()
+    
+    async def flush_alerts(self):
+        """Send all buffered alerts now and wait for batches already being sent"""
+        batch, self._alert_buffer = self._alert_buffer, []
+        if batch:
+            await self._send_alert_batch(batch)
+        if self._alert_batch_tasks:
+            await asyncio.gather(*self._alert_batch_tasks)
+    
+    async def _send_alert_batch(self, batch: List[tuple]):
+        """Send a batch in one createAlerts call and resolve each caller with its item's result"""
+        results = [False] * len(batch)
+        try:
+            args = "(vec { " + "; ".join(record for record, _ in batch) + " })"
+            result = await self.call_canister("createAlerts", args)
+            if result and result.get("status") == "success":
+                self.alert_batch_stats["batches"] += 1
+                values = parse_dfx_output(result["data"])
+                items = values[0] if values and isinstance(values[0], list) else []
+                for index, item in enumerate(items[:len(batch)]):
+                    tag = variant_tag(item)
+                    results[index] = tag == "ok"
+                    if tag != "ok":
+                        logger.error(f"❌ Alert {index + 1}/{len(batch)} rejected by canister: {item.get(tag) if tag else item}")
+                logger.info(f"Stored {sum(results)}/{len(batch)} alerts in one createAlerts call")
+            else:
+                logger.error(f"❌ createAlerts call failed for a batch of {len(batch)} alerts")
+        except Exception as e:
+            logger.error(f"Error creating alert batch: {e}")
+        self.alert_batch_stats["alerts"] += len(batch)
+        self.alert_batch_stats["failed_items"] += results.count(False)
+        for (_, future), success in zip(batch, results):
+            if not future.done():
+                future.set_result(success)
+    
+    def get_alert_batch_stats(self) -> Dict:
+        return {
+            **self.alert_batch_stats,
+            "batch_size": self.alert_batch_size,
+            "batch_delay_seconds": self.alert_batch_delay,
+            "buffered": len(self._alert_buffer),
+            "batches_in_flight": len(self._alert_batch_tasks),
+        }
+    
     async def update_contract_status(self, contract_id: int, status: str) -> bool:
         """Update contract status in the canister"""
         try:
@@ -388,6 +662,7 @@ class CanisterClient:
             status_variant = f"variant {{ {status} }}"
             args = f'({contract_id} : nat, {status_variant})'
             result = await self.call_canister("updateContractStatus", args)
+            self._sync_registry(result)
             return result is not None and result.get("status") == "success"
         except Exception as e:
             logger.error(f"Error updating contract status: {e}")
@@ -405,35 +680,82 @@ class CanisterClient:
             logger.error(f"Error performing health check: {e}")
             return {"status": "error", "timestamp": datetime.now().isoformat(), "error": str(e)}
     
+    def _sync_registry(self, result: Optional[Dict]):
+        """Apply a mutation reply to the contract registry, or invalidate it if the reply is unclear"""
+        try:
+            if result and result.get("status") == "success":
+                tag, payload = result_variant(parse_dfx_output(result.get("data", "")))
+                if tag == "ok" and isinstance(payload, dict):
+                    contract = self._contract_from_record(payload)
+                    if contract.get('id') is not None:
+                        self.registry.upsert(contract)
+                        return
+        except Exception as e:
+            logger.debug(f"Could not apply mutation reply to contract registry: {e}")
+        self.registry.invalidate()
+    
     async def find_contract_by_address(self, contract_address: str) -> Optional[Dict]:
-        """Find a contract by its address and return the raw contract object"""
+        """Find a contract by its address, served from the registry while it is fresh"""
         try:
-            contracts = await self.get_contracts()
+            contract = self.registry.get_by_address(contract_address)
+            if contract is not None:
+                return contract
             
-            # Look for contract by address
-            for contract in contracts:
-                if contract.get('address') == contract_address:
-                    return contract
-            
-            logger.debug(f"Contract with address {contract_address} not found")
-            return None
+            # Registry stale or contract unknown: reload once from the canister
+            await self.get_contracts()
+            contract = self.registry.by_address.get(contract_address)
+            if contract is None:
+                logger.debug(f"Contract with address {contract_address} not found")
+            return contract
             
         except Exception as e:
             logger.error(f"Error finding contract by address {contract_address}: {e}")
             return None
+    
+    async def find_contract_by_id(self, contract_id: int) -> Optional[Dict]:
+        """Find a contract by its numeric ID, served from the registry while it is fresh"""
+        try:
+            contract = self.registry.get_by_id(contract_id)
+            if contract is not None:
+                return contract
+            await self.get_contracts()
+            return self.registry.by_id.get(contract_id)
+        except Exception as e:
+            logger.error(f"Error finding contract by ID {contract_id}: {e}")
+            return None
+    
+    async def remove_contract(self, contract_id: int) -> Optional[Dict]:
+        """Remove a contract from the canister and drop it from the registry"""
+        try:
+            result = await self.call_canister("removeContract", f"({contract_id} : nat)")
+            if result and result.get("status") == "success":
+                tag, _ = result_variant(parse_dfx_output(result.get("data", "")))
+                if tag == "ok":
+                    self.registry.remove(contract_id)
+                    return result
+            self.registry.invalidate()
+            return result
+        except Exception as e:
+            logger.error(f"Error removing contract {contract_id}: {e}")
+            self.registry.invalidate()
+            return None
+    
+    async def mutate_contract(self, method: str, contract_id: int) -> Optional[Dict]:
+        """Call a single-contract mutation (e.g. deactivateContract) and keep the registry in sync"""
+        try:
+            result = await self.call_canister(method, f"({contract_id} : nat)")
+            self._sync_registry(result)
+            return result
+        except Exception as e:
+            logger.error(f"Error calling {method} for contract {contract_id}: {e}")
+            self.registry.invalidate()
+            return None
 
     async def get_contract_data(self, contract_id: str) -> Optional[Dict]:
         """Get data for a specific contract by address or ID"""
         try:
-            # First, try to find the contract by address in all contracts
-            contracts = await self.get_contracts()
-            
-            # Look for contract by address
-            matching_contract = None
-            for contract in contracts:
-                if contract.get('address') == contract_id:
-                    matching_contract = contract
-                    break
+            # First, look the address up in the contract registry
+            matching_contract = await self.find_contract_by_address(contract_id)
             
             if matching_contract:
                 logger.debug(f"Found contract with address {contract_id}")
@@ -494,24 +816,13 @@ class CanisterClient:
         hash_val = hash(contract_id) % 1000
         return abs(hash_val)
     
-    async def find_contract_by_address(self, address: str) -> Optional[Dict]:
-        """Find a contract by its address"""
-        try:
-            contracts = await self.get_contracts()
-            for contract in contracts:
-                if contract.get('address') == address:
-                    return contract
-            return None
-        except Exception as e:
-            logger.error(f"Error finding contract by address {address}: {e}")
-            return None
-    
     async def clear_all_contracts(self) -> bool:
         """Clear all contracts from the canister"""
         try:
             result = await self.call_canister("clearAllContracts")
             if result and result.get("status") == "success":
                 logger.info("Successfully cleared all contracts from canister")
+                self.registry.replace([])
                 return True
             else:
                 logger.error(f"Failed to clear all contracts: {result}")
@@ -530,10 +841,9 @@ class CanisterClient:
                 contract_data = result.get("data", "")
                 
                 # Parse the response for a single contract
-                if "record {" in contract_data:
-                    contracts = self.parse_contracts_from_candid(contract_data)
-                    if contracts:
-                        return contracts[0]
+                contracts = self.parse_contracts_from_candid(contract_data)
+                if contracts:
+                    return contracts[0]
                 
                 logger.debug(f"Contract {contract_id} found but could not parse response")
                 return None
@@ -592,7 +902,93 @@ class CanisterClient:
             return 0
 
     async def get_alerts(self) -> List[Dict]:
-        """Get alerts from the backend canister"""
+        """Get alerts from the backend canister (concurrent callers share one canister call)"""
+        return list(await self._single_flight("getAlerts", self._sync_alerts))
+    
+    async def _sync_alerts(self) -> List[Dict]:
+        """Bring the alert mirror up to date with the alerts created since the last sync"""
+        full_sync = self.alert_cursor == 0
+        while True:
+            page = await self._fetch_alert_page(self.alert_cursor)
+            if page is None:
+                # Canister without getAlertsSince (or the call failed): fall back to a full dump
+                self.alert_mirror_stats["fallbacks"] += 1
+                return await self._fetch_alerts()
+            if page["revision"] != self.alert_revision and self.alert_cursor != 0:
+                logger.info("Alerts changed on the canister, resyncing the alert mirror")
+                self.alert_mirror = {}
+                self.alert_cursor = 0
+                full_sync = True
+                continue
+            self.alert_revision = page["revision"]
+            for alert in page["alerts"]:
+                self.alert_mirror[alert['id']] = alert
+            self.alert_cursor = page["nextCursor"]
+            self.alert_mirror_stats["pages"] += 1
+            self.alert_mirror_stats["alerts_fetched"] += len(page["alerts"])
+            if not page["hasMore"]:
+                break
+        self.alert_mirror_stats["full_syncs" if full_sync else "delta_syncs"] += 1
+        return list(self.alert_mirror.values())
+    
+    async def _fetch_alert_page(self, cursor: int) -> Optional[Dict]:
+        """Fetch one getAlertsSince page, or None if the call or its reply is unusable"""
+        return await self._fetch_page("getAlertsSince", cursor, self.alert_page_size, "alerts", self._alert_from_record)
+    
+    async def _fetch_page(self, method: str, cursor: int, limit: int, items_key: str,
+                          from_record: Callable[[Dict], Dict]) -> Optional[Dict]:
+        """Fetch one cursor page (records with id > cursor), or None if the call or its reply is unusable"""
+        try:
+            result = await self.call_canister(method, f"({cursor} : nat, {limit} : nat)")
+            if not result or result.get("status") != "success":
+                return None
+            values = parse_dfx_output(result["data"])
+            page = values[0] if values and isinstance(values[0], dict) else {}
+            if "nextCursor" not in page:
+                return None
+            return {
+                items_key: [item for item in map(from_record, page.get(items_key) or []) if item.get('id') is not None],
+                "nextCursor": as_int(page["nextCursor"], cursor),
+                "hasMore": bool(page.get("hasMore")),
+                "revision": as_int(page.get("revision")),
+            }
+        except Exception as e:
+            logger.error(f"Error fetching {method} page after {cursor}: {e}")
+            return None
+    
+    async def iter_contracts(self) -> AsyncIterator[Dict]:
+        """
+        Yield contracts page by page (getContractsPage), falling back to one getContracts call.
+        Raises ContractListError if the list could not be read to the end, so a partial list is
+        never mistaken for the full set. Only the ids seen are kept to sync the registry.
+        """
+        cursor = 0
+        contract_ids: Set[int] = set()
+        while True:
+            page = await self._fetch_page("getContractsPage", cursor, self.contract_page_size, "contracts",
+                                          self._contract_from_record)
+            if page is None:
+                if cursor != 0:
+                    raise ContractListError(f"Contract paging stopped after id {cursor}")
+                contracts = await self.fetch_contract_list()
+                if contracts is None:
+                    raise ContractListError("Could not read the contract list")
+                for contract in contracts:
+                    yield contract
+                return
+            for contract in page["contracts"]:
+                self.registry.upsert(contract)
+                contract_ids.add(contract.get('id'))
+                yield contract
+            cursor = page["nextCursor"]
+            if not page["hasMore"]:
+                self.registry.retain(contract_ids)
+                return
+    
+    def get_alert_mirror_stats(self) -> Dict:
+        return {**self.alert_mirror_stats, "mirrored_alerts": len(self.alert_mirror), "cursor": self.alert_cursor}
+    
+    async def _fetch_alerts(self) -> List[Dict]:
         try:
             logger.info("Fetching alerts from backend canister...")
             result = await self.call_canister("getAlerts", "")
@@ -0,0 +1,146 @@
+"""
+Columnar rule evaluation for Canary Contract Guardian
+
+Rules walking thousands of event dicts spend most of their time in `event.get(...)`. Events are
+converted once into NumPy columns (timestamps, amounts, prices, and categorical codes for the
+transaction type and function name) and the window filter, price-change scan and flash-loan
+search run as array operations. NumPy is optional: without it HAS_NUMPY is False and
+MonitoringRules keeps using its dict-based implementations.
+"""
+
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+    HAS_NUMPY = False
+
+
+def _codes(values, vocabulary: Dict[str, int]):
+    return np.fromiter((vocabulary.setdefault(value, len(vocabulary)) for value in values), dtype=np.int32)
+
+
+class EventColumns:
+    """
+    Events as NumPy columns. Built from dicts, each column is converted on first use (a rule
+    only pays for the fields it reads) and `events` keeps the dicts so alerts can report the
+    originals; from_arrays() wraps data that is already columnar. `type_field` names the dict
+    key read into the categorical type column ("event_type" for admin events).
+    """
+
+    def __init__(self, events: Sequence[Dict], type_field: str = 'type'):
+        self.events = events
+        self.type_field = type_field
+        self._columns: Dict[str, "np.ndarray"] = {}
+        self.type_vocabulary: Dict[str, int] = {}
+        self.function_vocabulary: Dict[str, int] = {}
+
+    @classmethod
+    def from_arrays(cls, timestamps, amounts=None, prices=None, types: Optional[Sequence[str]] = None,
+                    function_names: Optional[Sequence[str]] = None) -> "EventColumns":
+        columns = cls(())
+        columns._columns["timestamps"] = np.asarray(timestamps, dtype=np.float64)
+        size = len(columns._columns["timestamps"])
+        columns._columns["amounts"] = np.zeros(size) if amounts is None else np.asarray(amounts, dtype=np.float64)
+        columns._columns["prices"] = np.zeros(size) if prices is None else np.asarray(prices, dtype=np.float64)
+        columns._columns["type_codes"] = _codes(types or [''] * size, columns.type_vocabulary)
+        columns._columns["function_codes"] = _codes(function_names or [''] * size, columns.function_vocabulary)
+        return columns
+
+    def _column(self, name: str, field: str):
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = np.fromiter(
+                (event.get(field, 0) for event in self.events), dtype=np.float64, count=len(self.events))
+        return column
+
+    @property
+    def timestamps(self):
+        return self._column("timestamps", "timestamp")
+
+    @property
+    def amounts(self):
+        return self._column("amounts", "amount")
+
+    @property
+    def prices(self):
+        return self._column("prices", "price")
+
+    @property
+    def type_codes(self):
+        if "type_codes" not in self._columns:
+            self._columns["type_codes"] = _codes((event.get(self.type_field, '') for event in self.events),
+                                                 self.type_vocabulary)
+        return self._columns["type_codes"]
+
+    @property
+    def function_codes(self):
+        if "function_codes" not in self._columns:
+            self._columns["function_codes"] = _codes((event.get('function_name', '') for event in self.events),
+                                                     self.function_vocabulary)
+        return self._columns["function_codes"]
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def type_mask(self, predicate: Callable[[str], bool]):
+        """Rows whose (lower-cased) type satisfies predicate, tested once per distinct type"""
+        type_codes = self.type_codes
+        codes = [code for name, code in self.type_vocabulary.items() if predicate(str(name).lower())]
+        return np.isin(type_codes, codes)
+
+    def function_mask(self, predicate: Callable[[str], bool]):
+        """Rows whose function name satisfies predicate, tested once per distinct name"""
+        function_codes = self.function_codes
+        codes = [code for name, code in self.function_vocabulary.items() if predicate(name)]
+        return np.isin(function_codes, codes)
+
+
+def window_mask(columns: EventColumns, now: float, window: float):
+    """Rows with a timestamp inside the last `window` seconds"""
+    return columns.timestamps > now - window
+
+
+def _time_order(columns: EventColumns, mask) -> "np.ndarray":
+    """Row indices selected by mask, in (stable) timestamp order"""
+    rows = np.flatnonzero(mask)
+    return rows[np.argsort(columns.timestamps[rows], kind='stable')]
+
+
+def find_price_change(columns: EventColumns, mask, threshold: float) -> Optional[Tuple[int, int, float]]:
+    """First consecutive pair of prices (in time order) changing by more than threshold: (prev row, row, change)"""
+    rows = _time_order(columns, mask)
+    if len(rows) < 2:
+        return None
+    prices = columns.prices[rows]
+    previous, current = prices[:-1], prices[1:]
+    change = np.zeros(len(current))
+    np.divide(np.abs(current - previous), previous, out=change, where=previous > 0)
+    hits = np.flatnonzero(change > threshold)
+    if not len(hits):
+        return None
+    i = int(hits[0])
+    return int(rows[i]), int(rows[i + 1]), float(change[i])
+
+
+def find_flash_loan(columns: EventColumns, mask, amount_threshold: float, followup_window: float,
+                    min_followups: int) -> Optional[Tuple[int, int]]:
+    """First large loan (in time order) with at least min_followups rows within followup_window: (row, count)"""
+    rows = _time_order(columns, mask)
+    timestamps = columns.timestamps[rows]
+    loans = (columns.amounts[rows] > amount_threshold) & \
+        columns.type_mask(lambda name: 'borrow' in name or 'loan' in name)[rows]
+    loan_positions = np.flatnonzero(loans)
+    if not len(loan_positions):
+        return None
+    # End of each loan's follow-up window: first position at or past loan time + followup_window
+    window_ends = np.searchsorted(timestamps, timestamps[loan_positions] + followup_window, side='left')
+    followups = window_ends - loan_positions - 1
+    hits = np.flatnonzero(followups >= min_followups)
+    if not len(hits):
+        return None
+    i = int(hits[0])
+    return int(rows[loan_positions[i]]), int(followups[i])
+
@@ -1,31 +1,111 @@
 import asyncio
+import hashlib
 import logging
 import time
 import random
-import re
 import traceback
 import os
 from typing import Dict, List, Optional
 from datetime import datetime
 from dotenv import load_dotenv
 
+from candid_parser import parse_dfx_output, iter_records, as_int
+from canister_client import ContractListError
+from scheduler import ContractScheduler
+from alert_pipeline import AlertPipeline
+from alert_dedup import AlertDeduplicator
+from monitoring_rules import PRICE_CHANGE_THRESHOLD, TRANSACTION_TIME_WINDOW
+from windowed_counter import ContractActivity
+from price_detector import EwmaPriceDetector
+
 load_dotenv()
 DISCORD_WEBHOOK_URL = os.getenv("DISCORD_WEBHOOK_URL", "https://discord.com/api/webhooks/YOUR_WEBHOOK_URL")
 
 logger = logging.getLogger("CanaryAgent")
 
+# Rule checks run per contract, in order
+CONTRACT_RULES = (
+    "check_rule_1_balance",
+    "check_rule_2_transactions",
+    "check_rule_3_functions",
+    "check_rule_4_reentrancy",
+    "check_rule_5_flash_loan",
+    "check_rule_6_ownership",
+    "check_rule_7_price_manipulation",
+)
+# On an unchanged canister state the windowed rules still re-run over the events already counted
+# (their windows advance with time), the state rules keep their verdict and re-report a cached
+# 'danger' one (through dedup and the auto-pause counter), and the balance rule cannot fire
+WINDOWED_RULES = ("check_rule_2_transactions", "check_rule_3_functions", "check_rule_4_reentrancy")
+STATE_RULES = ("check_rule_5_flash_loan", "check_rule_6_ownership", "check_rule_7_price_manipulation")
+
+# Contract statuses alerts can set, by severity (the worst one requested in a check is written;
+# healthy/offline from reachability changes rank lowest)
+STATUS_SEVERITY = {"warning": 1, "critical": 2}
+
+# A contract is paused after this many consecutive 'danger' alerts, once they have also lasted as
+# long as that many polls at its configured interval (adaptive polling at the suspicion interval
+# produces alerts much faster than the configured interval)
+AUTO_PAUSE_DANGER_EVENTS = 5
+
 class ContractMonitor:
     """Main contract monitoring logic"""
     
-    def __init__(self, canister_client, discord_notifier, monitoring_rules, monitoring_interval=300):
+    def __init__(self, canister_client, discord_notifier, monitoring_rules, monitoring_interval=300,
+                 max_concurrent_checks=10, contract_check_timeout=60,
+                 adaptive_polling=True, suspicion_interval=10, max_interval=3600, backoff_factor=2,
+                 alert_workers=20, alert_queue_size=1000, alert_max_attempts=3, alert_suppression_window=900):
         self.canister_client = canister_client
         self.discord_notifier = discord_notifier
         self.monitoring_rules = monitoring_rules
         self.monitoring_interval = monitoring_interval
+        # Contracts are checked concurrently, at most max_concurrent_checks at a time,
+        # and a single contract check is abandoned after contract_check_timeout seconds
+        self.max_concurrent_checks = max(1, max_concurrent_checks)
+        self.contract_check_timeout = contract_check_timeout
+        self.last_cycle_stats: Dict = {}
+        # Per-contract polling intervals (seconds), keyed by contract address
+        self.contract_intervals: Dict[str, float] = {}
+        self.scheduler = ContractScheduler(
+            self.check_contract_isolated,
+            default_interval=monitoring_interval,
+            workers=self.max_concurrent_checks,
+        )
+        # How often the contract list is re-read to pick up added/removed contracts
+        self.contract_sync_interval = min(monitoring_interval, 60)
+        # Adaptive polling: drop to suspicion_interval on alerts or attack indicators, back off
+        # by backoff_factor (up to max_interval) while transactions and balance stay unchanged
+        self.adaptive_polling = adaptive_polling
+        self.suspicion_interval = suspicion_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.adaptive_state: Dict[str, Dict] = {}
+        # Change detection: last evaluated state fingerprint and rule verdicts per contract
+        self.rule_cache: Dict[str, Dict] = {}
+        self.rule_eval_stats: Dict[str, Dict[str, int]] = {}
+        # getContractInfo calls: one snapshot per contract check, shared by every alert it raises
+        self.fetch_stats = {"contract_checks": 0, "snapshot_fetches": 0, "alert_refetches": 0}
+        # Alert side effects (canister record, Discord, status/pause) are delivered by workers
+        self.alert_pipeline = AlertPipeline(workers=alert_workers, max_queue=alert_queue_size,
+                                            max_attempts=alert_max_attempts)
+        # Repeats of the same alert inside the suppression window are counted, not re-sent
+        self.alert_dedup = AlertDeduplicator(window=alert_suppression_window)
+        # Status changes requested by alerts during a check, flushed once per contract at its end,
+        # and the last status written per contract (writes that would not change it are skipped)
+        self.pending_status: Dict[str, Dict] = {}
+        self.contract_statuses: Dict[str, str] = {}
+        self.status_write_stats = {"requested": 0, "written": 0, "skipped_unchanged": 0}
+        # Contracts whose canister's circuit breaker is open, with the time they became unreachable
+        self.unreachable_contracts: Dict[str, str] = {}
         self.monitoring_active = False
         self.last_balances: Dict[str, float] = {}
-        # Track consecutive 'sus' alerts per contract
+        # Windowed transaction / function-call counters per contract, fed incrementally by rules 2-4
+        self.contract_activity: Dict[str, ContractActivity] = {}
+        # Streaming EWMA price-return state per contract, for rule 7
+        self.price_detectors: Dict[str, EwmaPriceDetector] = {}
+        # Track consecutive 'sus' alerts per contract, and when each streak started
         self.sus_event_counters: Dict[str, int] = {}
+        self.sus_event_started: Dict[str, float] = {}
         self.contract_webhooks = {}
     
     def set_contract_webhook(self, contract_id, webhook_url):
@@ -35,83 +115,249 @@ class ContractMonitor:
     def get_contract_webhook(self, contract_id):
         return self.contract_webhooks.get(contract_id, DISCORD_WEBHOOK_URL)
     
+    def set_contract_interval(self, contract_id: str, interval: Optional[float]) -> bool:
+        """Set a contract's polling interval in seconds (None restores the default); applies immediately"""
+        if interval:
+            self.contract_intervals[contract_id] = float(interval)
+        else:
+            self.contract_intervals.pop(contract_id, None)
+        self.adaptive_state.pop(contract_id, None)  # restart adaptation from the new base interval
+        return self.scheduler.set_interval(contract_id, self.get_contract_interval(contract_id))
+    
+    def get_contract_interval(self, contract_id: str) -> float:
+        """Configured (base) polling interval for a contract"""
+        return self.contract_intervals.get(contract_id, self.monitoring_interval)
+    
+    def get_effective_interval(self, contract_id: str) -> float:
+        """Interval currently in use, after adaptive speed-up/back-off"""
+        state = self.adaptive_state.get(contract_id)
+        if self.adaptive_polling and state:
+            return state["interval"]
+        return self.get_contract_interval(contract_id)
+    
+    def _set_effective_interval(self, contract_id: str, interval: float, reason: str):
+        state = self.adaptive_state.setdefault(contract_id, {"fingerprint": None})
+        if state.get("interval") != interval:
+            logger.info(f"⏲️ Polling {contract_id} every {interval:g}s ({reason})")
+        state["interval"] = interval
+        state["reason"] = reason
+        self.scheduler.set_interval(contract_id, interval)
+    
+    def adapt_polling_interval(self, contract_id: str, contract_data: Dict):
+        """Adjust a contract's polling interval from the latest reading"""
+        if not self.adaptive_polling:
+            return
+        base = self.get_contract_interval(contract_id)
+        state = self.adaptive_state.get(contract_id, {})
+        current = state.get("interval", base)
+        fingerprint = (contract_data.get('transaction_count'), contract_data.get('balance'))
+        
+        if contract_data.get('reentrancy_call_count', 0) > 0 or contract_data.get('flashloan_active'):
+            interval, reason = min(self.suspicion_interval, base), "suspicious reading"
+        elif fingerprint == state.get("fingerprint"):
+            interval, reason = min(current * self.backoff_factor, max(self.max_interval, base)), "idle"
+        elif current > base:
+            interval, reason = base, "activity"
+        else:
+            # Activity after a speed-up: relax back toward the base interval
+            interval, reason = min(current * self.backoff_factor, base), "activity"
+        
+        self._set_effective_interval(contract_id, interval, reason)
+        self.adaptive_state[contract_id]["fingerprint"] = fingerprint
+    
+    def mark_suspicious(self, contract_id: str, reason: str):
+        """Poll a contract at the suspicion interval right away (e.g. after a warning/danger alert)"""
+        if self.adaptive_polling:
+            self._set_effective_interval(contract_id, min(self.suspicion_interval, self.get_contract_interval(contract_id)), reason)
+    
+    def get_polling_intervals(self) -> Dict[str, Dict]:
+        """Configured and effective polling interval per scheduled contract"""
+        return {
+            contract_id: {
+                "configured_seconds": self.get_contract_interval(contract_id),
+                "effective_seconds": self.get_effective_interval(contract_id),
+                "reason": self.adaptive_state.get(contract_id, {}).get("reason", "configured"),
+            }
+            for contract_id in self.scheduler.entries
+        }
+    
     async def start_monitoring(self):
-        """Start the monitoring loop"""
+        """Start the per-contract scheduler and keep its contract list in sync with the canister"""
         self.monitoring_active = True
+        self.scheduler.start()
+        self.alert_pipeline.start()
         logger.info("🐦 Canary Contract Guardian monitoring started")
         
         while self.monitoring_active:
+            tick_started = time.monotonic()
+            outcomes_before = dict(self.scheduler.outcomes)
+            synced = False
             try:
-                await self.monitor_contracts()
-                await asyncio.sleep(self.monitoring_interval)
+                synced = await self.sync_contract_set()
+                await asyncio.sleep(self.contract_sync_interval)
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {e}")
                 await asyncio.sleep(60)  # Wait 1 minute before retry
+            self.record_cycle_stats(tick_started, outcomes_before, synced)
+    
+    async def sync_contract_set(self) -> bool:
+        """Schedule contracts page by page as they are read; False if any page could not be read"""
+        current = set()
+        try:
+            async for contract in self.canister_client.iter_contracts():
+                address = contract.get('address', '')
+                if address:
+                    current.add(address)
+                    self.scheduler.schedule(address, contract, self.get_effective_interval(address))
+        except ContractListError as e:
+            # A failed read is not an empty fleet: removals are only applied on a complete set
+            logger.warning(f"⚠️ {e}, keeping the current schedule")
+            return False
+        self.scheduler.retain(current)
+        return True
+    
+    def record_cycle_stats(self, started_at: float, outcomes_before: Dict[str, int], synced: bool):
+        """Store the scheduler's check outcomes since the start of a sync tick as last_cycle_stats"""
+        outcomes = self.scheduler.outcomes
+        stats = {key: outcomes.get(key, 0) - outcomes_before.get(key, 0)
+                 for key in ("contracts_checked", "timeouts", "errors")}
+        stats.update({
+            "contracts": len(self.scheduler.entries),
+            "contract_list_synced": synced,
+            "duration_seconds": round(time.monotonic() - started_at, 3),
+            "finished_at": datetime.now().isoformat(),
+        })
+        self.last_cycle_stats = stats
     
     async def monitor_contracts(self):
-        """Monitor all contracts for rule violations"""
+        """Monitor all contracts for rule violations, checking each page of contracts as it arrives"""
         try:
-            contracts = await self.canister_client.get_contracts()
+            logger.info(f"Monitoring contracts (up to {self.max_concurrent_checks} at a time)...")
             
-            if not contracts:
+            started_at = time.monotonic()
+            stats = {"contracts_checked": 0, "timeouts": 0, "errors": 0}
+            semaphore = asyncio.Semaphore(self.max_concurrent_checks)
+            pending = set()
+            contract_count = 0
+            
+            async def check_bounded(contract: Dict):
+                try:
+                    stats[await self.check_contract_isolated(contract)] += 1
+                finally:
+                    semaphore.release()
+            
+            # A slot is taken before the next contract is pulled, so paging waits for free
+            # workers and at most max_concurrent_checks checks are held in memory
+            async for contract in self.canister_client.iter_contracts():
+                await semaphore.acquire()
+                contract_count += 1
+                task = asyncio.ensure_future(check_bounded(contract))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            await asyncio.gather(*pending)
+            
+            if not contract_count:
                 logger.info("No contracts to monitor")
                 return
             
-            logger.info(f"Monitoring {len(contracts)} contracts...")
-            
-            for contract in contracts:
-                await self.check_contract_rules(contract)
+            stats.update({
+                "contracts": contract_count,
+                "duration_seconds": round(time.monotonic() - started_at, 3),
+                "finished_at": datetime.now().isoformat(),
+            })
+            self.last_cycle_stats = stats
+            logger.info(f"✅ Monitoring cycle done in {stats['duration_seconds']}s: {stats['contracts_checked']} checked, "
+                        f"{stats['timeouts']} timed out, {stats['errors']} errors")
                 
         except Exception as e:
             logger.error(f"Error monitoring contracts: {e}")
     
-    async def check_contract_rules(self, contract: Dict):
-        """Check all rules for a specific contract"""
+    async def check_contract_isolated(self, contract: Dict) -> str:
+        """Check one contract with a timeout; returns 'contracts_checked', 'timeouts' or 'errors'"""
+        address = contract.get('address', '')
+        try:
+            ok = await asyncio.wait_for(self.check_contract_rules(contract), timeout=self.contract_check_timeout)
+            return "contracts_checked" if ok else "errors"
+        except asyncio.TimeoutError:
+            logger.warning(f"⏱️ Check for contract {address} timed out after {self.contract_check_timeout}s")
+            return "timeouts"
+        except Exception as e:
+            logger.error(f"Error checking contract {address}: {e}")
+            return "errors"
+    
+    async def check_contract_rules(self, contract: Dict) -> bool:
+        """Check all rules for a specific contract, returning False if it could not be checked"""
         try:
             contract_address = contract.get('address', '')
             
             logger.info(f"Checking rules for contract: {contract_address}")
             
+            self.fetch_stats["contract_checks"] += 1
             contract_data_result = await self.fetch_contract_data(contract_address)
             
             if not contract_data_result:
                 logger.warning(f"Could not fetch data for contract {contract_address}")
-                return
+                return False
             
-            # Check Rule 1: Balance Drop
-            await self.check_rule_1_balance(contract, contract_data_result)
+            self.adapt_polling_interval(contract_address, contract_data_result)
             
-            # Check Rule 2: Transaction Volume  
-            await self.check_rule_2_transactions(contract, contract_data_result)
+            fingerprint = contract_data_result.get('state_fingerprint')
+            cached = self.rule_cache.get(contract_address)
+            stats = self.rule_eval_stats.setdefault(contract_address, {"evaluated": 0, "skipped": 0})
             
-            # Check Rule 3: Function Calls
-            await self.check_rule_3_functions(contract, contract_data_result)
+            if fingerprint is not None and cached and cached["fingerprint"] == fingerprint:
+                # Canister state unchanged since the last evaluation: cheap tick instead of all 7 rules
+                stats["skipped"] += 1
+                await self.tick_unchanged_contract(contract, contract_data_result, cached["verdicts"])
+                return True
             
-            # Check New Security Rules
-            # Rule 4: Reentrancy Attack Detection
-            await self.check_rule_4_reentrancy(contract, contract_data_result)
+            # Evaluate all 7 rules (balance, volume, functions, reentrancy, flash loan, ownership, price)
+            stats["evaluated"] += 1
+            verdicts = {}
+            for rule_name in CONTRACT_RULES:
+                verdicts[rule_name] = await getattr(self, rule_name)(contract, contract_data_result)
             
-            # Rule 5: Flash Loan Attack Pattern
-            await self.check_rule_5_flash_loan(contract, contract_data_result)
-            
-            # Rule 6: Ownership Change Alert
-            await self.check_rule_6_ownership(contract, contract_data_result)
-            
-            # Rule 7: Price Manipulation Alert
-            await self.check_rule_7_price_manipulation(contract, contract_data_result)
+            if fingerprint is not None:
+                self.rule_cache[contract_address] = {"fingerprint": fingerprint, "verdicts": verdicts}
+            return True
             
         except Exception as e:
             logger.error(f"Error checking rules for contract {contract.get('address', '')}: {e}")
+            return False
+        finally:
+            # One status write per contract per check, however many rules fired
+            await self.flush_contract_status(contract)
+    
+    async def tick_unchanged_contract(self, contract: Dict, data: Dict, verdicts: Dict):
+        """Re-run the windowed rules without new events and re-report cached 'danger' state verdicts"""
+        tick_data = dict(data, recent_transactions=[], function_calls=[])
+        for rule_name in CONTRACT_RULES:
+            if rule_name in WINDOWED_RULES:
+                verdicts[rule_name] = await getattr(self, rule_name)(contract, tick_data)
+            elif rule_name in STATE_RULES:
+                alert = verdicts.get(rule_name)
+                if alert and alert.get('severity', '').lower() == 'danger':
+                    await self.handle_alert(contract, alert, data)
+    
+    def get_fetch_stats(self) -> Dict[str, int]:
+        """Snapshot fetch counters; snapshot_fetches == contract_checks when alerts reuse the snapshot"""
+        return dict(self.fetch_stats)
+    
+    def get_rule_eval_stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-contract counts of full rule evaluations and cheap ticks on unchanged state"""
+        return {address: dict(stats) for address, stats in self.rule_eval_stats.items()}
     
     async def fetch_contract_data(self, contract_address: str) -> Optional[Dict]:
         """Fetch contract data from the actual contract canister"""
         try:
             logger.info(f"Fetching real data for contract: {contract_address}")
+            self.fetch_stats["snapshot_fetches"] += 1
             
             # Try to get real contract info from the dummy contract
             result = await self.canister_client.call_canister("getContractInfo", "", canister_name=contract_address)
             
             if result and result.get("status") == "success":
+                self.mark_reachable(contract_address)
                 # Parse the Candid response to extract contract data
                 candid_data = result.get("data", "")
                 logger.debug(f"Raw contract data: {candid_data}")
@@ -120,11 +366,18 @@ class ContractMonitor:
                 contract_data = self.parse_contract_info_from_candid(candid_data)
                 
                 if contract_data:
+                    # Fingerprint of the raw reply, used to skip rule evaluation when nothing changed
+                    contract_data["state_fingerprint"] = hashlib.sha1(candid_data.encode("utf-8")).hexdigest()
                     logger.info(f"✅ Real contract data fetched - Balance: {contract_data.get('balance', 'N/A')}, Transactions: {contract_data.get('transaction_count', 'N/A')}")
                     return contract_data
                 else:
                     logger.warning("Could not parse contract data from Candid response")
             
+            if self.canister_client.is_canister_unreachable(contract_address):
+                # Circuit open: no data (real or mock) until a probe gets through
+                self.mark_unreachable(contract_address)
+                return None
+            
             # Fallback to mock data if real data fetch fails
             logger.warning(f"Failed to fetch real data for {contract_address}, using mock data")
             return self.generate_mock_contract_data()
@@ -134,57 +387,55 @@ class ContractMonitor:
             # Fallback to mock data
             return self.generate_mock_contract_data()
     
+    def mark_unreachable(self, contract_address: str):
+        """Flag a contract whose canister fails fast; its status is set to offline"""
+        if contract_address not in self.unreachable_contracts:
+            logger.warning(f"🔌 Contract {contract_address} is unreachable, pausing rule checks until its canister answers")
+            self.unreachable_contracts[contract_address] = datetime.now().isoformat()
+        self.queue_contract_status(contract_address, "offline")
+    
+    def mark_reachable(self, contract_address: str):
+        """Clear the unreachable flag after a successful call (restores the healthy status)"""
+        if self.unreachable_contracts.pop(contract_address, None) is not None:
+            logger.info(f"✅ Contract {contract_address} is reachable again")
+            self.queue_contract_status(contract_address, "healthy")
+    
+    def get_unreachable_contracts(self) -> Dict[str, str]:
+        return dict(self.unreachable_contracts)
+    
     def parse_contract_info_from_candid(self, candid_output: str) -> Optional[Dict]:
         """Parse contract info from Candid output"""
         try:
             logger.debug(f"Parsing Candid output: {candid_output}")
             
             # Look for the record pattern in Candid output
-            if "record {" in candid_output:
-                # Extract balance - handle both with and without underscores and type annotations
-                balance_match = re.search(r'balance\s*=\s*([0-9_]+)(?:\s*:\s*\w+)?', candid_output)
-                if balance_match:
-                    balance_str = balance_match.group(1).replace('_', '')  # Remove underscores
-                    balance = int(balance_str)
+            record = next(iter_records(parse_dfx_output(candid_output)), None)
+            if record is not None:
+                def _count(field: str, default: Optional[int]) -> Optional[int]:
+                    return as_int(record.get(field), default)
+                
+                balance = _count('balance', None)
+                if balance is not None:
                     logger.info(f"✅ Parsed balance: {balance}")
                 else:
                     balance = 1000000
                     logger.warning("Could not parse balance, using default")
                 
-                # Extract transaction count - handle type annotations
-                transactions_match = re.search(r'transactions\s*=\s*([0-9_]+)(?:\s*:\s*\w+)?', candid_output)
-                if transactions_match:
-                    transaction_str = transactions_match.group(1).replace('_', '')
-                    transaction_count = int(transaction_str)
+                transaction_count = _count('transactions', None)
+                if transaction_count is not None:
                     logger.info(f"✅ Parsed transaction count: {transaction_count}")
                 else:
                     transaction_count = 0
                     logger.warning("Could not parse transaction count, using default")
                 
-                # Extract last activity - handle type annotations
-                last_activity_match = re.search(r'lastActivity\s*=\s*([+-]?[0-9_]+)(?:\s*:\s*\w+)?', candid_output)
-                if last_activity_match:
-                    activity_str = last_activity_match.group(1).replace('_', '')
-                    last_activity = int(activity_str)
-                else:
-                    last_activity = int(time.time())
-                
-                # Extract upgrade status
-                upgrading_match = re.search(r'isUpgrading\s*=\s*(true|false)', candid_output)
-                is_upgrading = upgrading_match.group(1) == 'true' if upgrading_match else False
+                last_activity = _count('lastActivity', int(time.time()))
+                is_upgrading = record.get('isUpgrading') is True
                 
-                # Extract NEW security state indicators - handle type annotations
-                reentrancy_match = re.search(r'reentrancyCallCount\s*=\s*([0-9_]+)(?:\s*:\s*\w+)?', candid_output)
-                reentrancy_count = int(reentrancy_match.group(1).replace('_', '')) if reentrancy_match else 0
-                
-                flashloan_match = re.search(r'flashLoanActive\s*=\s*(true|false)', candid_output)
-                flashloan_active = flashloan_match.group(1) == 'true' if flashloan_match else False
-                
-                ownership_match = re.search(r'ownershipChangeCount\s*=\s*([0-9_]+)(?:\s*:\s*\w+)?', candid_output)
-                ownership_changes = int(ownership_match.group(1).replace('_', '')) if ownership_match else 0
-                
-                price_match = re.search(r'priceManipulationActive\s*=\s*(true|false)', candid_output)
-                price_manipulation = price_match.group(1) == 'true' if price_match else False
+                # Security state indicators
+                reentrancy_count = _count('reentrancyCallCount', 0)
+                flashloan_active = record.get('flashLoanActive') is True
+                ownership_changes = _count('ownershipChangeCount', 0)
+                price_manipulation = record.get('priceManipulationActive') is True
                 
                 current_time = time.time()
                 
@@ -216,12 +467,13 @@ class ContractMonitor:
             return None
     
     def generate_enhanced_transactions(self, transaction_count: int, flashloan_active: bool, current_time: float) -> List[Dict]:
-        """Generate enhanced transaction data based on contract state"""
+        """Generate enhanced transaction data based on contract state (ids stay stable across fetches)"""
         transactions = []
         
         if flashloan_active:
             # Generate flash loan attack pattern
             transactions.append({
+                "id": "flash-loan-borrow",
                 "timestamp": current_time - 300,  # 5 minutes ago
                 "amount": 1500000,  # Large flash loan
                 "type": "borrow",
@@ -232,6 +484,7 @@ class ContractMonitor:
             # Add rapid subsequent transactions
             for i in range(4):
                 transactions.append({
+                    "id": f"flash-loan-transfer-{i}",
                     "timestamp": current_time - 240 + (i * 15),  # 15 seconds apart
                     "amount": 50000 + (i * 10000),
                     "type": "transfer",
@@ -242,6 +495,7 @@ class ContractMonitor:
         # Add normal transactions
         for i in range(min(transaction_count, 15)):
             transactions.append({
+                "id": f"tx-{transaction_count - i}",  # i-th latest of the contract's transactions
                 "timestamp": current_time - (i * 300),  # Every 5 minutes
                 "amount": random.uniform(1, 100),
                 "type": "transfer",
@@ -252,13 +506,14 @@ class ContractMonitor:
         return transactions
     
     def generate_enhanced_function_calls(self, reentrancy_count: int, is_upgrading: bool, current_time: float) -> List[Dict]:
-        """Generate enhanced function call data based on contract state"""
+        """Generate enhanced function call data based on contract state (ids stay stable across fetches)"""
         function_calls = []
         
         if reentrancy_count > 0:
             # Generate reentrancy attack pattern
             for i in range(reentrancy_count):
                 function_calls.append({
+                    "id": f"withdraw-{i}",
                     "timestamp": current_time - 60 + (i * 5),  # 5 seconds apart within 1 minute
                     "function_name": "withdraw",
                     "caller": "attacker_contract",
@@ -268,6 +523,7 @@ class ContractMonitor:
         
         if is_upgrading:
             function_calls.append({
+                "id": "admin_upgrade-0",
                 "timestamp": current_time - 1800,  # 30 minutes ago
                 "function_name": "admin_upgrade",
                 "caller": "admin_user",
@@ -340,6 +596,7 @@ class ContractMonitor:
         transaction_count = random.randint(0, 11)  # Sometimes exceed limit for demo
         
         return {
+            "is_mock": True,
             "balance": current_balance,
             "transaction_count": transaction_count,
             "recent_transactions": [
@@ -439,7 +696,26 @@ class ContractMonitor:
             logger.error(f"Error generating AI recommendation: {e}")
             return f"🤖 AI Recommendation: Unable to generate specific recommendation. Please review alert manually and take appropriate action based on severity: {severity}"
     
-    async def check_rule_1_balance(self, contract: Dict, data: Dict):
+    def get_contract_activity(self, contract_address: str, data: Dict) -> Optional[ContractActivity]:
+        """Windowed event counters for a contract, created on first use; None for mock fallback
+        data, whose random events are new on every check and are only counted within that check"""
+        if data.get('is_mock'):
+            return None
+        activity = self.contract_activity.get(contract_address)
+        if activity is None:
+            activity = self.contract_activity[contract_address] = ContractActivity(TRANSACTION_TIME_WINDOW)
+        return activity
+    
+    def get_price_detector(self, contract_address: str, data: Dict) -> Optional[EwmaPriceDetector]:
+        """Streaming price detector for a contract, created on first use; None for mock fallback data"""
+        if data.get('is_mock'):
+            return None
+        detector = self.price_detectors.get(contract_address)
+        if detector is None:
+            detector = self.price_detectors[contract_address] = EwmaPriceDetector(PRICE_CHANGE_THRESHOLD)
+        return detector
+    
+    async def check_rule_1_balance(self, contract: Dict, data: Dict) -> Optional[Dict]:
         """Check balance drop rule"""
         try:
             contract_address = contract.get('address', '')
@@ -451,57 +727,68 @@ class ContractMonitor:
             )
             
             if alert:
-                await self.handle_alert(contract, alert)
+                await self.handle_alert(contract, alert, data)
             
             # Update stored balance
             self.last_balances[contract_address] = current_balance
+            return alert
             
         except Exception as e:
             logger.error(f"Error checking balance rule: {e}")
+            return None
     
-    async def check_rule_2_transactions(self, contract: Dict, data: Dict):
+    async def check_rule_2_transactions(self, contract: Dict, data: Dict) -> Optional[Dict]:
         """Check transaction volume rule"""
         try:
             contract_address = contract.get('address', '')
             transactions = data.get('recent_transactions', [])
+            activity = self.get_contract_activity(contract_address, data)
             
-            alert = await self.monitoring_rules.check_transaction_volume(contract_address, transactions)
+            alert = await self.monitoring_rules.check_transaction_volume(contract_address, transactions, activity)
             
             if alert:
-                await self.handle_alert(contract, alert)
-                
+                await self.handle_alert(contract, alert, data)
+            return alert
+            
         except Exception as e:
             logger.error(f"Error checking transaction rule: {e}")
+            return None
     
-    async def check_rule_3_functions(self, contract: Dict, data: Dict):
+    async def check_rule_3_functions(self, contract: Dict, data: Dict) -> Optional[Dict]:
         """Check function call rule"""
         try:
             contract_address = contract.get('address', '')
             function_calls = data.get('function_calls', [])
+            activity = self.get_contract_activity(contract_address, data)
             
-            alert = await self.monitoring_rules.check_function_calls(contract_address, function_calls)
+            alert = await self.monitoring_rules.check_function_calls(contract_address, function_calls, activity)
             
             if alert:
-                await self.handle_alert(contract, alert)
-                
+                await self.handle_alert(contract, alert, data)
+            return alert
+            
         except Exception as e:
             logger.error(f"Error checking function rule: {e}")
+            return None
     
-    async def check_rule_4_reentrancy(self, contract: Dict, data: Dict):
+    async def check_rule_4_reentrancy(self, contract: Dict, data: Dict) -> Optional[Dict]:
         """Check reentrancy attack detection rule"""
         try:
             contract_address = contract.get('address', '')
             function_calls = data.get('function_calls', [])
+            activity = self.get_contract_activity(contract_address, data)
             
-            alert = await self.monitoring_rules.check_reentrancy_attack(contract_address, function_calls)
+            alert = await self.monitoring_rules.check_reentrancy_attack(contract_address, function_calls, activity)
             
             if alert:
-                await self.handle_alert(contract, alert)
-                
+                await self.handle_alert(contract, alert, data)
+            return alert
+            
         except Exception as e:
             logger.error(f"Error checking reentrancy rule: {e}")
+            return None
     
-    async def check_rule_5_flash_loan(self, contract: Dict, data: Dict):
+    async def check_rule_5_flash_loan(self, contract: Dict, data: Dict) -> Optional[Dict]:
         """Check flash loan attack pattern rule"""
         try:
             contract_address = contract.get('address', '')
@@ -510,12 +797,14 @@ class ContractMonitor:
             alert = await self.monitoring_rules.check_flash_loan_attack(contract_address, transactions)
             
             if alert:
-                await self.handle_alert(contract, alert)
-                
+                await self.handle_alert(contract, alert, data)
+            return alert
+            
         except Exception as e:
             logger.error(f"Error checking flash loan rule: {e}")
+            return None
     
-    async def check_rule_6_ownership(self, contract: Dict, data: Dict):
+    async def check_rule_6_ownership(self, contract: Dict, data: Dict) -> Optional[Dict]:
         """Check ownership change alert rule"""
         try:
             contract_address = contract.get('address', '')
@@ -524,27 +813,40 @@ class ContractMonitor:
             alert = await self.monitoring_rules.check_ownership_change(contract_address, admin_events)
             
             if alert:
-                await self.handle_alert(contract, alert)
-                
+                await self.handle_alert(contract, alert, data)
+            return alert
+            
         except Exception as e:
             logger.error(f"Error checking ownership rule: {e}")
+            return None
     
-    async def check_rule_7_price_manipulation(self, contract: Dict, data: Dict):
+    async def check_rule_7_price_manipulation(self, contract: Dict, data: Dict) -> Optional[Dict]:
         """Check price manipulation alert rule"""
         try:
             contract_address = contract.get('address', '')
             price_data = data.get('price_data', [])
+            detector = self.get_price_detector(contract_address, data)
             
-            alert = await self.monitoring_rules.check_price_manipulation(contract_address, price_data)
+            alert = await self.monitoring_rules.check_price_manipulation(contract_address, price_data, detector)
             
             if alert:
-                await self.handle_alert(contract, alert)
-                
+                await self.handle_alert(contract, alert, data)
+            return alert
+            
         except Exception as e:
             logger.error(f"Error checking price manipulation rule: {e}")
+            return None
+    
+    def _reset_sus_events(self, contract_address: str):
+        self.sus_event_counters[contract_address] = 0
+        self.sus_event_started.pop(contract_address, None)
     
-    async def handle_alert(self, contract: Dict, alert: Dict):
-        """Handle triggered alert and pause contract after 5 consecutive 'sus' events"""
+    async def handle_alert(self, contract: Dict, alert: Dict, contract_data: Optional[Dict] = None):
+        """Handle triggered alert and pause contract after 5 consecutive 'sus' events spanning
+        at least 4 configured polling intervals
+
+        contract_data is the snapshot the alert was raised from; it is only re-fetched
+        when a caller outside the check cycle doesn't have one."""
         try:
             contract_id = contract.get('id', 0)
             contract_address = contract.get('address', '')
@@ -556,8 +858,10 @@ class ContractMonitor:
             logger.info(f"   Severity: {alert['severity']}")
             logger.info(f"   Description: {alert['description']}")
 
-            # Fetch latest contract data for AI recommendation
-            contract_data = await self.fetch_contract_data(contract_address)
+            # Use the cycle's snapshot for the AI recommendation
+            if contract_data is None:
+                self.fetch_stats["alert_refetches"] += 1
+                contract_data = await self.fetch_contract_data(contract_address)
             if not contract_data:
                 contract_data = {}
 
@@ -565,84 +869,155 @@ class ContractMonitor:
             recommendation = self.generate_recommendation(alert, contract, contract_data)
             logger.info(f"   🤖 Recommendation: {recommendation}")
 
-            # Track consecutive 'danger' events and freeze contract after 5
+            if alert.get('severity', '').lower() in ('danger', 'warning'):
+                self.mark_suspicious(contract_address, f"{alert.get('severity', '').lower()} alert")
+
+            # Track consecutive 'danger' events and freeze contract after 5 that span
+            # 4 configured intervals (the time 5 polls take without adaptive speed-up)
+            pause_contract = False
             if alert.get('severity', '').lower() == 'danger':
                 self.sus_event_counters[contract_address] = self.sus_event_counters.get(contract_address, 0) + 1
-                logger.info(f"Consecutive 'sus' events for {contract_address}: {self.sus_event_counters[contract_address]}")
-                if self.sus_event_counters[contract_address] >= 5:
-                    logger.warning(f"5 consecutive 'sus' events detected for {contract_address}. Triggering pauseContract (freeze).")
-                    # This will freeze the contract in the backend canister
-                    try:
-                        pause_result = await self.canister_client.pause_contract(contract_id)
-                        if pause_result:
-                            logger.info(f"✅ pauseContract called successfully for contract {contract_address} (contract is now frozen)")
-                        else:
-                            logger.error(f"❌ pauseContract failed for contract {contract_address}")
-                    except Exception as e:
-                        logger.error(f"❌ Error calling pauseContract: {e}")
-                    self.sus_event_counters[contract_address] = 0  # Reset counter after pausing
+                started = self.sus_event_started.setdefault(contract_address, time.time())
+                lasted = time.time() - started
+                logger.info(f"Consecutive 'sus' events for {contract_address}: {self.sus_event_counters[contract_address]} "
+                            f"over {lasted:.0f}s")
+                required = (AUTO_PAUSE_DANGER_EVENTS - 1) * self.get_contract_interval(contract_address)
+                if self.sus_event_counters[contract_address] >= AUTO_PAUSE_DANGER_EVENTS and lasted >= required:
+                    logger.warning(f"{AUTO_PAUSE_DANGER_EVENTS} consecutive 'sus' events over {lasted:.0f}s detected for "
+                                   f"{contract_address}. Triggering pauseContract (freeze).")
+                    pause_contract = True
+                    self._reset_sus_events(contract_address)  # Reset counter after pausing
             else:
-                self.sus_event_counters[contract_address] = 0  # Reset if not 'sus'
+                self._reset_sus_events(contract_address)  # Reset if not 'sus'
 
-            # Create alert in canister
-            try:
-                success = await self.canister_client.create_alert(
-                    contract_id=contract_id,
-                    rule_id=alert['rule_id'],
-                    title=alert['title'],
-                    description=alert['description'],
-                    severity=alert['severity']
-                )
-                if success:
-                    logger.info("✅ Alert stored in canister successfully")
-                else:
-                    logger.error("❌ Failed to store alert in canister")
-            except Exception as e:
-                logger.error(f"❌ Error storing alert in canister: {e}")
-
-            # Send Discord notification
-            try:
-                discord_alert = {
-                    "title": alert['title'],
-                    "description": alert['description'],
-                    "severity": alert['severity'],
-                    "contract_address": contract_address,
-                    "contract_nickname": contract_nickname,
-                    "rule_name": alert['rule_name'],
-                    "recommendation": recommendation,
-                    "timestamp": datetime.utcnow().isoformat()
-                }
-                logger.info("📢 Sending Discord alert...")
-                webhook_url = self.get_contract_webhook(str(contract.get('address', '')))
-                discord_notifier = self.discord_notifier
+            # Status (and a due pause) is written once when the contract's check finishes
+            self.queue_contract_status(contract_address, "critical" if alert['severity'] == "danger" else "warning",
+                                       pause_contract)
 
-                if webhook_url != DISCORD_WEBHOOK_URL:
-                    from agent.discord_notifier import DiscordNotifier
-                    discord_notifier = DiscordNotifier(webhook_url)
-                discord_success = await discord_notifier.send_alert(discord_alert)
-                 
-                if discord_success:
-                    logger.info("✅ Discord alert sent successfully")
-                else:
-                    logger.error("❌ Discord alert failed to send")
-            except Exception as e:
-                logger.error(f"❌ Error sending Discord alert: {e}")
+            # Side effects run on the alert pipeline workers, off the detection path
+            alert = self.alert_dedup.admit(contract_address, alert)
+            if alert is None:
+                # Repeat inside the suppression window: no canister alert or Discord post
+                return
 
-            # Update contract status in canister
-            try:
-                new_status = "critical" if alert['severity'] == "danger" else "warning"
-                await self.canister_client.update_contract_status(contract_id, new_status)
-                logger.info(f"✅ Contract status updated to: {new_status}")
-            except Exception as e:
-                logger.error(f"❌ Error updating contract status: {e}")
+            discord_alert = {
+                "title": alert['title'],
+                "description": alert['description'],
+                "severity": alert['severity'],
+                "contract_address": contract_address,
+                "contract_nickname": contract_nickname,
+                "rule_name": alert['rule_name'],
+                "recommendation": recommendation,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+            await self.alert_pipeline.publish(
+                f"{alert['rule_name']}@{contract_address}",
+                {
+                    "store_alert": lambda: self.store_alert(contract_id, alert),
+                    "discord": lambda: self.send_discord_alert(contract_address, discord_alert),
+                },
+            )
 
         except Exception as e:
             logger.error(f"❌ Error handling alert: {e}")
             logger.error(f"Traceback: {traceback.format_exc()}")
     
+    async def store_alert(self, contract_id: int, alert: Dict) -> bool:
+        """Create the alert record in the canister"""
+        success = await self.canister_client.create_alert(
+            contract_id=contract_id,
+            rule_id=alert['rule_id'],
+            title=alert['title'],
+            description=alert['description'],
+            severity=alert['severity']
+        )
+        if success:
+            logger.info("✅ Alert stored in canister successfully")
+        else:
+            logger.error("❌ Failed to store alert in canister")
+        return success
+
+    async def send_discord_alert(self, contract_address: str, discord_alert: Dict) -> bool:
+        """Send an alert to the contract's Discord webhook (or the default one)"""
+        logger.info("📢 Sending Discord alert...")
+        webhook_url = self.get_contract_webhook(str(contract_address))
+        discord_notifier = self.discord_notifier
+
+        if webhook_url != DISCORD_WEBHOOK_URL:
+            from agent.discord_notifier import DiscordNotifier
+            discord_notifier = DiscordNotifier(webhook_url)
+        discord_success = await discord_notifier.send_alert(discord_alert)
+
+        if discord_success:
+            logger.info("✅ Discord alert sent successfully")
+        else:
+            logger.error("❌ Discord alert failed to send")
+        return discord_success
+
+    def queue_contract_status(self, contract_address: str, status: str, pause_contract: bool = False):
+        """Record the status an alert asks for; the worst one requested during the check wins"""
+        self.status_write_stats["requested"] += 1
+        pending = self.pending_status.setdefault(contract_address, {"status": status, "pause": False})
+        if STATUS_SEVERITY.get(status, 0) > STATUS_SEVERITY.get(pending["status"], 0):
+            pending["status"] = status
+        pending["pause"] = pending["pause"] or pause_contract
+
+    async def flush_contract_status(self, contract: Dict):
+        """Write the contract's pending status (and pause) unless it matches the last known status"""
+        contract_address = contract.get('address', '')
+        pending = self.pending_status.pop(contract_address, None)
+        if not pending:
+            return
+        current = self.contract_statuses.get(contract_address, contract.get('status'))
+        if pending["status"] == current and not pending["pause"]:
+            self.status_write_stats["skipped_unchanged"] += 1
+            return
+        # Recorded when queued so later checks don't repeat a write that is still in flight
+        self.contract_statuses[contract_address] = pending["status"]
+        await self.alert_pipeline.publish(
+            f"status@{contract_address}",
+            {"contract_status": self._contract_status_step(contract.get('id', 0), contract_address,
+                                                            pending["status"], pending["pause"])},
+        )
+
+    def _contract_status_step(self, contract_id: int, contract_address: str, new_status: str, pause_contract: bool):
+        """Pause (if due) then update the contract status; a retry does not repeat a successful pause"""
+        state = {"pause_pending": pause_contract}
+
+        async def step() -> bool:
+            if state["pause_pending"]:
+                # This will freeze the contract in the backend canister
+                if not await self.canister_client.pause_contract(contract_id):
+                    logger.error(f"❌ pauseContract failed for contract {contract_address}")
+                    return False
+                logger.info(f"✅ pauseContract called successfully for contract {contract_address} (contract is now frozen)")
+                state["pause_pending"] = False
+            if not await self.canister_client.update_contract_status(contract_id, new_status):
+                logger.error(f"❌ Error updating contract status to: {new_status}")
+                # Forget the queued status so the next check writes it again if this attempt was the last
+                if self.contract_statuses.get(contract_address) == new_status:
+                    del self.contract_statuses[contract_address]
+                return False
+            logger.info(f"✅ Contract status updated to: {new_status}")
+            self.status_write_stats["written"] += 1
+            self.contract_statuses[contract_address] = new_status
+            return True
+
+        return step
+
+    async def drain_alerts(self, timeout: float = 30):
+        """Deliver queued and in-flight alerts before shutdown"""
+        await self.alert_pipeline.drain(timeout)
+        logger.info("Alert pipeline drained")
+
+    def get_alert_pipeline_stats(self) -> Dict:
+        return {**self.alert_pipeline.diagnostics(), "deduplication": self.alert_dedup.diagnostics(),
+                "statusWrites": dict(self.status_write_stats)}
+    
     def stop_monitoring(self):
         """Stop monitoring"""
         self.monitoring_active = False
+        self.scheduler.stop()
         logger.info("Monitoring stopped")
 
     async def get_status_summary(self) -> str:
@@ -0,0 +1,322 @@
+"""
+Native IC HTTP agent for Canary Contract Guardian
+
+Talks to the replica's /api/v2 query, call and read_state endpoints over a persistent
+aiohttp session instead of spawning a `dfx canister call` process per request.
+Requests are sent as the anonymous principal.
+
+Note: read_state certificates are not BLS-verified against the network root key, so
+this transport is intended for the local replica. Use the dfx transport elsewhere.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import aiohttp
+
+from candid_codec import (
+    decode_args,
+    encode_text_args,
+    encode_uleb128,
+    principal_to_bytes,
+    render_args,
+)
+
+logger = logging.getLogger("CanaryAgent")
+
+ANONYMOUS_SENDER = b"\x04"
+CANISTER_ID_PATTERN = re.compile(r'^[a-z0-9]{5}-[a-z0-9]{5}-[a-z0-9]{5}-[a-z0-9]{5}-[a-z0-9]{3}$')
+
+
+class IcAgentError(Exception):
+    """Raised when the replica rejects or fails a request"""
+
+
+# ============================================================================
+# CBOR (the subset used by the IC HTTP interface)
+# ============================================================================
+
+def _cbor_head(major: int, length: int) -> bytes:
+    if length < 24:
+        return bytes([(major << 5) | length])
+    for info, fmt in ((24, ">B"), (25, ">H"), (26, ">I"), (27, ">Q")):
+        if length < 1 << (8 * struct.calcsize(fmt)):
+            return bytes([(major << 5) | info]) + struct.pack(fmt, length)
+    raise IcAgentError(f"CBOR length {length} too large")
+
+
+def cbor_encode(value: Any) -> bytes:
+    if isinstance(value, bool):
+        return b"\xf5" if value else b"\xf4"
+    if value is None:
+        return b"\xf6"
+    if isinstance(value, int):
+        return _cbor_head(0, value) if value >= 0 else _cbor_head(1, -1 - value)
+    if isinstance(value, (bytes, bytearray)):
+        return _cbor_head(2, len(value)) + bytes(value)
+    if isinstance(value, str):
+        raw = value.encode("utf-8")
+        return _cbor_head(3, len(raw)) + raw
+    if isinstance(value, (list, tuple)):
+        return _cbor_head(4, len(value)) + b"".join(cbor_encode(item) for item in value)
+    if isinstance(value, dict):
+        return _cbor_head(5, len(value)) + b"".join(cbor_encode(k) + cbor_encode(v) for k, v in value.items())
+    raise IcAgentError(f"Cannot CBOR-encode {type(value).__name__}")
+
+
+def cbor_decode(data: bytes) -> Any:
+    value, pos = _cbor_decode_at(data, 0)
+    return value
+
+
+def _cbor_decode_at(data: bytes, pos: int):
+    initial = data[pos]
+    major, info = initial >> 5, initial & 0x1F
+    pos += 1
+    if info < 24:
+        arg = info
+    elif info in (24, 25, 26, 27):
+        size = 1 << (info - 24)
+        arg = int.from_bytes(data[pos:pos + size], "big")
+        pos += size
+    elif info == 31 and major in (2, 3, 4, 5):
+        arg = None  # indefinite length
+    else:
+        raise IcAgentError(f"Unsupported CBOR item 0x{initial:02x}")
+
+    if major == 0:
+        return arg, pos
+    if major == 1:
+        return -1 - arg, pos
+    if major in (2, 3):
+        if arg is None:
+            chunks = []
+            while data[pos] != 0xFF:
+                chunk, pos = _cbor_decode_at(data, pos)
+                chunks.append(chunk)
+            pos += 1
+            joined = b"".join(chunks) if major == 2 else "".join(chunks)
+            return joined, pos
+        raw = data[pos:pos + arg]
+        return (bytes(raw) if major == 2 else raw.decode("utf-8")), pos + arg
+    if major == 4:
+        items = []
+        while (arg is None and data[pos] != 0xFF) or (arg is not None and len(items) < arg):
+            item, pos = _cbor_decode_at(data, pos)
+            items.append(item)
+        return items, (pos + 1 if arg is None else pos)
+    if major == 5:
+        result = {}
+        while (arg is None and data[pos] != 0xFF) or (arg is not None and len(result) < arg):
+            key, pos = _cbor_decode_at(data, pos)
+            result[key], pos = _cbor_decode_at(data, pos)
+        return result, (pos + 1 if arg is None else pos)
+    if major == 6:
+        # Tags (including the self-describe tag) carry no meaning we need
+        return _cbor_decode_at(data, pos)
+    if major == 7:
+        if info == 20:
+            return False, pos
+        if info == 21:
+            return True, pos
+        if info in (22, 23):
+            return None, pos
+        if info == 25:
+            return _half_float(arg), pos
+        if info == 26:
+            return struct.unpack(">f", arg.to_bytes(4, "big"))[0], pos
+        if info == 27:
+            return struct.unpack(">d", arg.to_bytes(8, "big"))[0], pos
+    raise IcAgentError(f"Unsupported CBOR major type {major}")
+
+
+def _half_float(bits: int) -> float:
+    exponent = (bits >> 10) & 0x1F
+    mantissa = bits & 0x3FF
+    if exponent == 0:
+        value = mantissa * 2 ** -24
+    elif exponent == 31:
+        value = float("inf") if mantissa == 0 else float("nan")
+    else:
+        value = (1 + mantissa / 1024) * 2 ** (exponent - 15)
+    return -value if bits & 0x8000 else value
+
+
+# ============================================================================
+# REQUEST IDS AND CERTIFICATES
+# ============================================================================
+
+def _hash_value(value: Any) -> bytes:
+    if isinstance(value, (bytes, bytearray)):
+        return hashlib.sha256(bytes(value)).digest()
+    if isinstance(value, str):
+        return hashlib.sha256(value.encode("utf-8")).digest()
+    if isinstance(value, int):
+        return hashlib.sha256(encode_uleb128(value)).digest()
+    if isinstance(value, (list, tuple)):
+        return hashlib.sha256(b"".join(_hash_value(item) for item in value)).digest()
+    if isinstance(value, dict):
+        return request_id(value)
+    raise IcAgentError(f"Cannot hash {type(value).__name__} for request id")
+
+
+def request_id(content: Dict[str, Any]) -> bytes:
+    """Representation-independent hash of a request content map"""
+    pairs = sorted(hashlib.sha256(key.encode("utf-8")).digest() + _hash_value(value)
+                   for key, value in content.items())
+    return hashlib.sha256(b"".join(pairs)).digest()
+
+
+def lookup_path(tree: List, path: List[bytes]) -> Optional[bytes]:
+    """Look up a path in a certificate hash tree, returning the leaf value if present"""
+    node = tree
+    for label in path:
+        node = _find_label(node, label)
+        if node is None:
+            return None
+    return node[1] if node and node[0] == 3 else None
+
+
+def _find_label(node: List, label: bytes) -> Optional[List]:
+    tag = node[0]
+    if tag == 1:
+        return _find_label(node[1], label) or _find_label(node[2], label)
+    if tag == 2 and node[1] == label:
+        return node[2]
+    return None
+
+
+# ============================================================================
+# AGENT
+# ============================================================================
+
+class IcHttpAgent:
+    """Anonymous IC agent using the replica HTTP interface"""
+
+    def __init__(self, base_url: str, canister_aliases: Dict[str, str] = None,
+                 expiry_provider: Callable[[], int] = None, call_timeout: float = 45):
+        self.base_url = base_url.rstrip("/")
+        self.canister_aliases = dict(canister_aliases or {})
+        self.expiry_provider = expiry_provider
+        self.call_timeout = call_timeout
+        self.session = None
+        self._dfx_canister_ids: Optional[Dict[str, str]] = None
+
+    async def get_session(self):
+        """Get or create the persistent aiohttp session"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(headers={"Content-Type": "application/cbor"})
+        return self.session
+
+    async def close_session(self):
+        """Close the aiohttp session"""
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    def resolve_canister_id(self, canister_name: str) -> str:
+        """Map a dfx canister name (e.g. 'backend') or canister ID to a canister ID"""
+        if canister_name in self.canister_aliases:
+            return self.canister_aliases[canister_name]
+        if CANISTER_ID_PATTERN.match(canister_name):
+            return canister_name
+        if self._dfx_canister_ids is None:
+            self._dfx_canister_ids = self._load_dfx_canister_ids()
+        if canister_name in self._dfx_canister_ids:
+            return self._dfx_canister_ids[canister_name]
+        raise IcAgentError(f"Unknown canister '{canister_name}'")
+
+    def _load_dfx_canister_ids(self) -> Dict[str, str]:
+        """Read local canister IDs written by `dfx deploy`"""
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        ids_file = os.path.abspath(os.path.join(current_dir, "..", "..", "ic", ".dfx", "local", "canister_ids.json"))
+        try:
+            with open(ids_file) as f:
+                return {name: networks.get("local") for name, networks in json.load(f).items()}
+        except (OSError, ValueError) as e:
+            logger.debug(f"Could not read dfx canister ids from {ids_file}: {e}")
+            return {}
+
+    def _expiry(self) -> int:
+        if self.expiry_provider:
+            return self.expiry_provider()
+        return int((time.time() + 240) * 1_000_000_000)
+
+    async def _post(self, canister_id: str, endpoint: str, envelope: Dict) -> aiohttp.ClientResponse:
+        session = await self.get_session()
+        url = f"{self.base_url}/api/v2/canister/{canister_id}/{endpoint}"
+        return await session.post(url, data=cbor_encode(envelope),
+                                  timeout=aiohttp.ClientTimeout(total=self.call_timeout))
+
+    async def query(self, canister_name: str, method: str, args: str = "") -> str:
+        """Run a query call and return the reply rendered as Candid text"""
+        canister_id = self.resolve_canister_id(canister_name)
+        content = {
+            "request_type": "query",
+            "canister_id": principal_to_bytes(canister_id),
+            "method_name": method,
+            "arg": encode_text_args(args),
+            "sender": ANONYMOUS_SENDER,
+            "ingress_expiry": self._expiry(),
+        }
+        async with await self._post(canister_id, "query", {"content": content}) as response:
+            body = await response.read()
+            if response.status != 200:
+                raise IcAgentError(f"Query {method} failed with HTTP {response.status}: {body[:200]!r}")
+        reply = cbor_decode(body)
+        if reply.get("status") == "replied":
+            return render_args(decode_args(reply["reply"]["arg"]))
+        raise IcAgentError(f"Query {method} rejected (code {reply.get('reject_code')}): {reply.get('reject_message')}")
+
+    async def update(self, canister_name: str, method: str, args: str = "") -> str:
+        """Submit an update call, poll its status and return the reply as Candid text"""
+        canister_id = self.resolve_canister_id(canister_name)
+        canister_bytes = principal_to_bytes(canister_id)
+        content = {
+            "request_type": "call",
+            "canister_id": canister_bytes,
+            "method_name": method,
+            "arg": encode_text_args(args),
+            "sender": ANONYMOUS_SENDER,
+            "ingress_expiry": self._expiry(),
+            "nonce": os.urandom(16),
+        }
+        req_id = request_id(content)
+        async with await self._post(canister_id, "call", {"content": content}) as response:
+            body = await response.read()
+            if response.status not in (200, 202):
+                raise IcAgentError(f"Call {method} failed with HTTP {response.status}: {body[:200]!r}")
+        return await self._poll_request_status(canister_id, method, req_id)
+
+    async def _poll_request_status(self, canister_id: str, method: str, req_id: bytes) -> str:
+        deadline = time.monotonic() + self.call_timeout
+        delay = 0.1
+        status_path = [b"request_status", req_id]
+        while time.monotonic() < deadline:
+            content = {
+                "request_type": "read_state",
+                "sender": ANONYMOUS_SENDER,
+                "paths": [status_path],
+                "ingress_expiry": self._expiry(),
+            }
+            async with await self._post(canister_id, "read_state", {"content": content}) as response:
+                body = await response.read()
+                if response.status != 200:
+                    raise IcAgentError(f"read_state for {method} failed with HTTP {response.status}: {body[:200]!r}")
+            tree = cbor_decode(cbor_decode(body)["certificate"])["tree"]
+            status = lookup_path(tree, status_path + [b"status"])
+            if status == b"replied":
+                return render_args(decode_args(lookup_path(tree, status_path + [b"reply"])))
+            if status in (b"rejected", b"done"):
+                message = lookup_path(tree, status_path + [b"reject_message"]) or b"request already completed"
+                raise IcAgentError(f"Call {method} {status.decode()}: {message.decode('utf-8', 'replace')}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+        raise IcAgentError(f"Timed out waiting for {method} after {self.call_timeout}s")
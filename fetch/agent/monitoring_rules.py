@@ -1,5 +1,9 @@
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+import columnar_rules
+from price_detector import EwmaPriceDetector
+from windowed_counter import BURST_WINDOW, ContractActivity
 
 BALANCE_DROP_THRESHOLD = 0.5
 TRANSACTION_VOLUME_LIMIT = 10
@@ -8,8 +12,13 @@ TRANSACTION_TIME_WINDOW = 3600
 # Security monitoring thresholds
 REENTRANCY_CALL_LIMIT = 3  # Max recursive calls allowed
 FLASH_LOAN_AMOUNT_THRESHOLD = 1000000  # Large loan amount indicator
+FLASH_LOAN_FOLLOWUP_WINDOW = 300  # Seconds after a large loan in which follow-up transactions count
+FLASH_LOAN_MIN_FOLLOWUPS = 3  # Follow-up transactions that make a loan look like a flash loan attack
 PRICE_CHANGE_THRESHOLD = 0.3  # 30% price change alert
 OWNERSHIP_CHANGE_ALERT = True  # Always alert on ownership changes
+SUSPICIOUS_FUNCTIONS = ['upgrade', 'admin', 'owner', 'destroy', 'migrate']  # Function name fragments rule 3 flags
+OWNERSHIP_KEYWORDS = ['owner', 'admin', 'permission', 'role', 'access', 'upgrade', 'migrate']  # Admin event fragments rule 6 flags
+COLUMNAR_MIN_EVENTS = 10000  # Event lists at least this long are evaluated as NumPy columns (when installed)
 
 class MonitoringRules:
     @staticmethod
@@ -49,99 +58,135 @@ class MonitoringRules:
         
         return None
     @staticmethod
-    async def check_transaction_volume(contract_id: str, transactions: List[Dict]) -> Optional[Dict]:
+    async def check_transaction_volume(contract_id: str, transactions: List[Dict],
+                                       activity: Optional[ContractActivity] = None) -> Optional[Dict]:
         import logging
         logger = logging.getLogger("CanaryAgent")
         
+        # Counts come from the contract's windowed counters; without one (stateless checks)
+        # a throwaway counter is filled from this call's transactions
+        activity = activity or ContractActivity(TRANSACTION_TIME_WINDOW)
         current_time = time.time()
-        one_hour_ago = current_time - TRANSACTION_TIME_WINDOW
-        recent_transactions = [tx for tx in transactions if tx.get('timestamp', 0) > one_hour_ago]
+        activity.ingest_transactions(transactions, current_time)
+        recent_count = activity.transactions.count(current_time)
         
         logger.info(f"🔍 Transaction Volume Check for {contract_id}:")
         logger.info(f"   Total transactions provided: {len(transactions)}")
-        logger.info(f"   Recent transactions (last hour): {len(recent_transactions)}")
+        logger.info(f"   Recent transactions (last hour): {recent_count}")
         logger.info(f"   Threshold: {TRANSACTION_VOLUME_LIMIT}")
         
-        if len(recent_transactions) > TRANSACTION_VOLUME_LIMIT:
+        if recent_count > TRANSACTION_VOLUME_LIMIT:
             alert = {
                 "rule_id": 2,
                 "rule_name": "High Transaction Volume",
                 "title": "Unusual Transaction Activity",
-                "description": f"Detected {len(recent_transactions)} transactions in the last hour (limit: {TRANSACTION_VOLUME_LIMIT})",
+                "description": f"Detected {recent_count} transactions in the last hour (limit: {TRANSACTION_VOLUME_LIMIT})",
                 "severity": "warning",
                 "data": {
-                    "transaction_count": len(recent_transactions),
+                    "transaction_count": recent_count,
                     "time_window": "1 hour",
                     "threshold": TRANSACTION_VOLUME_LIMIT
                 }
             }
-            logger.warning(f"🚨 TRANSACTION VOLUME ALERT TRIGGERED: {len(recent_transactions)} > {TRANSACTION_VOLUME_LIMIT}")
+            logger.warning(f"🚨 TRANSACTION VOLUME ALERT TRIGGERED: {recent_count} > {TRANSACTION_VOLUME_LIMIT}")
             return alert
         else:
-            logger.info(f"✅ Transaction volume normal: {len(recent_transactions)} <= {TRANSACTION_VOLUME_LIMIT}")
+            logger.info(f"✅ Transaction volume normal: {recent_count} <= {TRANSACTION_VOLUME_LIMIT}")
         
         return None
     @staticmethod
-    async def check_function_calls(contract_id: str, recent_calls: List[Dict]) -> Optional[Dict]:
+    async def check_function_calls(contract_id: str, recent_calls: List[Dict],
+                                   activity: Optional[ContractActivity] = None) -> Optional[Dict]:
+        activity = activity or ContractActivity(TRANSACTION_TIME_WINDOW)
         current_time = time.time()
-        one_hour_ago = current_time - 3600
-        recent_function_calls = [call for call in recent_calls if call.get('timestamp', 0) > one_hour_ago and call.get('type') == 'function_call']
-        suspicious_functions = ['upgrade', 'admin', 'owner', 'destroy', 'migrate']
-        for call in recent_function_calls:
-            function_name = call.get('function_name', '').lower()
-            if any(sus_func in function_name for sus_func in suspicious_functions):
-                return {
-                    "rule_id": 3,
-                    "rule_name": "Suspicious Function Call",
-                    "title": "Potentially Dangerous Function Called",
-                    "description": f"Function '{call.get('function_name')}' was called recently",
-                    "severity": "warning",
-                    "data": {
-                        "function_name": call.get('function_name'),
-                        "caller": call.get('caller', 'unknown'),
-                        "timestamp": call.get('timestamp')
-                    }
+        activity.ingest_function_calls(recent_calls, current_time)
+        # The earliest suspicious call still inside the window (the first one for time-ordered lists)
+        candidates = []
+        for function_name, window in activity.functions.items():
+            if not any(sus_func in function_name.lower() for sus_func in SUSPICIOUS_FUNCTIONS):
+                continue
+            if window.function_calls.count(current_time) == 0:
+                continue
+            first_call = window.first_function_call(current_time - TRANSACTION_TIME_WINDOW)
+            if first_call is not None:
+                candidates.append(first_call)
+        if candidates:
+            call = min(candidates, key=lambda call: call.get('timestamp', 0))
+            return {
+                "rule_id": 3,
+                "rule_name": "Suspicious Function Call",
+                "title": "Potentially Dangerous Function Called",
+                "description": f"Function '{call.get('function_name')}' was called recently",
+                "severity": "warning",
+                "data": {
+                    "function_name": call.get('function_name'),
+                    "caller": call.get('caller', 'unknown'),
+                    "timestamp": call.get('timestamp')
                 }
+            }
         return None
 
     @staticmethod
-    async def check_reentrancy_attack(contract_id: str, function_calls: List[Dict]) -> Optional[Dict]:
+    async def check_reentrancy_attack(contract_id: str, function_calls: List[Dict],
+                                      activity: Optional[ContractActivity] = None) -> Optional[Dict]:
         """
         Detect potential reentrancy attacks by looking for recursive function calls
         """
+        activity = activity or ContractActivity(TRANSACTION_TIME_WINDOW)
         current_time = time.time()
-        one_hour_ago = current_time - TRANSACTION_TIME_WINDOW
-        recent_calls = [call for call in function_calls if call.get('timestamp', 0) > one_hour_ago]
-        
-        # Group calls by function name and check for rapid succession calls
-        function_call_counts = {}
-        for call in recent_calls:
-            func_name = call.get('function_name', '')
-            if func_name:
-                if func_name not in function_call_counts:
-                    function_call_counts[func_name] = []
-                function_call_counts[func_name].append(call.get('timestamp', 0))
+        activity.ingest_function_calls(function_calls, current_time)
         
         # Check for suspicious patterns (multiple calls to same function in short timeframe)
-        for func_name, timestamps in function_call_counts.items():
-            if len(timestamps) >= REENTRANCY_CALL_LIMIT:
-                # Check if calls happened within a short time window (indicating recursion)
-                timestamps.sort()
-                time_diff = timestamps[-1] - timestamps[0]
-                if time_diff < 60:  # All calls within 1 minute
-                    return {
-                        "rule_id": 4,
-                        "rule_name": "Reentrancy Attack Detection",
-                        "title": "Potential Reentrancy Attack Detected",
-                        "description": f"Function '{func_name}' called {len(timestamps)} times within 1 minute - possible reentrancy attack",
-                        "severity": "danger",
-                        "data": {
-                            "function_name": func_name,
-                            "call_count": len(timestamps),
-                            "time_window": f"{time_diff:.1f}s",
-                            "timestamps": timestamps
-                        }
-                    }
+        for func_name, window in activity.functions.items():
+            call_count = window.calls.count(current_time)
+            if call_count < REENTRANCY_CALL_LIMIT:
+                continue
+            # All of the last hour's calls happened within 1 minute of the latest one (indicating recursion)
+            if window.burst.count(window.latest, BURST_WINDOW) < call_count:
+                continue
+            timestamps = sorted(window.recent_timestamps)[-call_count:]
+            time_diff = timestamps[-1] - timestamps[0]
+            return {
+                "rule_id": 4,
+                "rule_name": "Reentrancy Attack Detection",
+                "title": "Potential Reentrancy Attack Detected",
+                "description": f"Function '{func_name}' called {call_count} times within 1 minute - possible reentrancy attack",
+                "severity": "danger",
+                "data": {
+                    "function_name": func_name,
+                    "call_count": call_count,
+                    "time_window": f"{time_diff:.1f}s",
+                    "timestamps": timestamps
+                }
+            }
+        return None
+
+    @staticmethod
+    def find_flash_loan(transactions: List[Dict]) -> Optional[Tuple[Dict, int]]:
+        """
+        Find the first large loan (in time order) followed by at least FLASH_LOAN_MIN_FOLLOWUPS
+        transactions within FLASH_LOAN_FOLLOWUP_WINDOW seconds; returns (loan, follow-up count).
+        Transactions are sorted by time and a second pointer marks the end of each loan's
+        follow-up window; both pointers only move forward, so the scan is linear after the sort.
+        """
+        ordered = sorted(transactions, key=lambda tx: tx.get('timestamp', 0))
+        timestamps = [tx.get('timestamp', 0) for tx in ordered]
+        count = len(ordered)
+        window_end = 0
+        for i, tx in enumerate(ordered):
+            # Check for large transactions that could be flash loans
+            if tx.get('amount', 0) <= FLASH_LOAN_AMOUNT_THRESHOLD:
+                continue
+            tx_type = tx.get('type', '').lower()
+            if 'borrow' not in tx_type and 'loan' not in tx_type:
+                continue
+            
+            loan_time = timestamps[i]
+            window_end = max(window_end, i + 1)
+            while window_end < count and timestamps[window_end] - loan_time < FLASH_LOAN_FOLLOWUP_WINDOW:
+                window_end += 1
+            if window_end - i - 1 >= FLASH_LOAN_MIN_FOLLOWUPS:
+                return tx, window_end - i - 1
         return None
 
     @staticmethod
@@ -150,36 +195,34 @@ class MonitoringRules:
         Detect potential flash loan attack patterns
         """
         current_time = time.time()
-        one_hour_ago = current_time - TRANSACTION_TIME_WINDOW
-        recent_transactions = [tx for tx in transactions if tx.get('timestamp', 0) > one_hour_ago]
-        
-        # Look for patterns: large loan followed by rapid transactions and repayment
-        for i, tx in enumerate(recent_transactions):
-            amount = tx.get('amount', 0)
-            tx_type = tx.get('type', '').lower()
+        if columnar_rules.HAS_NUMPY and len(transactions) >= COLUMNAR_MIN_EVENTS:
+            columns = columnar_rules.EventColumns(transactions)
+            row_match = columnar_rules.find_flash_loan(
+                columns, columnar_rules.window_mask(columns, current_time, TRANSACTION_TIME_WINDOW),
+                FLASH_LOAN_AMOUNT_THRESHOLD, FLASH_LOAN_FOLLOWUP_WINDOW, FLASH_LOAN_MIN_FOLLOWUPS)
+            match = (transactions[row_match[0]], row_match[1]) if row_match else None
+        else:
+            one_hour_ago = current_time - TRANSACTION_TIME_WINDOW
+            recent_transactions = [tx for tx in transactions if tx.get('timestamp', 0) > one_hour_ago]
             
-            # Check for large transactions that could be flash loans
-            if amount > FLASH_LOAN_AMOUNT_THRESHOLD and ('borrow' in tx_type or 'loan' in tx_type):
-                # Look for rapid subsequent transactions (typical flash loan pattern)
-                subsequent_txs = [
-                    t for t in recent_transactions[i+1:] 
-                    if t.get('timestamp', 0) - tx.get('timestamp', 0) < 300  # Within 5 minutes
-                ]
-                
-                if len(subsequent_txs) >= 3:  # Multiple rapid transactions after large loan
-                    return {
-                        "rule_id": 5,
-                        "rule_name": "Flash Loan Attack Pattern",
-                        "title": "Potential Flash Loan Attack Pattern",
-                        "description": f"Large loan of {amount:,.2f} followed by {len(subsequent_txs)} rapid transactions - possible flash loan attack",
-                        "severity": "danger",
-                        "data": {
-                            "loan_amount": amount,
-                            "subsequent_transactions": len(subsequent_txs),
-                            "loan_timestamp": tx.get('timestamp'),
-                            "pattern_detected": True
-                        }
-                    }
+            # Look for patterns: large loan followed by rapid transactions and repayment
+            match = MonitoringRules.find_flash_loan(recent_transactions)
+        if match:
+            tx, subsequent_count = match
+            amount = tx.get('amount', 0)
+            return {
+                "rule_id": 5,
+                "rule_name": "Flash Loan Attack Pattern",
+                "title": "Potential Flash Loan Attack Pattern",
+                "description": f"Large loan of {amount:,.2f} followed by {subsequent_count} rapid transactions - possible flash loan attack",
+                "severity": "danger",
+                "data": {
+                    "loan_amount": amount,
+                    "subsequent_transactions": subsequent_count,
+                    "loan_timestamp": tx.get('timestamp'),
+                    "pattern_detected": True
+                }
+            }
         return None
 
     @staticmethod
@@ -191,15 +234,13 @@ class MonitoringRules:
         one_hour_ago = current_time - TRANSACTION_TIME_WINDOW
         recent_events = [event for event in admin_events if event.get('timestamp', 0) > one_hour_ago]
         
-        ownership_keywords = ['owner', 'admin', 'permission', 'role', 'access', 'upgrade', 'migrate']
-        
         for event in recent_events:
             event_type = event.get('event_type', '').lower()
             function_name = event.get('function_name', '').lower()
             
             # Check for ownership/permission related changes
-            if any(keyword in event_type for keyword in ownership_keywords) or \
-               any(keyword in function_name for keyword in ownership_keywords):
+            if any(keyword in event_type for keyword in OWNERSHIP_KEYWORDS) or \
+               any(keyword in function_name for keyword in OWNERSHIP_KEYWORDS):
                 return {
                     "rule_id": 6,
                     "rule_name": "Ownership Change Alert",
@@ -217,14 +258,37 @@ class MonitoringRules:
         return None
 
     @staticmethod
-    async def check_price_manipulation(contract_id: str, price_data: List[Dict]) -> Optional[Dict]:
+    async def check_price_manipulation(contract_id: str, price_data: List[Dict],
+                                       detector: Optional[EwmaPriceDetector] = None) -> Optional[Dict]:
         """
-        Detect abnormal price changes that could indicate manipulation
+        Detect abnormal price changes that could indicate manipulation; with the contract's
+        streaming detector only samples it has not seen yet are scored (z-score or threshold)
         """
+        current_time = time.time()
+        if detector is not None:
+            anomaly = detector.ingest(price_data, alert_after=current_time - TRANSACTION_TIME_WINDOW)
+            if anomaly is None:
+                return None
+            return MonitoringRules._price_change_alert(anomaly["previous_price"], anomaly["current_price"],
+                                                       anomaly["change_percentage"], anomaly["time_diff"],
+                                                       anomaly["z_score"])
+        
         if len(price_data) < 2:
             return None
         
-        current_time = time.time()
+        if columnar_rules.HAS_NUMPY and len(price_data) >= COLUMNAR_MIN_EVENTS:
+            columns = columnar_rules.EventColumns(price_data)
+            row_match = columnar_rules.find_price_change(
+                columns, columnar_rules.window_mask(columns, current_time, TRANSACTION_TIME_WINDOW),
+                PRICE_CHANGE_THRESHOLD)
+            if row_match is None:
+                return None
+            prev_row, row, price_change = row_match
+            previous, current = price_data[prev_row], price_data[row]
+            return MonitoringRules._price_change_alert(
+                previous.get('price', 0), current.get('price', 0), price_change,
+                current.get('timestamp', 0) - previous.get('timestamp', 0))
+        
         one_hour_ago = current_time - TRANSACTION_TIME_WINDOW
         recent_prices = [p for p in price_data if p.get('timestamp', 0) > one_hour_ago]
         
@@ -243,23 +307,44 @@ class MonitoringRules:
                 price_change = abs(curr_price - prev_price) / prev_price
                 
                 if price_change > PRICE_CHANGE_THRESHOLD:
-                    direction = "increased" if curr_price > prev_price else "decreased"
-                    return {
-                        "rule_id": 7,
-                        "rule_name": "Price Manipulation Alert",
-                        "title": "Abnormal Price Change Detected",
-                        "description": f"Price {direction} by {price_change:.1%} in short timeframe - possible manipulation",
-                        "severity": "warning",
-                        "data": {
-                            "previous_price": prev_price,
-                            "current_price": curr_price,
-                            "change_percentage": price_change,
-                            "direction": direction,
-                            "time_diff": recent_prices[i].get('timestamp', 0) - recent_prices[i-1].get('timestamp', 0)
-                        }
-                    }
+                    return MonitoringRules._price_change_alert(
+                        prev_price, curr_price, price_change,
+                        recent_prices[i].get('timestamp', 0) - recent_prices[i-1].get('timestamp', 0))
         return None
 
+    @staticmethod
+    def _price_change_alert(prev_price: float, curr_price: float, price_change: float, time_diff: float,
+                            z_score: Optional[float] = None) -> Dict:
+        direction = "increased" if curr_price > prev_price else "decreased"
+        data = {
+            "previous_price": prev_price,
+            "current_price": curr_price,
+            "change_percentage": price_change,
+            "direction": direction,
+            "time_diff": time_diff
+        }
+        unusual = ""
+        if z_score is not None:
+            data["z_score"] = z_score
+            unusual = f" ({abs(z_score):.1f} standard deviations from its usual moves)"
+        return {
+            "rule_id": 7,
+            "rule_name": "Price Manipulation Alert",
+            "title": "Abnormal Price Change Detected",
+            "description": f"Price {direction} by {price_change:.1%}{unusual} in short timeframe - possible manipulation",
+            "severity": "warning",
+            "data": data
+        }
+
+    @staticmethod
+    def check_all_rules_batch(shard, now: Optional[float] = None):
+        """
+        Check all monitoring rules across a whole shard of contracts at once; takes a
+        batch_rules.ContractShard and returns a batch_rules.ViolationTable (requires NumPy)
+        """
+        from batch_rules import evaluate_shard
+        return evaluate_shard(shard, now)
+
     @staticmethod
     async def check_all_rules(contract_id: str, contract_data: Dict) -> List[Dict]:
         """
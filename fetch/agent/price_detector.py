@@ -0,0 +1,89 @@
+"""
+Streaming price-manipulation detection for Canary Contract Guardian
+
+Instead of re-sorting the price window on every poll and comparing neighbours against one
+fixed threshold, each contract keeps an exponentially weighted mean and variance of its price
+log-returns (O(1) state). Every new sample is scored once against that state before being folded
+in: it is anomalous when its return is PRICE_ZSCORE_THRESHOLD standard deviations from the
+asset's normal behaviour, or when the price moves by more than the absolute change threshold.
+The z-score only applies once PRICE_EWMA_WARMUP returns have been seen.
+"""
+
+import math
+from typing import Dict, Iterable, Optional
+
+PRICE_EWMA_ALPHA = 0.1  # Weight of the newest log-return in the running mean / variance
+PRICE_ZSCORE_THRESHOLD = 4.0  # Standard deviations from the mean return that count as abnormal
+PRICE_EWMA_WARMUP = 10  # Returns seen before z-scores are trusted
+
+
+class EwmaPriceDetector:
+    """Exponentially weighted mean / variance of one contract's price log-returns"""
+
+    def __init__(self, change_threshold: float, alpha: float = PRICE_EWMA_ALPHA,
+                 z_threshold: float = PRICE_ZSCORE_THRESHOLD, warmup: int = PRICE_EWMA_WARMUP):
+        self.change_threshold = change_threshold
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.warmup = warmup
+        self.mean = 0.0
+        self.variance = 0.0
+        self.returns_seen = 0
+        self.last_price: Optional[float] = None
+        self.last_timestamp = float("-inf")
+
+    def update(self, timestamp: float, price: float) -> Optional[Dict]:
+        """Score one sample, then fold it into the state; returns the anomaly details or None"""
+        if timestamp <= self.last_timestamp:
+            return None  # already scored
+        previous_price, previous_timestamp = self.last_price, self.last_timestamp
+        self.last_price, self.last_timestamp = price, timestamp
+        if not previous_price or previous_price <= 0 or price <= 0:
+            return None
+
+        log_return = math.log(price / previous_price)
+        change = abs(price - previous_price) / previous_price
+        z_score = None
+        if self.returns_seen >= self.warmup and self.variance > 0:
+            z_score = (log_return - self.mean) / math.sqrt(self.variance)
+
+        if self.returns_seen == 0:
+            self.mean = log_return
+        else:
+            deviation = log_return - self.mean
+            increment = self.alpha * deviation
+            self.mean += increment
+            self.variance = (1 - self.alpha) * (self.variance + deviation * increment)
+        self.returns_seen += 1
+
+        if change > self.change_threshold or (z_score is not None and abs(z_score) >= self.z_threshold):
+            return {
+                "previous_price": previous_price,
+                "current_price": price,
+                "change_percentage": change,
+                "z_score": z_score,
+                "time_diff": timestamp - previous_timestamp,
+            }
+        return None
+
+    def ingest(self, price_data: Iterable[Dict], alert_after: float = float("-inf")) -> Optional[Dict]:
+        """
+        Score the samples newer than the last one seen, in time order; returns the first anomaly
+        among samples after `alert_after` (older ones only update the state)
+        """
+        new_samples = sorted((p for p in price_data if p.get('timestamp', 0) > self.last_timestamp),
+                             key=lambda p: p.get('timestamp', 0))
+        anomaly = None
+        for sample in new_samples:
+            result = self.update(sample.get('timestamp', 0), sample.get('price', 0))
+            if result and anomaly is None and sample.get('timestamp', 0) > alert_after:
+                anomaly = result
+        return anomaly
+
+    def diagnostics(self) -> Dict:
+        return {
+            "returns_seen": self.returns_seen,
+            "mean_log_return": self.mean,
+            "volatility": math.sqrt(self.variance),
+            "last_price": self.last_price,
+        }
@@ -0,0 +1,226 @@
+"""
+Retry policy and circuit breakers for canister calls
+
+Failed calls are classified (ingress expiry, timeout, unreachable canister, unavailable
+canister, canister reject) and retried with exponential back-off plus jitter, each class
+drawing on its own retry budget: expiry errors clear up once the time window moves, a stopped
+or missing canister and a reject from a running canister will fail the same way again. Every
+target canister has a circuit breaker; after repeated timeouts, unreachable or unavailable
+errors it opens and calls fail fast until a half-open probe succeeds.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger("CanaryAgent")
+
+ERROR_EXPIRY = "expiry"
+ERROR_TIMEOUT = "timeout"
+ERROR_UNREACHABLE = "unreachable"
+ERROR_UNAVAILABLE = "unavailable"
+ERROR_REJECT = "reject"
+
+# Retries allowed per call for each error class
+DEFAULT_RETRY_BUDGETS = {ERROR_EXPIRY: 2, ERROR_TIMEOUT: 1, ERROR_UNREACHABLE: 1, ERROR_UNAVAILABLE: 0, ERROR_REJECT: 0}
+
+# Error classes that say the canister cannot serve calls; these trip the breaker
+BREAKER_ERRORS = (ERROR_TIMEOUT, ERROR_UNREACHABLE, ERROR_UNAVAILABLE)
+
+# Transport-level failures and transient (code 2) rejects
+_UNREACHABLE_MARKERS = (
+    "systransient", "reject code: 2", "(code 2)", "connection refused", "connection reset",
+    "cannot connect", "server disconnected", "error sending request", "failed with http 5",
+)
+
+# Destination-invalid (code 3) rejects: the canister is stopped, missing or has no code. The
+# replica answered, so these are not retried, but they count against the canister's breaker.
+# Other rejects (e.g. a trap in a running canister) leave the breaker alone.
+_UNAVAILABLE_MARKERS = (
+    "destinationinvalid", "reject code: 3", "(code 3)", "is stopped", "is stopping",
+    "no wasm module", "ic0301", "ic0508", "ic0509", "ic0537",
+)
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class CanisterCallError(Exception):
+    """A failed canister call attempt, with its error class"""
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+class CircuitOpenError(CanisterCallError):
+    """Raised instead of calling a canister whose circuit breaker is open"""
+
+    def __init__(self, canister: str):
+        super().__init__(ERROR_UNREACHABLE, f"Circuit open for canister {canister}")
+
+
+def classify_error(message: str) -> str:
+    """Map a dfx / replica error message to an error class"""
+    lowered = message.lower()
+    if "expiry" in lowered:
+        return ERROR_EXPIRY
+    if "timed out" in lowered or "timeout" in lowered:
+        return ERROR_TIMEOUT
+    if any(marker in lowered for marker in _UNREACHABLE_MARKERS):
+        return ERROR_UNREACHABLE
+    if any(marker in lowered for marker in _UNAVAILABLE_MARKERS):
+        return ERROR_UNAVAILABLE
+    return ERROR_REJECT
+
+
+class CircuitBreaker:
+    """Per-canister breaker: opens after consecutive failures, half-opens after a cool-down"""
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 30, max_reset_timeout: float = 300):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self.fast_failures = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (in half-open state only a single probe is let through)"""
+        if self.state == BREAKER_OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = BREAKER_HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == BREAKER_CLOSED:
+            return True
+        if self.state == BREAKER_HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.fast_failures += 1
+        return False
+
+    def record_success(self):
+        if self.state != BREAKER_CLOSED:
+            logger.info(f"✅ Circuit for canister {self.name} closed again")
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.reset_timeout = self.base_reset_timeout
+        self.probe_in_flight = False
+
+    def record_failure(self, kind: str):
+        if kind == ERROR_REJECT:
+            # The canister answered; the call itself was bad
+            self.record_success()
+            return
+        if kind not in BREAKER_ERRORS:
+            self.release_probe()
+            return
+        self.consecutive_failures += 1
+        if self.state == BREAKER_HALF_OPEN:
+            # Probe failed: stay open for longer
+            self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            self._open()
+        elif self.state == BREAKER_CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def release_probe(self):
+        self.probe_in_flight = False
+
+    def _open(self):
+        self.state = BREAKER_OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        self.times_opened += 1
+        logger.warning(f"🔌 Circuit for canister {self.name} opened after {self.consecutive_failures} failures; "
+                       f"failing fast for {self.reset_timeout:.0f}s")
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != BREAKER_CLOSED
+
+    def diagnostics(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "fast_failures": self.fast_failures,
+            "reset_timeout_seconds": self.reset_timeout,
+        }
+
+
+class RetryPolicy:
+    """Exponential back-off with jitter and per-error-class retry budgets"""
+
+    def __init__(self, budgets: Optional[Dict[str, int]] = None, base_delay: float = 1.0, max_delay: float = 20.0,
+                 expiry_delay: float = 5.0, failure_threshold: int = 3, reset_timeout: float = 30):
+        self.budgets = {**DEFAULT_RETRY_BUDGETS, **(budgets or {})}
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.expiry_delay = expiry_delay  # expiry errors need the replica's time window to move on
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.stats = {"calls": 0, "retries": {}, "failures": {}, "fast_failures": 0}
+
+    def breaker(self, canister: str) -> CircuitBreaker:
+        breaker = self.breakers.get(canister)
+        if breaker is None:
+            breaker = self.breakers[canister] = CircuitBreaker(canister, self.failure_threshold, self.reset_timeout)
+        return breaker
+
+    def is_open(self, canister: str) -> bool:
+        breaker = self.breakers.get(canister)
+        return breaker is not None and breaker.is_open
+
+    def delay(self, kind: str, retry: int) -> float:
+        """Back-off before retry number `retry` (0-based): half fixed, half random"""
+        base = self.expiry_delay if kind == ERROR_EXPIRY else self.base_delay
+        ceiling = min(self.max_delay, base * 2 ** retry)
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+    async def run(self, canister: str, description: str, attempt: Callable[[], Awaitable[str]]) -> str:
+        """Run attempt() under the canister's breaker, retrying within the budgets; raises CanisterCallError"""
+        breaker = self.breaker(canister)
+        retries_used: Dict[str, int] = {}
+        self.stats["calls"] += 1
+        while True:
+            if not breaker.allow():
+                self.stats["fast_failures"] += 1
+                raise CircuitOpenError(canister)
+            try:
+                result = await attempt()
+            except asyncio.TimeoutError:
+                error = CanisterCallError(ERROR_TIMEOUT, f"{description} timed out")
+            except CanisterCallError as e:
+                error = e
+            except asyncio.CancelledError:
+                breaker.release_probe()
+                raise
+            else:
+                breaker.record_success()
+                return result
+
+            breaker.record_failure(error.kind)
+            used = retries_used.get(error.kind, 0)
+            if used >= self.budgets.get(error.kind, 0) or breaker.is_open:
+                self.stats["failures"][error.kind] = self.stats["failures"].get(error.kind, 0) + 1
+                raise error
+            retries_used[error.kind] = used + 1
+            self.stats["retries"][error.kind] = self.stats["retries"].get(error.kind, 0) + 1
+            wait = self.delay(error.kind, used)
+            logger.info(f"Retrying {description} after {error.kind} error in {wait:.1f}s: {error}")
+            await asyncio.sleep(wait)
+
+    def diagnostics(self) -> Dict:
+        return {
+            **self.stats,
+            "budgets": dict(self.budgets),
+            "breakers": {name: breaker.diagnostics() for name, breaker in self.breakers.items()},
+        }
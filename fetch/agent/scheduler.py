@@ -0,0 +1,208 @@
+"""
+Per-contract scheduler for Canary Contract Guardian
+
+Keeps a due-time priority queue (heap) of contracts, each with its own polling
+interval, and hands due contracts to a fixed pool of worker tasks. Scheduling is
+drift-free: the next run is planned from the previous *planned* time, not from when
+the previous check finished, and missed slots are skipped rather than replayed.
+"""
+
+import asyncio
+import heapq
+import logging
+import math
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("CanaryAgent")
+
+
+class ScheduledContract:
+    """Scheduling state for one contract"""
+
+    def __init__(self, key: str, contract: Dict, interval: float, next_due: float):
+        self.key = key
+        self.contract = contract
+        self.interval = interval
+        self.next_due = next_due
+        self.last_planned = next_due - interval  # anchor for drift-free rescheduling
+        self.version = 0                         # bumped on reschedule; stale heap entries are skipped
+        self.running = False
+        self.runs = 0
+
+
+class ContractScheduler:
+    """Due-time priority queue of contracts dispatched to a bounded worker pool"""
+
+    def __init__(self, run_check: Callable[[Dict], Awaitable[object]], default_interval: float = 300,
+                 workers: int = 10, min_interval: float = 5):
+        self.run_check = run_check
+        self.default_interval = default_interval
+        self.workers = max(1, workers)
+        self.min_interval = min_interval
+        self.entries: Dict[str, ScheduledContract] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []  # (due, seq, key, version)
+        self._seq = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.stats = {"dispatched": 0, "skipped_overlaps": 0, "missed_slots": 0, "max_dispatch_lag_seconds": 0.0}
+        self.outcomes: Dict[str, int] = {}  # counts of the string results returned by run_check
+
+    # ------------------------------------------------------------------
+    # Schedule management
+    # ------------------------------------------------------------------
+
+    def _now(self) -> float:
+        return asyncio.get_running_loop().time()
+
+    def _push(self, entry: ScheduledContract):
+        self._seq += 1
+        heapq.heappush(self._heap, (entry.next_due, self._seq, entry.key, entry.version))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _clamp(self, interval: Optional[float]) -> float:
+        return max(self.min_interval, float(interval if interval else self.default_interval))
+
+    def schedule(self, key: str, contract: Dict, interval: Optional[float] = None):
+        """Add a contract (due immediately) or refresh the contract data of a scheduled one"""
+        entry = self.entries.get(key)
+        if entry is not None:
+            entry.contract = contract
+            if interval is not None:
+                self.set_interval(key, interval)
+            return
+        interval = self._clamp(interval)
+        entry = ScheduledContract(key, contract, interval, self._now())
+        self.entries[key] = entry
+        self._push(entry)
+
+    def set_interval(self, key: str, interval: float) -> bool:
+        """Change a contract's interval; the next run is re-planned from the last planned run"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return False
+        interval = self._clamp(interval)
+        if interval == entry.interval:
+            return True
+        entry.interval = interval
+        entry.next_due = max(entry.last_planned + interval, self._now())
+        entry.version += 1
+        self._push(entry)
+        return True
+
+    def remove(self, key: str):
+        """Stop scheduling a contract (its heap entry is discarded lazily)"""
+        self.entries.pop(key, None)
+
+    def sync(self, contracts: List[Dict], key_fn: Callable[[Dict], str],
+             interval_fn: Callable[[str], Optional[float]] = lambda key: None):
+        """Make the schedule match a freshly fetched contract list"""
+        current = set()
+        for contract in contracts:
+            key = key_fn(contract)
+            if not key:
+                continue
+            current.add(key)
+            self.schedule(key, contract, interval_fn(key))
+        self.retain(current)
+
+    def retain(self, keys: Set[str]):
+        """Stop scheduling the contracts whose key is not in `keys` (the complete current set)"""
+        for key in list(self.entries):
+            if key not in keys:
+                self.remove(key)
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start the dispatcher and worker tasks on the running loop (no-op if running)"""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        self._tasks = [loop.create_task(self._dispatch())]
+        self._tasks += [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    def stop(self):
+        """Cancel the dispatcher and workers"""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _dispatch(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            due, _, key, version = self._heap[0]
+            entry = self.entries.get(key)
+            if entry is None or entry.version != version:
+                heapq.heappop(self._heap)
+                continue
+
+            now = self._now()
+            if due > now:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            self.stats["max_dispatch_lag_seconds"] = max(self.stats["max_dispatch_lag_seconds"], round(now - due, 3))
+            if entry.running:
+                # Previous check still in progress: skip this slot rather than stacking work
+                self.stats["skipped_overlaps"] += 1
+            else:
+                entry.running = True
+                self.stats["dispatched"] += 1
+                self._queue.put_nowait(entry)
+
+            # Plan the next run from the planned time, skipping slots that are already past
+            entry.last_planned = due
+            next_due = due + entry.interval
+            if next_due <= now:
+                missed = math.floor((now - next_due) / entry.interval) + 1
+                self.stats["missed_slots"] += missed
+                next_due += missed * entry.interval
+            entry.next_due = next_due
+            self._push(entry)
+
+    async def _worker(self):
+        while True:
+            entry = await self._queue.get()
+            try:
+                outcome = await self.run_check(entry.contract)
+                entry.runs += 1
+                if isinstance(outcome, str):
+                    self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            except Exception as e:
+                logger.error(f"Scheduled check for {entry.key} failed: {e}")
+            finally:
+                entry.running = False
+                self._queue.task_done()
+
+    def diagnostics(self) -> Dict:
+        now = self._now() if self._tasks else None
+        return {
+            **self.stats,
+            "outcomes": dict(self.outcomes),
+            "contracts": len(self.entries),
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": sum(1 for entry in self.entries.values() if entry.running),
+            "intervals": {
+                key: {
+                    "interval_seconds": entry.interval,
+                    "next_due_in_seconds": round(entry.next_due - now, 1) if now is not None else None,
+                }
+                for key, entry in self.entries.items()
+            },
+        }
@@ -0,0 +1,162 @@
+"""
+Windowed event counters for Canary Contract Guardian
+
+Volume and function-call rules ask "how many events in the last hour / last minute". Instead
+of filtering the full event list on every check, each contract keeps ring buffers of per-bucket
+counts: an event is added in O(1), a window is answered by summing its buckets, and memory per
+contract is fixed however much traffic the contract sees. Counts are exact to bucket resolution
+(one minute for the hour window, one second for the burst window).
+
+Each check's event lists repeat events already seen (and synthetic events are re-stamped relative
+to the fetch time), so events are deduplicated on a stable identity: their "id" field, falling
+back to their content for events without one. An identity is forgotten once the event it was
+first seen with has left the window.
+"""
+
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional
+
+HOUR_BUCKET_SECONDS = 60  # Bucket width of the hour-long windows
+BURST_WINDOW = 60  # Seconds in which repeated calls to one function count as a burst
+BURST_BUCKET_SECONDS = 1  # Bucket width of the burst window
+MAX_TRACKED_FUNCTIONS = 256  # Distinct function names kept per contract (least recently called dropped)
+RECENT_CALL_TIMESTAMPS = 16  # Latest call timestamps kept per function for alert details
+MAX_TRACKED_EVENT_IDS = 4096  # Event identities remembered per contract and stream for deduplication
+
+
+def event_identity(event: Dict):
+    """Stable identity of an event: its id, or its content when it has none"""
+    event_id = event.get('id')
+    if event_id is not None:
+        return event_id
+    return (event.get('timestamp', 0), event.get('type'), event.get('function_name'), event.get('caller'),
+            event.get('from'), event.get('to'), event.get('amount'))
+
+
+class RecentEventIds:
+    """Identities of the events counted within the window, oldest first"""
+
+    def __init__(self, window: float, max_size: int = MAX_TRACKED_EVENT_IDS):
+        self.window = window
+        self.max_size = max_size
+        self._seen: "OrderedDict[object, float]" = OrderedDict()  # identity -> timestamp it was counted at
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def add(self, identity, timestamp: float, now: float) -> bool:
+        """Record an event; False if it was already counted and is still inside the window"""
+        cutoff = now - self.window
+        while self._seen and (len(self._seen) >= self.max_size or next(iter(self._seen.values())) <= cutoff):
+            self._seen.popitem(last=False)
+        counted_at = self._seen.get(identity)
+        if counted_at is not None and counted_at > cutoff:
+            return False
+        self._seen.pop(identity, None)
+        self._seen[identity] = timestamp
+        return True
+
+
+class WindowedCounter:
+    """Event counts over a sliding window, kept in a fixed ring of time buckets"""
+
+    def __init__(self, window: float, bucket_seconds: float):
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        # One extra bucket so a full window still fits when it straddles bucket boundaries
+        self.size = math.ceil(window / bucket_seconds) + 1
+        self._counts: List[int] = [0] * self.size
+        self._epochs: List[int] = [-1] * self.size
+        self._head = -1  # newest bucket epoch seen
+
+    def add(self, timestamp: float, count: int = 1):
+        """Count events at timestamp; events older than the window are dropped"""
+        epoch = int(timestamp // self.bucket_seconds)
+        if epoch <= self._head - self.size:
+            return
+        self._head = max(self._head, epoch)
+        slot = epoch % self.size
+        if self._epochs[slot] != epoch:
+            # Slot still holds a bucket from a previous turn of the ring
+            self._epochs[slot] = epoch
+            self._counts[slot] = 0
+        self._counts[slot] += count
+
+    def count(self, now: Optional[float] = None, span: Optional[float] = None) -> int:
+        """Events in the `span` seconds (default: the whole window) up to `now`"""
+        now = time.time() if now is None else now
+        span = self.window if span is None else min(span, self.window)
+        current = int(now // self.bucket_seconds)
+        first = int((now - span) // self.bucket_seconds)
+        total = 0
+        for epoch in range(max(first, current - self.size + 1), current + 1):
+            slot = epoch % self.size
+            if self._epochs[slot] == epoch:
+                total += self._counts[slot]
+        return total
+
+
+class FunctionCallWindow:
+    """Call counters for one function of a contract"""
+
+    def __init__(self, window: float):
+        self.calls = WindowedCounter(window, HOUR_BUCKET_SECONDS)          # every call record
+        self.function_calls = WindowedCounter(window, HOUR_BUCKET_SECONDS)  # records typed "function_call"
+        self.burst = WindowedCounter(BURST_WINDOW, BURST_BUCKET_SECONDS)
+        self.recent_timestamps: deque = deque(maxlen=RECENT_CALL_TIMESTAMPS)
+        self.recent_function_calls: deque = deque(maxlen=RECENT_CALL_TIMESTAMPS)
+        self.latest = 0.0
+
+    def add(self, call: Dict):
+        timestamp = call.get('timestamp', 0)
+        self.calls.add(timestamp)
+        self.burst.add(timestamp)
+        self.recent_timestamps.append(timestamp)
+        self.latest = max(self.latest, timestamp)
+        if call.get('type') == 'function_call':
+            self.function_calls.add(timestamp)
+            self.recent_function_calls.append(call)
+
+    def first_function_call(self, since: float) -> Optional[Dict]:
+        """Earliest kept "function_call" record newer than `since`"""
+        calls = [call for call in self.recent_function_calls if call.get('timestamp', 0) > since]
+        return min(calls, key=lambda call: call.get('timestamp', 0), default=None)
+
+
+class ContractActivity:
+    """Per-contract transaction and function-call counters, fed from each check's event lists"""
+
+    def __init__(self, window: float):
+        self.window = window
+        self.transactions = WindowedCounter(window, HOUR_BUCKET_SECONDS)
+        self.functions: "OrderedDict[str, FunctionCallWindow]" = OrderedDict()
+        # Events already counted per stream: each check's lists repeat earlier events
+        self.seen_transactions = RecentEventIds(window)
+        self.seen_calls = RecentEventIds(window)
+
+    def ingest_transactions(self, transactions: Iterable[Dict], now: Optional[float] = None):
+        now = time.time() if now is None else now
+        for tx in transactions:
+            timestamp = tx.get('timestamp', 0)
+            if timestamp > now - self.window and self.seen_transactions.add(event_identity(tx), timestamp, now):
+                self.transactions.add(timestamp)
+
+    def ingest_function_calls(self, function_calls: Iterable[Dict], now: Optional[float] = None):
+        now = time.time() if now is None else now
+        new_calls = [call for call in function_calls
+                     if call.get('timestamp', 0) > now - self.window
+                     and self.seen_calls.add(event_identity(call), call.get('timestamp', 0), now)]
+        for call in sorted(new_calls, key=lambda call: call.get('timestamp', 0)):
+            func_name = call.get('function_name', '')
+            if not func_name:
+                continue
+            window = self.functions.get(func_name)
+            if window is None:
+                if len(self.functions) >= MAX_TRACKED_FUNCTIONS:
+                    self.functions.popitem(last=False)
+                window = self.functions[func_name] = FunctionCallWindow(self.window)
+            else:
+                self.functions.move_to_end(func_name)
+            window.add(call)
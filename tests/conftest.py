@@ -0,0 +1,6 @@
+"""Unit tests for the agent modules in fetch/agent (imported flat, the way agent.py imports them)"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "fetch", "agent"))
@@ -0,0 +1,31 @@
+"""Batch rule evaluation against the per-contract rules"""
+
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from batch_rules import ContractShard, evaluate_shard  # noqa: E402
+from monitoring_rules import MonitoringRules  # noqa: E402
+
+
+def test_suspicious_function_call_matches_the_dict_path_on_unsorted_input():
+    now = time.time()
+    calls = [
+        {"timestamp": now - 60, "function_name": "admin_upgrade", "caller": "latest", "type": "function_call"},
+        {"timestamp": now - 30, "function_name": "transfer", "caller": "user", "type": "function_call"},
+        {"timestamp": now - 900, "function_name": "migrate_pool", "caller": "first", "type": "function_call"},
+        {"timestamp": now - 300, "function_name": "admin_upgrade", "caller": "middle", "type": "function_call"},
+    ]
+    snapshots = {"vault": {"balance": 100.0, "function_calls": calls}, "quiet": {"balance": 100.0}}
+    violations = [record for record in evaluate_shard(ContractShard.from_snapshots(snapshots), now).to_records()
+                  if record[1] == 3]
+    alert = asyncio.run(MonitoringRules.check_function_calls("vault", calls))
+
+    assert len(violations) == 1
+    contract_id, _, timestamp, row = violations[0]
+    assert contract_id == "vault"
+    assert timestamp == alert["data"]["timestamp"]
+    assert calls[row]["caller"] == alert["data"]["caller"] == "first"
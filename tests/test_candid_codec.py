@@ -0,0 +1,68 @@
+"""Candid text-argument encoding, binary decoding and rendering"""
+
+import pytest
+
+from candid_codec import (
+    CandidError,
+    decode_args,
+    encode_sleb128,
+    encode_text_args,
+    encode_uleb128,
+    idl_hash,
+    principal_to_bytes,
+    principal_to_text,
+    render_args,
+)
+
+
+def test_encode_text_matches_reference_bytes():
+    assert encode_text_args('("hello")').hex() == "4449444c0001710568656c6c6f"
+    assert encode_text_args("(42 : nat)").hex() == "4449444c00017d2a"
+    assert encode_text_args("()").hex() == "4449444c0000"
+
+
+def test_leb128():
+    assert encode_uleb128(624485).hex() == "e58e26"
+    assert encode_sleb128(-123456).hex() == "c0bb78"
+    assert encode_uleb128(0) == b"\x00"
+
+
+def test_idl_hash():
+    # Field hashes as computed by the Candid spec: fold(h * 223 + byte) mod 2**32
+    assert idl_hash("ok") == 24860
+    assert idl_hash("address") == 2634772916
+
+
+@pytest.mark.parametrize("text", [
+    '("hello")',
+    "(42 : nat)",
+    "(true, -5 : int)",
+    '(opt "a")',
+    "(vec { 1 : nat; 2 : nat; })",
+    "(variant { ok = 5 : nat })",
+    '(principal "rrkah-fqaaa-aaaaa-aaaaq-cai")',
+])
+def test_round_trip_renders_the_same_text(text):
+    assert render_args(decode_args(encode_text_args(text))) == text
+
+
+def test_record_round_trip_keeps_field_values():
+    args = decode_args(encode_text_args('(record { address = "abc"; nickname = "x" })'))
+    rendered = render_args(args)
+    assert 'address = "abc";' in rendered and 'nickname = "x";' in rendered
+
+
+def test_decode_is_deterministic():
+    data = encode_text_args('(record { address = "abc"; nickname = "x" }, 7 : nat)')
+    assert decode_args(data) == decode_args(data)
+    assert encode_text_args('(record { nickname = "x"; address = "abc" }, 7 : nat)') == data
+
+
+def test_principal_text_round_trip():
+    for text in ("rrkah-fqaaa-aaaaa-aaaaq-cai", "aaaaa-aa"):
+        assert principal_to_text(principal_to_bytes(text)) == text
+
+
+def test_decode_rejects_missing_magic():
+    with pytest.raises(CandidError):
+        decode_args(b"XXXX\x00\x00")
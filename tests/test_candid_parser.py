@@ -0,0 +1,57 @@
+"""Candid text parsing of dfx replies"""
+
+import pytest
+
+from candid_parser import CandidParseError, as_int, iter_records, parse_candid, parse_dfx_output, result_variant
+from canister_client import CanisterClient
+
+CONTRACT_TEXT = (
+    '(\n  vec {\n    record {\n      id = 3 : nat;\n      nickname = "Vault";\n'
+    '      address = "rrkah-fqaaa-aaaaa-aaaaq-cai";\n      status = variant { warning };\n'
+    '      alertCount = 2 : nat;\n      isPaused = false;\n      isActive = true;\n'
+    '      lastCheck = 1_700_000_000_000_000_000 : int;\n      addedAt = 1_699_000_000_000_000_000 : int;\n'
+    '      quarantinedAddresses = vec { "aaaaa-aa" };\n    };\n  },\n)'
+)
+
+EXPECTED_CONTRACT = {
+    'id': 3, 'nickname': 'Vault', 'address': 'rrkah-fqaaa-aaaaa-aaaaq-cai', 'status': 'warning',
+    'alertCount': 2, 'isPaused': False, 'isActive': True,
+    'lastCheck': 1_700_000_000_000_000_000, 'addedAt': 1_699_000_000_000_000_000,
+}
+
+
+def test_parse_values():
+    values = parse_candid('(variant { ok = record { 0 = "x"; 1 = vec { 1; 2 }; b = opt principal "aaaaa-aa"; '
+                          'c = blob "\\00\\ff"; d = variant { healthy }; e = null; f = -1.5e3 } }, "t\\n")')
+    assert values == [{'ok': {0: 'x', 1: [1, 2], 'b': 'aaaaa-aa', 'c': b'\x00\xff', 'd': {'healthy': None},
+                              'e': None, 'f': -1500.0}}, 't\n']
+
+
+def test_positional_record_and_empty_input():
+    assert parse_candid('(record { "a"; 7 : nat8 })') == [{0: 'a', 1: 7}]
+    assert parse_candid("()") == []
+
+
+@pytest.mark.parametrize("text", ["(record { a = 1; b = vec { 2 })", "(})", "(record { a = @ })", "(record { a = 1 )"])
+def test_malformed_input_raises(text):
+    with pytest.raises(CandidParseError):
+        parse_candid(text)
+
+
+def test_json_output_and_helpers():
+    values = parse_dfx_output('{"ok": {"id": "5"}}')
+    assert result_variant(values) == ('ok', {'id': '5'})
+    assert [as_int(record['id']) for record in iter_records(values)] == [5]
+
+
+def test_contract_records_from_candid_text():
+    client = CanisterClient("backend", "http://127.0.0.1:4943")
+    assert client.parse_contracts_from_candid(CONTRACT_TEXT) == [EXPECTED_CONTRACT]
+
+
+@pytest.mark.parametrize("nickname", ['Vault; isPaused = true; id = 99 : nat', 'Vault \\"A\\"; isPaused = true'])
+def test_contract_text_fields_cannot_inject_fields(nickname):
+    client = CanisterClient("backend", "http://127.0.0.1:4943")
+    reply = CONTRACT_TEXT.replace('"Vault"', '"' + nickname + '"')
+    expected = dict(EXPECTED_CONTRACT, nickname=nickname.replace('\\"', '"'))
+    assert client.parse_contracts_from_candid(reply) == [expected]
@@ -0,0 +1,63 @@
+"""Contract checks on an unchanged canister state and on mock fallback data"""
+
+import asyncio
+import time
+
+import contract_monitor
+from contract_monitor import AUTO_PAUSE_DANGER_EVENTS, ContractMonitor
+from monitoring_rules import MonitoringRules
+
+CONTRACT = {'id': 7, 'address': 'vault', 'nickname': 'Vault', 'status': 'healthy'}
+
+
+def stuck_monitor():
+    """A monitor whose canister keeps replying with the same reentrancy / flash-loan state"""
+    monitor = ContractMonitor(None, None, MonitoringRules(), monitoring_interval=0, adaptive_polling=False)
+    published = []
+
+    async def publish(name, steps):
+        published.append(name)
+
+    async def fetch_contract_data(address):
+        now = time.time()
+        return {
+            "balance": 1000.0, "transaction_count": 3, "reentrancy_call_count": 3, "flashloan_active": True,
+            "recent_transactions": monitor.generate_enhanced_transactions(3, True, now),
+            "function_calls": monitor.generate_enhanced_function_calls(3, False, now),
+            "admin_events": [], "price_data": [], "state_fingerprint": "unchanged",
+        }
+
+    monitor.alert_pipeline.publish = publish
+    monitor.fetch_contract_data = fetch_contract_data
+    return monitor, published
+
+
+def test_unchanged_dangerous_state_keeps_reporting_until_paused():
+    monitor, published = stuck_monitor()
+
+    async def scenario():
+        for _ in range(3):
+            assert await monitor.check_contract_rules(CONTRACT)
+
+    asyncio.run(scenario())
+    assert monitor.get_rule_eval_stats()['vault'] == {"evaluated": 1, "skipped": 2}
+    # Reentrancy (re-run over its window) and the cached flash-loan verdict on every check
+    assert monitor.sus_event_counters['vault'] == 6 - AUTO_PAUSE_DANGER_EVENTS
+    assert published.count("status@vault") == 2  # critical, then the auto-pause
+    # Repeats went through the suppression window instead of raising new alerts
+    rules = monitor.alert_dedup.diagnostics()["rules"]
+    assert published.count("Flash Loan Attack Pattern@vault") == 1
+    assert rules["Flash Loan Attack Pattern"] == {"emitted": 1, "suppressed": 2, "still_active_updates": 0}
+    assert rules["Reentrancy Attack Detection"]["suppressed"] == 2
+
+
+def test_mock_fallback_data_is_not_counted_across_checks(monkeypatch):
+    monitor = ContractMonitor(None, None, MonitoringRules(), adaptive_polling=False)
+    monkeypatch.setattr(contract_monitor.random, "randint", lambda low, high: 7)
+
+    async def scenario():
+        return [await monitor.check_rule_2_transactions(CONTRACT, monitor.generate_mock_contract_data())
+                for _ in range(4)]
+
+    assert asyncio.run(scenario()) == [None] * 4
+    assert monitor.contract_activity == {} and monitor.price_detectors == {}
@@ -0,0 +1,69 @@
+"""CBOR encoding, request ids and certificate lookups of the native IC HTTP transport"""
+
+import pytest
+
+from ic_http_agent import IcAgentError, cbor_decode, cbor_encode, lookup_path, request_id
+
+# Example from the IC interface specification ("Request ids")
+SPEC_CONTENT = {
+    "request_type": "call",
+    "canister_id": bytes.fromhex("00000000000004D2"),
+    "method_name": "hello",
+    "arg": bytes.fromhex("4449444C00FD2A"),
+}
+
+
+def test_request_id_matches_spec_examples():
+    assert request_id(SPEC_CONTENT).hex() == "8781291c347db32a9d8c10eb62b710fce5a93be676474c42babc74c51858f94b"
+    content = {**SPEC_CONTENT, "sender": b"\x04", "ingress_expiry": 1685570400000000000}
+    assert request_id(content).hex() == "1d1091364d6bb8a6c16b203ee75467d59ead468f523eb058880ae8ec80e2b101"
+
+
+def test_request_id_ignores_key_order():
+    reordered = dict(reversed(list(SPEC_CONTENT.items())))
+    assert request_id(reordered) == request_id(SPEC_CONTENT)
+
+
+@pytest.mark.parametrize("value, encoded", [
+    (0, "00"),
+    (23, "17"),
+    (24, "1818"),
+    (1000, "1903e8"),
+    (-1, "20"),
+    (-1000, "3903e7"),
+    (b"\x01\x02", "420102"),
+    ("a", "6161"),
+    ([1, 2], "820102"),
+    ({"a": 1}, "a1616101"),
+    (True, "f5"),
+    (None, "f6"),
+])
+def test_cbor_encoding_matches_rfc_examples(value, encoded):
+    assert cbor_encode(value).hex() == encoded
+    assert cbor_decode(bytes.fromhex(encoded)) == value
+
+
+def test_cbor_round_trip_of_nested_envelope():
+    envelope = {"content": {**SPEC_CONTENT, "ingress_expiry": 2 ** 62, "paths": [[b"time"], []]},
+                "sender_sig": None, "flags": [True, False, -300]}
+    assert cbor_decode(cbor_encode(envelope)) == envelope
+
+
+def test_cbor_decode_skips_tags_and_reads_indefinite_lengths():
+    # 55799 self-describe tag, then an indefinite-length array of a float16 and a chunked byte string
+    data = bytes.fromhex("d9d9f7" "9f" "f93c00" "5f41014102ff" "ff")
+    assert cbor_decode(data) == [1.0, b"\x01\x02"]
+
+
+def test_cbor_encode_rejects_unsupported_types():
+    with pytest.raises(IcAgentError):
+        cbor_encode(1.5)
+
+
+def test_lookup_path_in_hash_tree():
+    # fork(labeled("request_status", labeled(<id>, labeled("status", leaf "replied"))), labeled("time", leaf))
+    status = [2, b"status", [3, b"replied"]]
+    tree = [1, [2, b"request_status", [2, b"rid", status]], [2, b"time", [3, b"\x01"]]]
+    assert lookup_path(tree, [b"request_status", b"rid", b"status"]) == b"replied"
+    assert lookup_path(tree, [b"time"]) == b"\x01"
+    assert lookup_path(tree, [b"request_status", b"other", b"status"]) is None
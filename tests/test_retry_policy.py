@@ -0,0 +1,102 @@
+"""Error classification, retry budgets and circuit breakers for canister calls"""
+
+import asyncio
+
+import pytest
+
+from retry_policy import (
+    BREAKER_CLOSED,
+    BREAKER_HALF_OPEN,
+    BREAKER_OPEN,
+    ERROR_EXPIRY,
+    ERROR_REJECT,
+    ERROR_TIMEOUT,
+    ERROR_UNAVAILABLE,
+    ERROR_UNREACHABLE,
+    CanisterCallError,
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    classify_error,
+)
+
+
+@pytest.mark.parametrize("message, kind", [
+    ("Specified ingress_expiry not within expected range", ERROR_EXPIRY),
+    ("Request timed out after 30s", ERROR_TIMEOUT),
+    ("error sending request for url (http://127.0.0.1:4943/api/v2/status): Connection refused", ERROR_UNREACHABLE),
+    ("Cannot connect to host 127.0.0.1:4943", ERROR_UNREACHABLE),
+    ("The replica returned a rejection error: reject code SysTransient, reject message busy", ERROR_UNREACHABLE),
+    ("Canister call failed with HTTP 503", ERROR_UNREACHABLE),
+    # The replica answered that the canister is stopped, missing or has no code
+    ("The replica returned a replica error: reject code: 3, reject message: Canister abc is stopped", ERROR_UNAVAILABLE),
+    ("Canister rrkah-fqaaa-aaaaa-aaaaq-cai not found (code 3)", ERROR_UNAVAILABLE),
+    ("reject code DestinationInvalid: canister has no wasm module", ERROR_UNAVAILABLE),
+    # A running canister rejected the call
+    ("Canister trapped explicitly: contract not found", ERROR_REJECT),
+])
+def test_classify_error(message, kind):
+    assert classify_error(message) == kind
+
+
+def failing(kinds):
+    """An attempt that fails with the given error kinds in turn, then succeeds"""
+    calls = []
+
+    async def attempt():
+        calls.append(len(calls))
+        if len(calls) <= len(kinds):
+            raise CanisterCallError(kinds[len(calls) - 1], "failed")
+        return "ok"
+
+    return attempt, calls
+
+
+def test_retries_within_budget_then_succeeds():
+    policy = RetryPolicy(budgets={ERROR_EXPIRY: 2}, base_delay=0, expiry_delay=0)
+    attempt, calls = failing([ERROR_EXPIRY, ERROR_EXPIRY])
+    assert asyncio.run(policy.run("backend", "call", attempt)) == "ok"
+    assert len(calls) == 3
+    assert policy.stats["retries"][ERROR_EXPIRY] == 2
+
+
+def test_rejects_are_not_retried_and_do_not_trip_the_breaker():
+    policy = RetryPolicy(base_delay=0, failure_threshold=1)
+    for _ in range(3):
+        attempt, calls = failing([ERROR_REJECT])
+        with pytest.raises(CanisterCallError):
+            asyncio.run(policy.run("backend", "call", attempt))
+        assert len(calls) == 1
+    assert not policy.is_open("backend")
+
+
+def test_stopped_canister_is_not_retried_but_opens_the_breaker():
+    policy = RetryPolicy(base_delay=0, failure_threshold=2)
+    for _ in range(2):
+        attempt, calls = failing([ERROR_UNAVAILABLE])
+        with pytest.raises(CanisterCallError):
+            asyncio.run(policy.run("dummy", "getContractInfo", attempt))
+        assert len(calls) == 1
+    assert policy.is_open("dummy")
+
+
+def test_breaker_opens_fails_fast_and_half_opens():
+    breaker = CircuitBreaker("backend", failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure(ERROR_TIMEOUT)
+    assert breaker.state == BREAKER_CLOSED
+    breaker.record_failure(ERROR_UNREACHABLE)
+    assert breaker.state == BREAKER_OPEN
+    assert not breaker.allow()
+
+    policy = RetryPolicy(failure_threshold=2)
+    policy.breakers["backend"] = breaker
+    attempt, calls = failing([])
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(policy.run("backend", "call", attempt))
+    assert calls == []
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.allow()  # the half-open probe
+    assert breaker.state == BREAKER_HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == BREAKER_CLOSED
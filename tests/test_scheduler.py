@@ -0,0 +1,158 @@
+"""Per-contract scheduler and the monitor's contract-list sync"""
+
+import asyncio
+
+from canister_client import CanisterClient, ContractListError
+from contract_monitor import ContractMonitor
+from scheduler import ContractScheduler
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def by_address(contract):
+    return contract.get('address', '')
+
+
+def test_sync_adds_refreshes_and_removes():
+    async def scenario():
+        scheduler = ContractScheduler(lambda contract: asyncio.sleep(0), default_interval=60)
+        scheduler.sync([{'address': 'a'}, {'address': 'b'}, {'address': ''}], key_fn=by_address)
+        assert set(scheduler.entries) == {'a', 'b'}
+        scheduler.sync([{'address': 'b', 'nickname': 'new'}], key_fn=by_address)
+        assert set(scheduler.entries) == {'b'}
+        assert scheduler.entries['b'].contract['nickname'] == 'new'
+
+    run(scenario())
+
+
+def test_interval_is_clamped_and_replanned_from_last_planned_run():
+    async def scenario():
+        scheduler = ContractScheduler(lambda contract: asyncio.sleep(0), default_interval=60, min_interval=5)
+        scheduler.schedule('a', {'address': 'a'}, interval=1)
+        entry = scheduler.entries['a']
+        assert entry.interval == 5
+        entry.last_planned = scheduler._now() - 100
+        assert scheduler.set_interval('a', 30)
+        assert entry.next_due >= scheduler._now() - 0.01  # an overdue slot runs now, not in the past
+        assert not scheduler.set_interval('missing', 30)
+
+    run(scenario())
+
+
+def test_dispatches_each_contract_at_its_interval():
+    async def scenario():
+        runs = []
+
+        async def check(contract):
+            runs.append(contract['address'])
+            return "contracts_checked"
+
+        scheduler = ContractScheduler(check, workers=2, min_interval=0.01)
+        scheduler.schedule('fast', {'address': 'fast'}, interval=0.05)
+        scheduler.schedule('slow', {'address': 'slow'}, interval=10)
+        scheduler.start()
+        await asyncio.sleep(0.23)
+        scheduler.stop()
+        return runs, scheduler
+
+    runs, scheduler = run(scenario())
+    assert runs.count('slow') == 1
+    assert 4 <= runs.count('fast') <= 6
+    assert scheduler.outcomes["contracts_checked"] == len(runs)
+
+
+def test_overlapping_slots_are_skipped():
+    async def scenario():
+        async def slow_check(contract):
+            await asyncio.sleep(0.2)
+
+        scheduler = ContractScheduler(slow_check, min_interval=0.01)
+        scheduler.schedule('a', {'address': 'a'}, interval=0.05)
+        scheduler.start()
+        await asyncio.sleep(0.15)
+        scheduler.stop()
+        return scheduler.stats
+
+    stats = run(scenario())
+    assert stats["dispatched"] == 1
+    assert stats["skipped_overlaps"] >= 2
+
+
+class FakeCanisterClient:
+    """Pages contracts from a script of reads; a tuple is a read that fails after yielding its contracts"""
+
+    def __init__(self, reads):
+        self.reads = list(reads)
+
+    async def iter_contracts(self):
+        read = self.reads.pop(0) if len(self.reads) > 1 else self.reads[0]
+        for contract in read:
+            yield contract
+        if isinstance(read, tuple):
+            raise ContractListError("Contract paging stopped after id 1")
+
+
+def test_failed_contract_fetch_keeps_the_schedule():
+    async def scenario():
+        client = FakeCanisterClient([[{'address': 'a'}, {'address': 'b'}], ({'address': 'a'},), (), [{'address': 'b'}]])
+        monitor = ContractMonitor(client, None, None, monitoring_interval=60, adaptive_polling=False)
+        monitor.contract_sync_interval = 0.05
+        checks = []
+
+        async def check(contract):
+            checks.append(contract['address'])
+            return "contracts_checked"
+
+        monitor.scheduler.run_check = check
+        task = asyncio.ensure_future(monitor.start_monitoring())
+        await asyncio.sleep(0.12)  # first sync, then a partial read and a failed one
+        now = monitor.scheduler._now()
+        during_failure = {key: entry.next_due - now for key, entry in monitor.scheduler.entries.items()}
+        failed_tick = dict(monitor.last_cycle_stats)
+        await asyncio.sleep(0.15)
+        monitor.stop_monitoring()
+        task.cancel()
+        return during_failure, failed_tick, set(monitor.scheduler.entries), checks, monitor.last_cycle_stats
+
+    during_failure, failed_tick, remaining, checks, last_stats = run(scenario())
+    # Neither removed nor re-added as due immediately by the incomplete reads
+    assert set(during_failure) == {'a', 'b'}
+    assert all(due_in > 50 for due_in in during_failure.values())
+    assert failed_tick["contract_list_synced"] is False
+    assert remaining == {'b'}
+    assert sorted(checks) == ['a', 'b']
+    assert last_stats["contract_list_synced"] is True
+    assert last_stats["contracts"] == 1
+
+
+def test_iter_contracts_raises_on_an_incomplete_read():
+    async def drain(client):
+        return [contract['address'] async for contract in client.iter_contracts()]
+
+    async def scenario(pages, contract_list):
+        client = CanisterClient("backend", "http://127.0.0.1:4943")
+        client.registry.replace([{'id': 9, 'address': 'removed'}])
+
+        async def fetch_page(method, cursor, limit, items_key, from_record):
+            return pages.get(cursor)
+
+        async def fetch_contract_list():
+            return contract_list
+
+        client._fetch_page = fetch_page
+        client.fetch_contract_list = fetch_contract_list
+        try:
+            return await drain(client), set(client.registry.by_address)
+        except ContractListError:
+            return None, None
+
+    first_page = {"contracts": [{'id': 1, 'address': 'a'}], "nextCursor": 1, "hasMore": True}
+    last_page = {"contracts": [{'id': 2, 'address': 'b'}], "nextCursor": 2, "hasMore": False}
+    # A complete read drops the contracts it did not return from the registry
+    assert run(scenario({0: first_page, 1: last_page}, None)) == (['a', 'b'], {'a', 'b'})
+    assert run(scenario({0: first_page}, None)) == (None, None)
+    # No getContractsPage: one getContracts call, which can fail as well
+    assert run(scenario({}, [{'address': 'c'}]))[0] == ['c']
+    assert run(scenario({}, None)) == (None, None)
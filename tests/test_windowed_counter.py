@@ -0,0 +1,66 @@
+"""Windowed counters and the rules 2-4 fed from them across repeated checks"""
+
+import asyncio
+import time
+
+from monitoring_rules import TRANSACTION_TIME_WINDOW, MonitoringRules
+from windowed_counter import ContractActivity, RecentEventIds, WindowedCounter
+
+
+def test_windowed_counter_counts_inside_the_span():
+    counter = WindowedCounter(3600, 60)
+    now = 1_000_000.0
+    for offset in (10, 100, 1000, 4000):
+        counter.add(now - offset)
+    assert counter.count(now) == 3
+    assert counter.count(now, 120) == 2
+
+
+def test_recent_event_ids_forget_events_that_left_the_window():
+    seen = RecentEventIds(window=100)
+    assert seen.add("a", 0, now=50)
+    assert not seen.add("a", 40, now=90)
+    assert seen.add("a", 120, now=150)  # counted at 0, which is now outside the window
+
+
+def reentrancy_calls(now: float) -> list:
+    """Calls as ContractMonitor generates them: re-stamped relative to each fetch, stable ids"""
+    return [{"id": f"withdraw-{i}", "timestamp": now - 60 + i * 5, "function_name": "withdraw",
+             "caller": "attacker_contract", "type": "function_call"} for i in range(3)]
+
+
+def test_repeated_snapshots_are_counted_once():
+    activity = ContractActivity(TRANSACTION_TIME_WINDOW)
+    now = time.time()
+    for poll in range(5):
+        transactions = [{"id": f"tx-{12 - i}", "timestamp": now + poll * 10 - i * 300} for i in range(12)]
+        activity.ingest_transactions(transactions, now + poll * 10)
+    assert activity.transactions.count(now + 40) == 12
+
+
+def test_reentrancy_alerts_on_every_poll_like_the_snapshot_rule(monkeypatch):
+    activity = ContractActivity(TRANSACTION_TIME_WINDOW)
+    start = time.time()
+    results = []
+    # Polls minutes apart: the generator re-stamps the same calls, the ids keep them counted once
+    for offset in (0, 120, 600, 1800):
+        monkeypatch.setattr(time, "time", lambda: start + offset)
+        calls = reentrancy_calls(start + offset)
+        results.append(asyncio.run(MonitoringRules.check_reentrancy_attack("c", calls, activity)))
+    assert all(result and result["data"]["call_count"] == 3 for result in results)
+    assert activity.functions["withdraw"].function_calls.count(start + 1800) == 3
+
+
+def test_rule_3_reports_the_earliest_suspicious_call():
+    now = time.time()
+    calls = [
+        {"id": 1, "timestamp": now - 600, "function_name": "admin_upgrade", "caller": "first", "type": "function_call"},
+        {"id": 2, "timestamp": now - 60, "function_name": "admin_upgrade", "caller": "latest", "type": "function_call"},
+        {"id": 3, "timestamp": now - 30, "function_name": "transfer", "caller": "user", "type": "function_call"},
+    ]
+    activity = ContractActivity(TRANSACTION_TIME_WINDOW)
+    alert = asyncio.run(MonitoringRules.check_function_calls("c", calls, activity))
+    assert alert["data"]["caller"] == "first"
+    # A repeated snapshot still reports the same call
+    alert = asyncio.run(MonitoringRules.check_function_calls("c", calls, activity))
+    assert alert["data"]["caller"] == "first"